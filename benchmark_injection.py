@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Keybind injection latency benchmark
+Compares the persistent XTest connection against one `xdotool key` process
+per keybind and the pynput fallback. Starts its own Xvfb server unless a
+display is given, so it also runs on headless machines and CI.
+
+Usage:
+  python3 benchmark_injection.py
+  python3 benchmark_injection.py --keys ctrl+alt+d --iterations 500
+  python3 benchmark_injection.py --display :0   # use a running X server
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import subprocess
+
+from human_detection_core import XTestKeyInjector, KeybindError, compile_keybind, pynput_keys
+
+def start_xvfb():
+    """Start Xvfb on a free display number; returns (process, display name)"""
+    if shutil.which('Xvfb') is None:
+        print("✗ Xvfb not found (install xvfb / xorg-server-xvfb) or pass --display")
+        sys.exit(1)
+
+    for number in range(99, 120):
+        if os.path.exists(f"/tmp/.X11-unix/X{number}"):
+            continue
+        process = subprocess.Popen(['Xvfb', f":{number}", '-nolisten', 'tcp'],
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        # Wait for the server socket to appear
+        for _ in range(50):
+            if os.path.exists(f"/tmp/.X11-unix/X{number}"):
+                return process, f":{number}"
+            if process.poll() is not None:
+                break
+            time.sleep(0.1)
+        process.terminate()
+
+    print("✗ Could not start Xvfb")
+    sys.exit(1)
+
+def percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def measure(send, iterations):
+    """Time send() calls; returns the latencies in milliseconds"""
+    send()  # warm-up (connection setup, caches)
+    latencies = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        send()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+def xdotool_backend(action):
+    if shutil.which('xdotool') is None:
+        raise RuntimeError("xdotool not installed")
+    cmd = ['xdotool', 'key', '+'.join(action.keysyms)]
+    # Same call the app makes for every keybind
+    return lambda: subprocess.run(cmd, check=True, capture_output=True, timeout=1)
+
+def xtest_backend(action):
+    injector = XTestKeyInjector()
+    if injector.keycode(action.keysyms[-1]) is None:
+        raise RuntimeError(f"cannot map key '{action.keysyms[-1]}'")
+    return lambda: injector.send(action.keysyms)
+
+def pynput_backend(action):
+    from pynput.keyboard import Controller
+
+    # The app's own key mapping, so every backend sends the same keys
+    modifiers, keys = pynput_keys(action.key_names)
+    keys = modifiers + keys
+    keyboard = Controller()
+
+    def send():
+        # Raw press/release, without the app's settle delays
+        for key in keys:
+            keyboard.press(key)
+        for key in reversed(keys):
+            keyboard.release(key)
+    return send
+
+BACKENDS = {
+    'xtest': xtest_backend,
+    'xdotool': xdotool_backend,
+    'pynput': pynput_backend,
+}
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark keybind injection backends")
+    parser.add_argument('--keys', default='ctrl+F12',
+                        help="key combination in xdotool spelling (default: ctrl+F12)")
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--display', help="use this X display instead of starting Xvfb")
+    parser.add_argument('--backends', default=','.join(BACKENDS),
+                        help="comma-separated subset of: " + ', '.join(BACKENDS))
+    args = parser.parse_args()
+
+    try:
+        action = compile_keybind('benchmark', args.keys)
+    except KeybindError as e:
+        print(f"✗ {e}")
+        sys.exit(1)
+
+    xvfb = None
+    if args.display:
+        os.environ['DISPLAY'] = args.display
+    else:
+        xvfb, display = start_xvfb()
+        os.environ['DISPLAY'] = display
+        print(f"✓ Started Xvfb on {display}")
+
+    print(f"Keys: {action.keys}, {args.iterations} iterations\n")
+    print(f"{'backend':<10}{'mean':>10}{'p50':>10}{'p95':>10}{'max':>10}   (ms)")
+
+    try:
+        for backend in args.backends.split(','):
+            backend = backend.strip()
+            try:
+                send = BACKENDS[backend](action)
+                latencies = sorted(measure(send, args.iterations))
+            except Exception as e:
+                print(f"{backend:<10}skipped: {e}")
+                continue
+            mean = sum(latencies) / len(latencies)
+            print(f"{backend:<10}{mean:>10.3f}{percentile(latencies, 0.5):>10.3f}"
+                  f"{percentile(latencies, 0.95):>10.3f}{latencies[-1]:>10.3f}")
+    finally:
+        if xvfb is not None:
+            xvfb.terminate()
+            xvfb.wait()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+Detection pipeline benchmark
+Times every stage the app runs per frame (grayscale conversion, each
+detector stage, box merging, drawing the overlays on a copy of the frame and
+wrapping it in a QImage for the preview) on synthetic frames and optional local clips, at several
+resolutions and for each detection engine. Frames are loaded before timing starts, so disk and camera
+speed do not count.
+
+Usage:
+  python3 benchmark_pipeline.py
+  python3 benchmark_pipeline.py --clip incident.mp4 --resolutions 640x480,1280x720
+  python3 benchmark_pipeline.py --output before.json
+  python3 benchmark_pipeline.py --baseline before.json --threshold 0.1
+  python3 benchmark_pipeline.py --min-neighbors 3 --scale-factor 1.05
+  python3 benchmark_pipeline.py --engines hog --win-stride 4 --hog-scale 1.1
+  python3 benchmark_pipeline.py --model MobileNetSSD_deploy.caffemodel --config MobileNetSSD_deploy.prototxt
+"""
+
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+
+import cv2
+import numpy as np
+
+from human_detection_core import (CASCADE_PARAMS, HOG_PARAMS, DNN_PARAMS, DETECTION_ENGINES, load_cascades,
+                                  create_detector, detection_scale, to_detection_gray, to_detection_bgr,
+                                  scale_boxes, non_max_suppression, _run_stage, open_frame_source,
+                                  SyntheticSource)
+
+def parse_resolution(text):
+    width, height = text.lower().split('x')
+    return int(width), int(height)
+
+def load_frames(spec, resolution, count):
+    """Read up to count frames from a source, resized to resolution"""
+    if spec == 'synthetic':
+        source = SyntheticSource(*resolution, people=3, realtime=False)
+    else:
+        source = open_frame_source(spec, realtime=False, loop=True)
+        if not source.isOpened():
+            raise RuntimeError(f"cannot open {spec}")
+    frames = []
+    try:
+        while len(frames) < count:
+            ret, frame = source.read()
+            if not ret:
+                break
+            if frame.shape[1::-1] != resolution:
+                frame = cv2.resize(frame, resolution, interpolation=cv2.INTER_AREA)
+            frames.append(frame)
+    finally:
+        source.release()
+    if not frames:
+        raise RuntimeError(f"no frames read from {spec}")
+    return frames
+
+def make_qt_converter():
+    """Return the preview's QImage conversion, or None without PyQt5"""
+    try:
+        if not (os.environ.get('DISPLAY') or os.environ.get('WAYLAND_DISPLAY')):
+            os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+        from PyQt5.QtWidgets import QApplication
+        from human_detection_gui import frame_to_qimage
+    except ImportError:
+        return None
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+
+    def convert(frame):
+        return frame_to_qimage(frame)
+    convert.app = app  # keep the application alive
+    return convert
+
+def draw_overlay(frame, humans):
+    """The boxes, labels and status text render_tile draws"""
+    for i, (x, y, w, h) in enumerate(humans):
+        cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 255, 0), 2)
+        cv2.putText(frame, f"Human #{i + 1}", (x, y-10),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 255, 0), 2)
+    cv2.putText(frame, f"Detection: ON | Humans: {len(humans)}", (10, 30),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+
+def run_case(frames, detector, detection_size, min_score, qt_convert, warmup):
+    """Time each stage over the frames
+
+    Returns ({stage: [seconds, ...]}, detections per timed frame).
+    """
+    names = detector.stage_names
+    stages = {name: [] for name in ['gray'] + [f"detect:{n}" for n in names] + ['merge', 'draw']}
+    if qt_convert is not None:
+        stages['qimage'] = []
+    stages['total'] = []
+    detections = []
+
+    for index, frame in enumerate(frames[:warmup] + frames):
+        times = {}
+        start = time.perf_counter()
+        scale = detection_scale(frame.shape, detection_size)
+        image = (to_detection_bgr if detector.color else to_detection_gray)(frame, scale)
+        times['gray'] = time.perf_counter() - start
+
+        boxes = []
+        for stage, name in enumerate(names):
+            [(detected, scores)], elapsed = _run_stage(detector, stage, [image], min_score)
+            times[f"detect:{name}"] = elapsed
+            boxes.extend(box for box, score in zip(detected, scores) if score >= min_score)
+
+        start = time.perf_counter()
+        humans = non_max_suppression(scale_boxes(boxes, scale))
+        times['merge'] = time.perf_counter() - start
+
+        # The overlays go on a copy; the detector's frame stays untouched
+        start = time.perf_counter()
+        preview = frame.copy()
+        draw_overlay(preview, humans)
+        times['draw'] = time.perf_counter() - start
+
+        if qt_convert is not None:
+            start = time.perf_counter()
+            qt_convert(preview)
+            times['qimage'] = time.perf_counter() - start
+
+        if index < warmup:
+            continue
+        times['total'] = sum(times.values())
+        for stage, elapsed in times.items():
+            stages[stage].append(elapsed)
+        detections.append(len(humans))
+    return stages, detections
+
+def summarize(stages, detections):
+    """Per-stage latency percentiles in milliseconds, plus frames per second"""
+    summary = {}
+    for stage, values in stages.items():
+        ms = np.array(values) * 1000
+        p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+        summary[stage] = {'mean': float(ms.mean()), 'p50': float(p50), 'p95': float(p95), 'p99': float(p99)}
+    return {'frames': len(stages['total']), 'fps': 1000.0 / summary['total']['mean'],
+            'detections_per_frame': float(np.mean(detections)), 'stages': summary}
+
+def compare(results, baseline, threshold):
+    """List the stages and cases that got slower than the threshold allows"""
+    previous = {case['case']: case for case in baseline.get('results', [])}
+    regressions = []
+    for case in results:
+        old = previous.get(case['case'])
+        if old is None:
+            continue
+        if case['fps'] < old['fps'] / (1 + threshold):
+            regressions.append(f"{case['case']}: {old['fps']:.1f} -> {case['fps']:.1f} fps")
+        for stage, stats in case['stages'].items():
+            old_stats = old['stages'].get(stage)
+            # Ignore stages too fast to measure reliably
+            if old_stats is None or old_stats['p50'] < 0.05:
+                continue
+            if stats['p50'] > old_stats['p50'] * (1 + threshold):
+                regressions.append(f"{case['case']} {stage}: p50 {old_stats['p50']:.3f} -> {stats['p50']:.3f} ms")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the detection pipeline stages")
+    parser.add_argument('--clip', action='append', default=[],
+                        help="video file or image directory to include (repeatable)")
+    parser.add_argument('--no-synthetic', action='store_true', help="only benchmark the given clips")
+    parser.add_argument('--resolutions', default='320x240,640x480,1280x720',
+                        help="comma-separated WIDTHxHEIGHT list (default: 320x240,640x480,1280x720)")
+    parser.add_argument('--frames', type=int, default=60, help="timed frames per case (default: 60)")
+    parser.add_argument('--warmup', type=int, default=5, help="untimed frames per case (default: 5)")
+    parser.add_argument('--detection-size', type=int, default=640,
+                        help="long edge of the detection image, 0 = full resolution (default: 640)")
+    parser.add_argument('--scale-factor', type=float, help="override detectMultiScale scaleFactor")
+    parser.add_argument('--min-neighbors', type=int, help="override detectMultiScale minNeighbors")
+    parser.add_argument('--min-size', type=int, help="override detectMultiScale minSize (square, px)")
+    parser.add_argument('--engines',
+                        help="comma-separated detection engines to compare "
+                             "(default: haar,hog, plus dnn when --model is given)")
+    parser.add_argument('--confidence', type=int, default=50,
+                        help="minimum detection score in percent, as in the app (default: 50)")
+    parser.add_argument('--win-stride', type=int, help="override the HOG winStride (square, px)")
+    parser.add_argument('--padding', type=int, help="override the HOG padding (square, px)")
+    parser.add_argument('--hog-scale', type=float, help="override the HOG scale step")
+    parser.add_argument('--model', help="local SSD person detector for the dnn engine")
+    parser.add_argument('--config', default='', help="network config for --model (.prototxt, .pbtxt)")
+    parser.add_argument('--input-size', type=int, help="override the square DNN input size (px)")
+    parser.add_argument('--output', help="write the results to this JSON file")
+    parser.add_argument('--baseline', help="JSON file from an earlier run to compare against")
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help="allowed slowdown against the baseline, 0.1 = 10%% (default: 0.1)")
+    args = parser.parse_args()
+
+    if args.scale_factor is not None:
+        CASCADE_PARAMS['scaleFactor'] = args.scale_factor
+    if args.min_neighbors is not None:
+        CASCADE_PARAMS['minNeighbors'] = args.min_neighbors
+    if args.min_size is not None:
+        CASCADE_PARAMS['minSize'] = (args.min_size, args.min_size)
+    if args.win_stride is not None:
+        HOG_PARAMS['winStride'] = (args.win_stride, args.win_stride)
+    if args.padding is not None:
+        HOG_PARAMS['padding'] = (args.padding, args.padding)
+    if args.hog_scale is not None:
+        HOG_PARAMS['scale'] = args.hog_scale
+
+    if args.input_size is not None:
+        DNN_PARAMS['size'] = (args.input_size, args.input_size)
+
+    engines = args.engines or ('haar,hog,dnn' if args.model else 'haar,hog')
+    engines = [engine.strip() for engine in engines.split(',') if engine.strip()]
+    unknown = [engine for engine in engines if engine not in DETECTION_ENGINES]
+    if unknown:
+        print(f"✗ Unknown detection engine(s): {', '.join(unknown)}")
+        sys.exit(1)
+    detectors = {}
+    if 'haar' in engines:
+        cascades, paths = load_cascades()
+        if not cascades:
+            print("✗ No cascade classifiers could be loaded")
+            sys.exit(1)
+        detectors['haar'] = create_detector('haar', paths, cascades)
+    if 'hog' in engines:
+        detectors['hog'] = create_detector('hog')
+    if 'dnn' in engines:
+        if not args.model:
+            print("✗ The dnn engine needs --model")
+            sys.exit(1)
+        detectors['dnn'] = create_detector('dnn', params={'model': args.model, 'config': args.config})
+        # Load the model before timing starts
+        detectors['dnn'].detect_stage(0, np.zeros((64, 64, 3), np.uint8))
+    min_score = args.confidence / 100.0
+    qt_convert = make_qt_converter()
+    if qt_convert is None:
+        print("⚠ PyQt5 not available, skipping the QImage stage")
+
+    sources = ([] if args.no_synthetic else ['synthetic']) + args.clip
+    resolutions = [parse_resolution(text) for text in args.resolutions.split(',') if text.strip()]
+
+    results = []
+    for spec in sources:
+        for resolution in resolutions:
+            name = f"{os.path.basename(os.path.normpath(spec))}@{resolution[0]}x{resolution[1]}"
+            try:
+                frames = load_frames(spec, resolution, args.frames)
+            except RuntimeError as e:
+                print(f"✗ {name}: {e}")
+                continue
+            for engine, detector in detectors.items():
+                case = f"{name}/{engine}"
+                stages, detections = run_case(frames, detector, args.detection_size, min_score,
+                                              qt_convert, args.warmup)
+                summary = summarize(stages, detections)
+                summary['case'] = case
+                summary['engine'] = engine
+                results.append(summary)
+
+                print(f"\n{case}: {summary['fps']:.1f} fps over {summary['frames']} frames, "
+                      f"{summary['detections_per_frame']:.2f} detections per frame")
+                print(f"  {'stage':<26}{'mean':>9}{'p50':>9}{'p95':>9}{'p99':>9}   (ms)")
+                for stage, stats in summary['stages'].items():
+                    print(f"  {stage:<26}{stats['mean']:>9.3f}{stats['p50']:>9.3f}"
+                          f"{stats['p95']:>9.3f}{stats['p99']:>9.3f}")
+
+    if len(detectors) > 1 and results:
+        print(f"\n{'case':<34}{'fps':>8}{'p50 ms':>10}{'p95 ms':>10}{'det/frame':>11}")
+        for case in results:
+            total = case['stages']['total']
+            print(f"{case['case']:<34}{case['fps']:>8.1f}{total['p50']:>10.2f}{total['p95']:>10.2f}"
+                  f"{case['detections_per_frame']:>11.2f}")
+
+    report = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'platform': platform.platform(),
+        'python': platform.python_version(),
+        'opencv': cv2.__version__,
+        'cpu_count': os.cpu_count(),
+        'detection_size': args.detection_size,
+        'confidence': args.confidence,
+        'cascade_params': {key: list(value) if isinstance(value, tuple) else value
+                           for key, value in CASCADE_PARAMS.items()},
+        'hog_params': {key: list(value) if isinstance(value, tuple) else value
+                       for key, value in HOG_PARAMS.items()},
+        'dnn_params': {key: list(value) if isinstance(value, tuple) else value
+                       for key, value in dict(DNN_PARAMS, model=args.model or '', config=args.config).items()},
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✓ Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n✗ Slower than {args.baseline} by more than {args.threshold:.0%}:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"\n✓ No regressions against {args.baseline} (threshold {args.threshold:.0%})")
+
+if __name__ == '__main__':
+    main()
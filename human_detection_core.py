@@ -0,0 +1,3378 @@
+#!/usr/bin/env python3
+"""
+Detection core for the Human Detection Camera Application
+Qt-free building blocks that can be imported by worker processes
+"""
+
+import os
+import re
+import glob
+import json
+import math
+import time
+import bisect
+import struct
+import platform
+import subprocess
+import queue
+import threading
+import multiprocessing
+from collections import namedtuple, deque
+from multiprocessing import shared_memory
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+# Suppress verbose OpenCV error messages
+os.environ['OPENCV_LOG_LEVEL'] = 'ERROR'
+os.environ['OPENCV_VIDEOIO_DEBUG'] = '0'
+
+# Try to set log level if supported (OpenCV 4.6+)
+try:
+    cv2.setLogLevel(0)
+except:
+    pass
+
+# Default detectMultiScale parameters for the Haar cascades
+CASCADE_PARAMS = {
+    'scaleFactor': 1.1,
+    'minNeighbors': 5,
+    'minSize': (30, 30),
+}
+
+# Default detectMultiScale parameters for the HOG people detector
+HOG_PARAMS = {
+    'winStride': (8, 8),
+    'padding': (8, 8),
+    'scale': 1.05,
+}
+
+# Default parameters of the DNN engine. model (and config, for formats
+# that need one) must name a local SSD-style person detector; models are
+# never downloaded. The defaults fit MobileNet-SSD (Caffe, VOC classes).
+DNN_PARAMS = {
+    'model': '',
+    'config': '',
+    'size': (300, 300),
+    'scale': 1 / 127.5,
+    'mean': (127.5, 127.5, 127.5),
+    'swap_rb': False,
+    'person_class': 15,
+    'max_batch': 8,
+}
+
+# Engines that can find people in a frame
+DETECTION_ENGINES = {
+    'haar': "Haar cascades",
+    'hog': "HOG people detector",
+    'dnn': "DNN model (CPU)",
+}
+
+# Long-edge sizes offered for the detection image (0 = full resolution)
+DETECTION_SIZES = [0, 640, 480, 320]
+
+# A detection zone. points are (x, y) pairs normalized to 0..1 so zones
+# survive resolution changes; a rectangle is simply a four-point polygon.
+Zone = namedtuple('Zone', ['name', 'points', 'enabled'])
+
+def cache_path(name):
+    """Path of a file in the per-user cache directory"""
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(cache_home, 'human-detection', name)
+
+def config_path(name):
+    """Path of a file in the per-user config directory"""
+    config_home = os.environ.get('XDG_CONFIG_HOME') or os.path.join(os.path.expanduser('~'), '.config')
+    return os.path.join(config_home, 'human-detection', name)
+
+SETTINGS_FILE = 'detection_settings.json'
+
+def settings_path():
+    """Path of the settings file
+
+    Settings live in the config directory; a file left in the working
+    directory by older versions is read until the first save moves them.
+    """
+    path = config_path(SETTINGS_FILE)
+    if not os.path.exists(path) and os.path.exists(SETTINGS_FILE):
+        return SETTINGS_FILE
+    return path
+
+# Haar cascades used for human detection
+CASCADE_FILES = [
+    'haarcascade_fullbody.xml',
+    'haarcascade_upperbody.xml',
+]
+
+def download_cascades():
+    """Download Haar cascade files if not found locally
+
+    Returns (cascades, paths) for the files that could be loaded.
+    """
+    import urllib.request
+
+    base_url = "https://raw.githubusercontent.com/opencv/opencv/master/data/haarcascades/"
+    cascades = []
+    paths = []
+
+    # Create local directory for cascades
+    cascade_dir = os.path.join(os.path.dirname(__file__) or '.', 'cascades')
+    os.makedirs(cascade_dir, exist_ok=True)
+
+    for cascade_file in CASCADE_FILES:
+        try:
+            local_path = os.path.join(cascade_dir, cascade_file)
+
+            # Download if doesn't exist
+            if not os.path.exists(local_path):
+                print(f"  Downloading {cascade_file}...")
+                url = base_url + cascade_file
+                urllib.request.urlretrieve(url, local_path)
+                print(f"  ✓ Downloaded {cascade_file}")
+
+            # Try to load it
+            cascade = cv2.CascadeClassifier(local_path)
+            if not cascade.empty():
+                cascades.append(cascade)
+                paths.append(local_path)
+                print(f"  ✓ Loaded {cascade_file}")
+
+        except Exception as e:
+            print(f"  ✗ Failed to download/load {cascade_file}: {e}")
+
+    if not cascades:
+        print("⚠ Warning: Human detection will not be available")
+    return cascades, paths
+
+def load_cached_cascades():
+    """Load the cascades from the paths found by an earlier run
+
+    Returns ([], []) unless every cascade could be loaded from the cache,
+    which is only trusted for the same OpenCV version.
+    """
+    try:
+        with open(cache_path('cascades.json'), 'r') as f:
+            cached = json.load(f)
+        if cached.get('opencv') != cv2.__version__:
+            return [], []
+        paths = [str(path) for path in cached.get('paths', [])]
+    except (OSError, ValueError, AttributeError):
+        return [], []
+    if [os.path.basename(path) for path in paths] != CASCADE_FILES:
+        return [], []
+
+    cascades = []
+    for path in paths:
+        cascade = cv2.CascadeClassifier(path) if os.path.exists(path) else None
+        if cascade is None or cascade.empty():
+            return [], []
+        cascades.append(cascade)
+    print(f"✓ Loaded {len(cascades)} cascades from cache")
+    return cascades, paths
+
+def save_cascade_cache(paths):
+    try:
+        os.makedirs(os.path.dirname(cache_path('cascades.json')), exist_ok=True)
+        write_file_atomic(cache_path('cascades.json'),
+                          json.dumps({'opencv': cv2.__version__, 'paths': paths}, indent=2))
+    except OSError as e:
+        print(f"⚠ Failed to save cascade cache: {e}")
+
+def load_cascades():
+    """Find and load the Haar cascades; returns (cascades, paths)
+
+    Paths found by the search are cached, so later starts skip it.
+    """
+    cascades, paths = load_cached_cascades()
+    if cascades:
+        return cascades, paths
+
+    # Try to find cascades in different possible locations
+    search_paths = []
+
+    # Method 1: Try cv2.data.haarcascades (if available)
+    if hasattr(cv2, 'data') and hasattr(cv2.data, 'haarcascades'):
+        search_paths.append(cv2.data.haarcascades)
+
+    # Method 2: Common system paths
+    search_paths.extend([
+        '/usr/share/opencv4/haarcascades/',
+        '/usr/share/opencv/haarcascades/',
+        '/usr/local/share/opencv4/haarcascades/',
+        '/usr/local/share/opencv/haarcascades/',
+    ])
+
+    # Method 3: Try to find via cv2 module location
+    search_paths.append(os.path.join(os.path.dirname(cv2.__file__), 'data', 'haarcascades'))
+
+    # Try to load cascades from found paths
+    for cascade_file in CASCADE_FILES:
+        for search_path in search_paths:
+            try:
+                cascade_path = os.path.join(search_path, cascade_file)
+                if os.path.exists(cascade_path):
+                    cascade = cv2.CascadeClassifier(cascade_path)
+                    if not cascade.empty():
+                        cascades.append(cascade)
+                        paths.append(cascade_path)
+                        print(f"✓ Loaded cascade: {cascade_file}")
+                        break  # Found this cascade, move to next one
+            except Exception:
+                continue
+
+    if not cascades:
+        print("⚠ Warning: Could not load Haar cascade classifiers for human detection")
+        print("The app will still work but human detection may be limited")
+        print("Attempting to download cascades...")
+
+        # Try to download cascades if not found
+        cascades, paths = download_cascades()
+
+    if len(cascades) == len(CASCADE_FILES):
+        save_cascade_cache(paths)
+    return cascades, paths
+
+def detection_scale(shape, detection_size=0):
+    """Factor mapping detection-image coordinates back to the frame
+
+    The detection image has its long edge shrunk to detection_size pixels
+    (0 keeps the full resolution, and frames are never enlarged).
+    """
+    long_edge = max(shape[:2])
+    if detection_size and long_edge > detection_size:
+        return long_edge / detection_size
+    return 1.0
+
+def to_detection_gray(image, scale):
+    """Shrink a BGR or grayscale image by scale and make it grayscale"""
+    if scale != 1.0:
+        height, width = image.shape[:2]
+        size = (max(1, round(width / scale)), max(1, round(height / scale)))
+        # Shrink first so the colour conversion touches fewer pixels
+        image = cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+    if image.ndim == 2:
+        # Luma straight from the camera (CaptureProfile.gray)
+        return image
+    return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+def to_detection_bgr(image, scale):
+    """Shrink a BGR or grayscale image by scale, keeping three channels for colour models"""
+    if scale != 1.0:
+        height, width = image.shape[:2]
+        size = (max(1, round(width / scale)), max(1, round(height / scale)))
+        image = cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+    if image.ndim == 2:
+        return cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+    return image
+
+def prepare_detection_image(frame, detection_size=0):
+    """Make the grayscale image the detector runs on
+
+    Returns (gray, scale) where scale maps detection-image coordinates back
+    to frame coordinates.
+    """
+    scale = detection_scale(frame.shape, detection_size)
+    return to_detection_gray(frame, scale), scale
+
+def scale_boxes(boxes, scale):
+    """Map (x, y, w, h) boxes from detection-image to frame coordinates"""
+    if scale == 1.0:
+        return boxes
+    return [tuple(int(round(v * scale)) for v in box) for box in boxes]
+
+class DetectionZones:
+    """User-drawn polygons that restrict where the detector looks
+
+    Only the bounding rectangles of the enabled zones are scanned, and a
+    detection is kept only if its center lies inside one of the polygons.
+    With no enabled zones the whole frame is used. The zone list is
+    replaced as a whole, so readers on other threads always see a
+    consistent set.
+    """
+
+    def __init__(self, zones=()):
+        self.zones = tuple(zones)
+        self._cache_key = None
+        self._mask = None
+        self._regions = None
+
+    def set_zones(self, zones):
+        self.zones = tuple(zones)
+
+    def active(self):
+        """Enabled zones that form a polygon"""
+        return [zone for zone in self.zones if zone.enabled and len(zone.points) >= 3]
+
+    @staticmethod
+    def from_settings(items):
+        """Build the zone list stored in detection_settings.json"""
+        zones = []
+        for i, item in enumerate(items):
+            points = tuple((min(max(float(x), 0.0), 1.0), min(max(float(y), 0.0), 1.0))
+                           for x, y in item.get('points', []))
+            zones.append(Zone(item.get('name') or f"Zone {i + 1}", points, bool(item.get('enabled', True))))
+        return zones
+
+    def to_settings(self):
+        return [{'name': zone.name, 'points': [list(point) for point in zone.points], 'enabled': zone.enabled}
+                for zone in self.zones]
+
+    def polygons(self, shape):
+        """Active zones as integer pixel polygons for a frame shape"""
+        height, width = shape[:2]
+        return [np.array([(round(x * (width - 1)), round(y * (height - 1))) for x, y in zone.points],
+                         dtype=np.int32)
+                for zone in self.active()]
+
+    def _update_cache(self, shape):
+        zones = self.zones
+        key = (shape[:2], zones)
+        if key == self._cache_key:
+            return
+
+        polygons = self.polygons(shape)
+        if polygons:
+            mask = np.zeros(shape[:2], dtype=np.uint8)
+            cv2.fillPoly(mask, polygons, 255)
+            regions = [cv2.boundingRect(polygon) for polygon in polygons]
+        else:
+            mask = None
+            regions = [(0, 0, shape[1], shape[0])]
+        self._mask, self._regions, self._cache_key = mask, regions, key
+
+    def regions(self, shape):
+        """(x, y, w, h) rectangles of the frame that need scanning"""
+        self._update_cache(shape)
+        return self._regions
+
+    def filter(self, boxes, shape):
+        """Keep the boxes whose center lies inside an active zone"""
+        self._update_cache(shape)
+        if self._mask is None:
+            return boxes
+        height, width = self._mask.shape
+        return [box for box in boxes
+                if self._mask[min(height - 1, box[1] + box[3] // 2), min(width - 1, box[0] + box[2] // 2)]]
+
+def cascade_name(path):
+    """Short display name for a cascade file, e.g. 'fullbody'"""
+    name = os.path.splitext(os.path.basename(path))[0]
+    return name[len('haarcascade_'):] if name.startswith('haarcascade_') else name
+
+def non_max_suppression(boxes, overlap_threshold=0.5):
+    """Merge overlapping (x, y, w, h) boxes, keeping the largest of each group
+
+    Overlap is measured against the smaller box of each pair, so an
+    upper-body box nested inside a full-body box of the same person is
+    suppressed as well.
+    """
+    if len(boxes) == 0:
+        return []
+
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    x1 = boxes[:, 0]
+    y1 = boxes[:, 1]
+    x2 = x1 + boxes[:, 2]
+    y2 = y1 + boxes[:, 3]
+    areas = boxes[:, 2] * boxes[:, 3]
+
+    order = np.argsort(areas)[::-1]
+    keep = []
+    while order.size > 0:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+
+        width = np.clip(np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]), 0, None)
+        height = np.clip(np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]), 0, None)
+        overlap = width * height / np.maximum(np.minimum(areas[i], areas[rest]), 1)
+
+        order = rest[overlap <= overlap_threshold]
+
+    return [tuple(int(v) for v in boxes[i]) for i in keep]
+
+def box_iou(boxes_a, boxes_b):
+    """Pairwise intersection-over-union of two sets of (x, y, w, h) boxes"""
+    a = np.asarray(boxes_a, dtype=np.float64).reshape(-1, 1, 4)
+    b = np.asarray(boxes_b, dtype=np.float64).reshape(1, -1, 4)
+
+    width = np.clip(np.minimum(a[..., 0] + a[..., 2], b[..., 0] + b[..., 2])
+                    - np.maximum(a[..., 0], b[..., 0]), 0, None)
+    height = np.clip(np.minimum(a[..., 1] + a[..., 3], b[..., 1] + b[..., 3])
+                     - np.maximum(a[..., 1], b[..., 1]), 0, None)
+    intersection = width * height
+    union = a[..., 2] * a[..., 3] + b[..., 2] * b[..., 3] - intersection
+    return intersection / np.maximum(union, 1)
+
+class Detector:
+    """Interface of the detection engines
+
+    An engine scans a grayscale image (BGR if color is set) in one or
+    more stages (the Haar engine runs one per cascade), which
+    detect_humans may run side by side. Each stage returns (x, y, w, h)
+    boxes and a score in 0..1 for every box, where 0.5 is the engine's
+    own default acceptance level, so one confidence setting means the
+    same for every engine. Engines that set batched get all the zone
+    crops of a frame in one detect_batch call. params overrides the
+    engine's default parameters.
+    """
+
+    engine = None
+    default_params = {}
+    color = False
+    batched = False
+
+    def __init__(self, params=None):
+        self.params = dict(params or {})
+        self.stage_names = []
+
+    def empty(self):
+        """Check whether the engine has nothing to run"""
+        return not self.stage_names
+
+    def detect_params(self):
+        """detectMultiScale keyword arguments: the defaults plus params"""
+        params = dict(self.default_params)
+        # Sizes read from JSON settings arrive as lists
+        params.update((key, tuple(value) if isinstance(value, list) else value)
+                      for key, value in self.params.items())
+        return params
+
+    def detect_stage(self, index, gray, min_score=0.5):
+        """Run one stage on a grayscale image; returns (boxes, scores)"""
+        raise NotImplementedError
+
+    def detect_batch(self, index, images, min_score=0.5):
+        """Run one stage on several images; returns a (boxes, scores) pair per image"""
+        return [self.detect_stage(index, image, min_score) for image in images]
+
+class HaarDetector(Detector):
+    """Haar cascades, one stage per cascade
+
+    A box's score is n / (n + minNeighbors), n being the number of
+    neighbouring windows that voted for it (detectMultiScale2). A
+    confidence below 50% lowers minNeighbors to match.
+    """
+
+    engine = 'haar'
+    default_params = CASCADE_PARAMS
+
+    def __init__(self, cascade_paths=(), cascades=None, params=None):
+        super().__init__(params)
+        if cascades is None:
+            cascades = [cv2.CascadeClassifier(path) for path in cascade_paths]
+        loaded = [(cascade, path) for cascade, path in zip(cascades, cascade_paths) if not cascade.empty()]
+        self.cascades = [cascade for cascade, _ in loaded]
+        self.stage_names = [cascade_name(path) for _, path in loaded]
+
+    def detect_stage(self, index, gray, min_score=0.5):
+        if min_score >= 1.0:
+            return [], []
+        params = self.detect_params()
+        neighbors = params['minNeighbors']
+        params['minNeighbors'] = max(1, math.ceil(neighbors * min_score / (1.0 - min_score) - 1e-9))
+        boxes, counts = self.cascades[index].detectMultiScale2(gray, **params)
+        scores = [count / (count + neighbors) for count in np.ravel(counts)]
+        return [tuple(int(v) for v in box) for box in boxes], scores
+
+class HogDetector(Detector):
+    """OpenCV's default HOG + linear SVM people detector, in one stage
+
+    A box's score is the logistic of its SVM margin, 1 / (1 + e^-w), and
+    the confidence becomes the matching hit threshold. The 64x128 window
+    means people must be at least 128 px tall in the detection image.
+    """
+
+    engine = 'hog'
+    default_params = HOG_PARAMS
+
+    def __init__(self, params=None):
+        super().__init__(params)
+        self.hog = cv2.HOGDescriptor()
+        self.hog.setSVMDetector(cv2.HOGDescriptor_getDefaultPeopleDetector())
+        self.stage_names = ['hog']
+
+    def detect_stage(self, index, gray, min_score=0.5):
+        win_width, win_height = self.hog.winSize
+        if min_score >= 1.0 or gray.shape[0] < win_height or gray.shape[1] < win_width:
+            return [], []
+        min_score = max(min_score, 1e-6)
+        hit_threshold = math.log(min_score / (1.0 - min_score))
+        boxes, weights = self.hog.detectMultiScale(gray, hitThreshold=hit_threshold, **self.detect_params())
+        scores = [1.0 / (1.0 + math.exp(-weight)) for weight in np.ravel(weights)]
+        return [tuple(int(v) for v in box) for box in boxes], scores
+
+def load_dnn_model(model_path, config_path=''):
+    """Load a local model file for cv2.dnn on the CPU
+
+    The format (ONNX, Caffe, TensorFlow, ...) follows from the file
+    extensions; raises cv2.error if the files cannot be read.
+    """
+    if not os.path.isfile(model_path):
+        raise cv2.error(f"model file not found: {model_path}")
+    net = cv2.dnn.readNet(model_path, config_path)
+    net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+    net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+    return net
+
+class DnnRunner(threading.Thread):
+    """Runs one cv2.dnn model for every thread that uses it
+
+    Requests waiting when the runner becomes free go through the network
+    together as one blobFromImages batch, so several cameras, or several
+    zones of one frame, cost a single forward pass. A lone request runs
+    at once; nothing waits for a batch to fill up. Models with a fixed
+    batch size of one are detected on the first failing batch and fed
+    one image at a time from then on.
+    """
+
+    def __init__(self, params):
+        super().__init__(name="dnn", daemon=True)
+        self.params = params
+        self.max_batch = max(1, int(params['max_batch']))
+        self.net = load_dnn_model(params['model'], params['config'])
+        self._requests = queue.Queue()
+
+    def infer(self, images):
+        """Run the model on BGR images; returns an (N, 7) SSD detection array per image"""
+        request = [images, None, threading.Event()]
+        self._requests.put(request)
+        request[2].wait()
+        if isinstance(request[1], Exception):
+            raise request[1]
+        return request[1]
+
+    def run(self):
+        while True:
+            batch = [self._requests.get()]
+            count = len(batch[0][0])
+            while count < self.max_batch:
+                try:
+                    request = self._requests.get_nowait()
+                except queue.Empty:
+                    break
+                batch.append(request)
+                count += len(request[0])
+
+            images = [image for request in batch for image in request[0]]
+            try:
+                detections = self._forward(images)
+            except Exception as e:
+                # Handed to the callers; the runner keeps serving
+                detections = e
+            for request in batch:
+                if isinstance(detections, Exception):
+                    request[1] = detections
+                else:
+                    request[1] = detections[:len(request[0])]
+                    detections = detections[len(request[0]):]
+                request[2].set()
+
+    def _forward(self, images):
+        if len(images) > self.max_batch:
+            step = self.max_batch
+            return [rows for start in range(0, len(images), step)
+                    for rows in self._forward(images[start:start + step])]
+        params = self.params
+        blob = cv2.dnn.blobFromImages(images, params['scale'], tuple(params['size']),
+                                      tuple(params['mean']), params['swap_rb'], False)
+        self.net.setInput(blob)
+        try:
+            output = self.net.forward()
+        except cv2.error:
+            if len(images) == 1:
+                raise
+            print("⚠ DNN model does not accept batches, running one image at a time")
+            self.max_batch = 1
+            return self._forward(images)
+        output = output.reshape(-1, 7)
+        return [output[output[:, 0] == i] for i in range(len(images))]
+
+# Shared DnnRunners: blob and model settings -> runner (None if loading failed)
+_dnn_runners = {}
+_dnn_runners_lock = threading.Lock()
+
+def dnn_runner(params):
+    """The shared DnnRunner for a model and its blob settings, started on first use
+
+    Returns None (after printing why once) if the model cannot be loaded.
+    """
+    key = (params['model'], params['config'], tuple(params['size']), params['scale'],
+           tuple(params['mean']), params['swap_rb'], params['max_batch'])
+    with _dnn_runners_lock:
+        if key not in _dnn_runners:
+            runner = None
+            if not params['model']:
+                print("⚠ No DNN model configured; set 'model' under engine_params.dnn")
+            else:
+                try:
+                    runner = DnnRunner(params)
+                    runner.start()
+                    print(f"✓ Loaded DNN model: {os.path.basename(params['model'])}")
+                except cv2.error as e:
+                    print(f"✗ Failed to load DNN model {params['model']}: {e}")
+            _dnn_runners[key] = runner
+        return _dnn_runners[key]
+
+class DnnDetector(Detector):
+    """SSD-style person detector run through cv2.dnn on the CPU
+
+    The model must output SSD DetectionOutput rows (image, class, score,
+    x1, y1, x2, y2 with normalized corners); only person_class counts.
+    The score is the model's own confidence. All detectors with the same
+    model share one DnnRunner, which batches their requests.
+    """
+
+    engine = 'dnn'
+    default_params = DNN_PARAMS
+    color = True
+    batched = True
+
+    def __init__(self, params=None):
+        super().__init__(params)
+        self.stage_names = ['dnn']
+
+    def detect_stage(self, index, image, min_score=0.5):
+        return self.detect_batch(index, [image], min_score)[0]
+
+    def detect_batch(self, index, images, min_score=0.5):
+        runner = dnn_runner(self.detect_params())
+        if runner is None:
+            return [([], []) for _ in images]
+        person_class = self.detect_params()['person_class']
+        results = []
+        for image, rows in zip(images, runner.infer(images)):
+            height, width = image.shape[:2]
+            boxes = []
+            scores = []
+            for _, label, score, x1, y1, x2, y2 in rows:
+                if int(label) != person_class or score < min_score:
+                    continue
+                x1, x2 = (int(round(min(max(v, 0.0), 1.0) * width)) for v in (x1, x2))
+                y1, y2 = (int(round(min(max(v, 0.0), 1.0) * height)) for v in (y1, y2))
+                if x2 > x1 and y2 > y1:
+                    boxes.append((x1, y1, x2 - x1, y2 - y1))
+                    scores.append(float(score))
+            results.append((boxes, scores))
+        return results
+
+def create_detector(engine='haar', cascade_paths=(), cascades=None, params=None):
+    """Build a detection engine by its DETECTION_ENGINES name"""
+    if engine == 'haar':
+        return HaarDetector(cascade_paths, cascades, params)
+    if engine == 'hog':
+        return HogDetector(params)
+    if engine == 'dnn':
+        return DnnDetector(params)
+    raise ValueError(f"unknown detection engine '{engine}'")
+
+def detector_stage_names(engine, cascade_paths=()):
+    """Labels of an engine's stages, as used for its timings"""
+    if engine in ('hog', 'dnn'):
+        return [engine]
+    return [cascade_name(path) for path in cascade_paths]
+
+def _run_stage(detector, index, images, min_score=0.5):
+    """Run one detector stage on images, returning ([(boxes, scores), ...], seconds)"""
+    start = time.perf_counter()
+    results = detector.detect_batch(index, images, min_score)
+    return results, time.perf_counter() - start
+
+def detect_humans(detector, frame, detection_size=0, executor=None, timings=None, zones=None,
+                  min_score=0.5):
+    """Run every stage of a detector on a BGR frame and return the boxes
+
+    With an executor the stages run concurrently (OpenCV releases the GIL
+    inside detectMultiScale); each stage scans the zone crops in turn, as
+    one classifier must never run on two images at once. Boxes scoring
+    below min_score are dropped and overlapping boxes from different
+    stages are merged. If timings is a list, the time spent in each stage
+    is appended to it in stage order. With DetectionZones, only the zone
+    crops are scanned, at the same scale as the full frame would be.
+    """
+    scale = detection_scale(frame.shape, detection_size)
+    regions = zones.regions(frame.shape) if zones is not None else [(0, 0, frame.shape[1], frame.shape[0])]
+    stages = len(detector.stage_names)
+    prepare = to_detection_bgr if detector.color else to_detection_gray
+    crops = [((x, y), prepare(frame[y:y + h, x:x + w], scale)) for x, y, w, h in regions]
+
+    # A job is one stage on every crop
+    jobs = [(index, crops) for index in range(stages)]
+
+    if executor is not None and len(jobs) > 1:
+        futures = [executor.submit(_run_stage, detector, index, [image for _, image in group], min_score)
+                   for index, group in jobs]
+        results = [future.result() for future in futures]
+    else:
+        results = [_run_stage(detector, index, [image for _, image in group], min_score)
+                   for index, group in jobs]
+
+    humans = []
+    stage_times = [0.0] * stages
+    for (index, group), (detections, elapsed) in zip(jobs, results):
+        stage_times[index] += elapsed
+        for (offset, _), (boxes, scores) in zip(group, detections):
+            boxes = [box for box, score in zip(boxes, scores) if score >= min_score]
+            for box in scale_boxes(boxes, scale):
+                humans.append((box[0] + offset[0], box[1] + offset[1], box[2], box[3]))
+    if timings is not None:
+        timings.extend(stage_times)
+
+    humans = non_max_suppression(humans)
+    if zones is not None:
+        humans = zones.filter(humans, frame.shape)
+    return humans
+
+# Fastest settings the latency budget may fall back to. max_scale_factor
+# applies to the Haar scaleFactor and the HOG scale, max_min_size is the
+# Haar minSize (px, in the detection image) and max_size an optional
+# Haar maxSize (0 = none).
+BudgetBounds = namedtuple('BudgetBounds', ['max_scale_factor', 'max_min_size', 'min_detection_size', 'max_size'])
+DEFAULT_BUDGET_BOUNDS = BudgetBounds(1.4, 80, 320, 0)
+
+def budget_from_settings(item):
+    """Read the 'latency_budget' settings: returns (target seconds, BudgetBounds)"""
+    bounds = DEFAULT_BUDGET_BOUNDS._replace(**{
+        field: type(default)(item[field])
+        for field, default in DEFAULT_BUDGET_BOUNDS._asdict().items() if field in item
+    })
+    return float(item.get('target_ms', 0)) / 1000.0, bounds
+
+class LatencyBudget:
+    """Keeps the detection time per frame under a target by trading accuracy for speed
+
+    The detector settings run along a ladder of levels, from the
+    configured ones (level 0) to the bounds (the fastest level): a
+    coarser scale step, a larger minimum size and a smaller detection
+    image. A moving average of the detection time is compared with the
+    target; above it the budget steps one level faster, and below half
+    of it it steps back towards level 0. After every step it waits for
+    settle detector runs, so the average reflects the new settings.
+    A level that went over the target is only retried after backoff
+    runs, doubled (up to max_backoff) every time it fails again, so the
+    budget does not flip between two levels that straddle the target.
+    A target of 0 turns the budget off.
+    """
+
+    LEVELS = 6
+
+    def __init__(self, target_seconds=0.0, bounds=DEFAULT_BUDGET_BOUNDS, settle=5, smoothing=0.3,
+                 backoff=50, max_backoff=800):
+        self.target = target_seconds
+        self.bounds = bounds
+        self.settle = settle
+        self.smoothing = smoothing
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.reset()
+
+    @property
+    def enabled(self):
+        return self.target > 0
+
+    def reset(self):
+        """Go back to the configured settings"""
+        self.level = 0
+        self.average = None
+        self._runs = 0
+        self._retry_runs = {}  # level -> runs to wait before stepping back to it
+
+    def update(self, detection_time):
+        """Account for one detector run; returns the new level if it changed, else None"""
+        if not self.enabled:
+            return None
+        if self.average is None:
+            self.average = detection_time
+        else:
+            self.average += self.smoothing * (detection_time - self.average)
+        self._runs += 1
+        if self._runs < self.settle:
+            return None
+
+        level = self.level
+        if self.average > self.target and level < self.LEVELS - 1:
+            retry = self._retry_runs.get(level)
+            self._retry_runs[level] = self.backoff if retry is None else min(retry * 2, self.max_backoff)
+            level += 1
+        elif (self.average < 0.5 * self.target and level > 0
+              and self._runs >= max(2 * self.settle, self._retry_runs.get(level - 1, 0))):
+            level -= 1
+        if level == self.level:
+            return None
+        self.level = level
+        self._runs = 0
+        return level
+
+    def settings(self, engine, params, detection_size, long_edge=0):
+        """Detection size and engine parameters for the current level
+
+        params are the configured engine parameter overrides; long_edge is
+        the frame's long edge, used as the starting size when the detection
+        image is at full resolution (detection_size 0).
+        """
+        if self.level == 0:
+            return detection_size, params
+        t = self.level / (self.LEVELS - 1)
+        bounds = self.bounds
+        params = dict(params)
+
+        start = detection_size or long_edge
+        if start > bounds.min_detection_size:
+            # Multiples of 16 keep the downscaled image friendly to SIMD
+            detection_size = int(round((start + t * (bounds.min_detection_size - start)) / 16) * 16)
+        if engine == 'haar':
+            scale_factor = params.get('scaleFactor', CASCADE_PARAMS['scaleFactor'])
+            min_size = tuple(params.get('minSize', CASCADE_PARAMS['minSize']))[0]
+            params['scaleFactor'] = round(scale_factor + t * max(0.0, bounds.max_scale_factor - scale_factor), 3)
+            min_size = int(round(min_size + t * max(0, bounds.max_min_size - min_size)))
+            params['minSize'] = (min_size, min_size)
+            if bounds.max_size:
+                params['maxSize'] = (bounds.max_size, bounds.max_size)
+        elif engine == 'hog':
+            scale = params.get('scale', HOG_PARAMS['scale'])
+            params['scale'] = round(scale + t * max(0.0, bounds.max_scale_factor - scale), 3)
+        return detection_size, params
+
+def describe_detection_settings(engine, params, detection_size):
+    """Short text of the active detector settings, e.g. 'scale 1.16, min 40 px, 512 px'"""
+    parts = []
+    if engine == 'haar':
+        parts.append(f"scale {params.get('scaleFactor', CASCADE_PARAMS['scaleFactor']):.2f}")
+        parts.append(f"min {tuple(params.get('minSize', CASCADE_PARAMS['minSize']))[0]} px")
+        if params.get('maxSize'):
+            parts.append(f"max {tuple(params['maxSize'])[0]} px")
+    elif engine == 'hog':
+        parts.append(f"scale {params.get('scale', HOG_PARAMS['scale']):.2f}")
+    parts.append(f"{detection_size} px" if detection_size else "full resolution")
+    return ", ".join(parts)
+
+class MotionGate:
+    """Decides whether a frame is worth running the detector on
+
+    Each frame is shrunk to a tiny grayscale thumbnail and compared with
+    the previous one. Detection runs while the fraction of changed pixels
+    is at least threshold, keeps running for hold_seconds after the last
+    motion, and otherwise only runs once every refresh_seconds so a person
+    standing perfectly still is not forgotten.
+    """
+
+    def __init__(self, threshold=0.01, hold_seconds=2.0, refresh_seconds=10.0,
+                 thumbnail_width=64, pixel_delta=25):
+        self.enabled = True
+        self.threshold = threshold
+        self.hold_seconds = hold_seconds
+        self.refresh_seconds = refresh_seconds
+        self.thumbnail_width = thumbnail_width
+        self.pixel_delta = pixel_delta
+        self.reset()
+
+    def reset(self):
+        """Forget the previous frame so the next one always passes"""
+        self._previous = None
+        self._last_motion = None
+        self._last_pass = None
+        self.motion_level = 0.0
+
+    def measure(self, frame):
+        """Fraction of thumbnail pixels that changed since the last frame (1.0 for the first)"""
+        height, width = frame.shape[:2]
+        size = (self.thumbnail_width, max(1, round(height * self.thumbnail_width / width)))
+        thumbnail = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        if thumbnail.ndim == 3:
+            thumbnail = cv2.cvtColor(thumbnail, cv2.COLOR_BGR2GRAY)
+
+        if self._previous is None or self._previous.shape != thumbnail.shape:
+            self.motion_level = 1.0
+        else:
+            diff = cv2.absdiff(thumbnail, self._previous)
+            self.motion_level = np.count_nonzero(diff > self.pixel_delta) / diff.size
+        self._previous = thumbnail
+        return self.motion_level
+
+    def check(self, frame, now=None):
+        """Return True if detection should run on this frame"""
+        if not self.enabled:
+            return True
+        if now is None:
+            now = time.monotonic()
+
+        if self.measure(frame) >= self.threshold:
+            self._last_motion = now
+
+        if self._last_motion is not None and now - self._last_motion <= self.hold_seconds:
+            passed = True
+        else:
+            # Periodic refresh while the scene is static
+            passed = self._last_pass is None or now - self._last_pass >= self.refresh_seconds
+
+        if passed:
+            self._last_pass = now
+        return passed
+
+class IdleMonitor:
+    """Decides when a quiet camera can drop to a cheap capture mode
+
+    A camera is quiet once quiet_seconds pass without motion and without
+    a detection. It then goes idle: a camera is switched to width x height
+    at fps, frames from any source are thinned out to fps, and the
+    preview stops refreshing. While active, motion is measured on a
+    thumbnail every check_seconds; while idle, on every frame, so the
+    first frame that moves switches back. A change of frame size only
+    starts a new reference thumbnail, so the switch itself does not
+    count as motion. quiet_seconds 0 turns idle mode off.
+    """
+
+    def __init__(self, quiet_seconds=0.0, width=320, height=240, fps=5.0, threshold=0.01, check_seconds=0.5):
+        self.quiet_seconds = quiet_seconds
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.check_seconds = check_seconds
+        self.motion = MotionGate(threshold=threshold)
+        self.reset()
+
+    @classmethod
+    def from_settings(cls, item):
+        """Build an IdleMonitor from the 'idle_mode' settings
+
+        A width, height or fps of 0 or less cannot be captured or thinned
+        out to, so it falls back to the default.
+        """
+        width = int(item.get('width', 320))
+        height = int(item.get('height', 240))
+        fps = float(item.get('fps', 5))
+        return cls(
+            quiet_seconds=float(item.get('quiet_seconds', 0)),
+            width=width if width > 0 else 320,
+            height=height if height > 0 else 240,
+            fps=fps if fps > 0 else 5.0
+        )
+
+    def to_settings(self):
+        """The 'idle_mode' settings"""
+        return {'quiet_seconds': self.quiet_seconds, 'width': self.width, 'height': self.height, 'fps': self.fps}
+
+    @property
+    def enabled(self):
+        return self.quiet_seconds > 0
+
+    def reset(self):
+        """Start over in the active mode"""
+        self.idle = False
+        self.motion.reset()
+        self._shape = None
+        self._last_activity = None
+        self._last_check = None
+
+    def note_activity(self, now=None):
+        """Record a detection, which keeps the camera active"""
+        self._last_activity = time.monotonic() if now is None else now
+
+    def check(self, frame, now=None):
+        """Look at a captured frame; returns True if the mode changed"""
+        if now is None:
+            now = time.monotonic()
+        if self._last_activity is None:
+            self._last_activity = now
+        if not self.enabled:
+            changed, self.idle = self.idle, False
+            return changed
+
+        if self.idle or self._last_check is None or now - self._last_check >= self.check_seconds:
+            self._last_check = now
+            if frame.shape[:2] != self._shape:
+                self._shape = frame.shape[:2]
+                self.motion.reset()
+                self.motion.measure(frame)
+            elif self.motion.measure(frame) >= self.motion.threshold:
+                self._last_activity = now
+
+        idle = now - self._last_activity >= self.quiet_seconds
+        changed = idle != self.idle
+        self.idle = idle
+        return changed
+
+class Track:
+    """A person followed across frames"""
+
+    def __init__(self, track_id, box):
+        self.track_id = track_id
+        self.box = np.asarray(box, dtype=np.float64)
+        self.points = None
+        self.misses = 0
+
+class BoxTracker:
+    """Follows detected people between detector keyframes
+
+    The detector only has to run on keyframes; in between, every track is
+    moved by the median sparse optical flow (calcOpticalFlowPyrLK) of
+    corner points inside its box. Keyframe detections are matched to the
+    existing tracks by IoU, so each person keeps a stable track ID.
+
+    A keyframe is due every `interval` frames, or as soon as a track loses
+    most of its points. With adaptive set, the interval grows towards
+    keyframe_interval while keyframes agree with the predicted tracks, and
+    is halved whenever they disagree.
+    """
+
+    def __init__(self, keyframe_interval=10, adaptive=True, min_interval=2,
+                 tracking_size=320, max_points=30, min_confidence=0.5,
+                 iou_threshold=0.3, max_misses=2):
+        self.enabled = True
+        self.keyframe_interval = keyframe_interval
+        self.adaptive = adaptive
+        self.min_interval = min_interval
+        self.tracking_size = tracking_size
+        self.max_points = max_points
+        self.min_confidence = min_confidence
+        self.iou_threshold = iou_threshold
+        self.max_misses = max_misses
+        self.reset()
+
+    def reset(self):
+        """Drop all tracks; the next frame will be a keyframe"""
+        self.tracks = []
+        self.interval = self.min_interval if self.adaptive else self.keyframe_interval
+        self._next_id = 1
+        self._previous = None
+        self._frames_since_keyframe = 0
+        self._lost = False
+
+    def needs_keyframe(self):
+        """Check whether the detector should run on the next frame"""
+        return (self._previous is None or self._lost
+                or self._frames_since_keyframe + 1 >= self.interval)
+
+    def update(self, frame, detections=None):
+        """Advance the tracks by one frame
+
+        Pass the detector's boxes on keyframes; otherwise the tracks are
+        propagated with optical flow. Returns (boxes, track_ids).
+        """
+        gray, scale = prepare_detection_image(frame, self.tracking_size)
+        if detections is None:
+            self._propagate(gray, scale)
+        else:
+            self._correct(gray, scale, detections)
+        self._previous = gray
+        return self.visible()
+
+    def visible(self):
+        """Boxes and IDs of the tracks matched on the last keyframe"""
+        tracks = [track for track in self.tracks if track.misses == 0]
+        boxes = [tuple(int(round(v)) for v in track.box) for track in tracks]
+        return boxes, [track.track_id for track in tracks]
+
+    def _propagate(self, gray, scale):
+        self._frames_since_keyframe += 1
+        if any(track.points is None for track in self.tracks if track.misses == 0):
+            # Featureless box: it cannot be followed without the detector
+            self._lost = True
+        tracks = [track for track in self.tracks if track.points is not None]
+        if not tracks or self._previous is None or self._previous.shape != gray.shape:
+            return
+
+        points = np.concatenate([track.points for track in tracks])
+        moved, status, _ = cv2.calcOpticalFlowPyrLK(
+            self._previous, gray, points, None, winSize=(15, 15), maxLevel=2
+        )
+        status = status.reshape(-1).astype(bool)
+
+        start = 0
+        for track in tracks:
+            end = start + len(track.points)
+            good = status[start:end]
+            if good.sum() < 3 or good.mean() < self.min_confidence:
+                # Too few points survived; ask for a fresh detection
+                self._lost = True
+            else:
+                shift = np.median(moved[start:end][good] - track.points[good], axis=0).reshape(-1)
+                track.box[:2] += shift * scale
+                track.points = moved[start:end][good]
+            start = end
+
+    def _correct(self, gray, scale, detections):
+        detections = np.asarray(detections, dtype=np.float64).reshape(-1, 4)
+        predicted = [track for track in self.tracks if track.misses == 0]
+        matched_tracks = set()
+        matched_detections = set()
+        agreement = []
+
+        if self.tracks and len(detections):
+            ious = box_iou([track.box for track in self.tracks], detections)
+            # Greedy matching, best overlaps first
+            for flat in np.argsort(ious, axis=None)[::-1]:
+                t, d = np.unravel_index(flat, ious.shape)
+                if ious[t, d] < self.iou_threshold:
+                    break
+                if t in matched_tracks or d in matched_detections:
+                    continue
+                matched_tracks.add(t)
+                matched_detections.add(d)
+                agreement.append(ious[t, d])
+                self.tracks[t].box = detections[d].copy()
+                self.tracks[t].misses = 0
+
+        survivors = []
+        for t, track in enumerate(self.tracks):
+            if t not in matched_tracks:
+                track.misses += 1
+                if track.misses > self.max_misses:
+                    continue
+            survivors.append(track)
+        self.tracks = survivors
+
+        new_tracks = 0
+        for d, box in enumerate(detections):
+            if d not in matched_detections:
+                self.tracks.append(Track(self._next_id, box))
+                self._next_id += 1
+                new_tracks += 1
+
+        for track in self.tracks:
+            track.points = self._seed_points(gray, track.box / scale) if track.misses == 0 else None
+
+        if self.adaptive:
+            stable = (new_tracks == 0 and len(agreement) == len(predicted)
+                      and all(iou >= 0.5 for iou in agreement))
+            if stable:
+                self.interval = min(self.keyframe_interval, self.interval + 1)
+            else:
+                self.interval = max(self.min_interval, self.interval // 2)
+        else:
+            self.interval = self.keyframe_interval
+
+        self._frames_since_keyframe = 0
+        self._lost = False
+
+    def _seed_points(self, gray, box):
+        """Pick corner points inside a box (given in tracking coordinates)"""
+        height, width = gray.shape[:2]
+        x, y, w, h = box
+        x0, y0 = max(0, int(x)), max(0, int(y))
+        x1, y1 = min(width, int(x + w)), min(height, int(y + h))
+        if x1 - x0 < 3 or y1 - y0 < 3:
+            return None
+
+        mask = np.zeros_like(gray)
+        mask[y0:y1, x0:x1] = 255
+        points = cv2.goodFeaturesToTrack(gray, self.max_points, 0.01, 3, mask=mask)
+        return points.astype(np.float32) if points is not None else None
+
+# Alternative spellings accepted in keybind strings
+KEY_ALIASES = {
+    'win': 'super',
+    'cmd': 'super',
+    'meta': 'super',  # Alternative name for super
+    'escape': 'esc',
+    'return': 'enter',
+    'del': 'delete',
+}
+
+# X keysym names (as understood by xdotool) for the named keys
+XDOTOOL_KEYSYMS = {
+    'ctrl': 'ctrl',
+    'alt': 'alt',
+    'shift': 'shift',
+    'super': 'super',
+    'esc': 'Escape',
+    'enter': 'Return',
+    'tab': 'Tab',
+    'space': 'space',
+    'backspace': 'BackSpace',
+    'delete': 'Delete',
+    'up': 'Up',
+    'down': 'Down',
+    'left': 'Left',
+    'right': 'Right',
+    'home': 'Home',
+    'end': 'End',
+    'pageup': 'Page_Up',
+    'pagedown': 'Page_Down',
+    'insert': 'Insert',
+}
+XDOTOOL_KEYSYMS.update({f'f{i}': f'F{i}' for i in range(1, 13)})
+
+# pynput Key attribute for the named keys
+PYNPUT_KEY_NAMES = {name: name for name in XDOTOOL_KEYSYMS}
+PYNPUT_KEY_NAMES.update({'super': 'cmd', 'pageup': 'page_up', 'pagedown': 'page_down'})
+
+MODIFIER_KEYS = ('ctrl', 'alt', 'shift', 'super')
+
+class KeybindError(ValueError):
+    """Raised for a keybind string that cannot be parsed"""
+
+# A keybind resolved once, when it is edited or loaded. keys is the
+# normalized string, keysyms the X keysym names for xdotool/XTest, and
+# key_names the normalized names (turned into pynput keys only if the
+# pynput fallback is ever used).
+KeybindAction = namedtuple('KeybindAction', ['name', 'keys', 'keysyms', 'key_names'])
+
+def parse_keybind(keys_string):
+    """Split a string like 'ctrl+alt+d' into normalized key names"""
+    names = []
+    for part in keys_string.lower().split('+'):
+        part = part.strip()
+        part = KEY_ALIASES.get(part, part)
+        if not part:
+            raise KeybindError("Empty key in combination")
+        if part not in XDOTOOL_KEYSYMS and len(part) != 1:
+            raise KeybindError(f"Unknown key '{part}'")
+        names.append(part)
+    return names
+
+def compile_keybind(name, keys_string):
+    """Build a KeybindAction; raises KeybindError for invalid keys"""
+    names = parse_keybind(keys_string)
+    keysyms = tuple(XDOTOOL_KEYSYMS.get(key, key) for key in names)
+    return KeybindAction(name, '+'.join(names), keysyms, tuple(names))
+
+def pynput_keys(key_names):
+    """Map normalized key names to pynput (modifiers, keys); imports pynput"""
+    from pynput.keyboard import Key
+
+    resolved = [(key, getattr(Key, PYNPUT_KEY_NAMES[key]) if key in PYNPUT_KEY_NAMES else key)
+                for key in key_names]
+    modifiers = tuple(value for key, value in resolved if key in MODIFIER_KEYS)
+    keys = tuple(value for key, value in resolved if key not in MODIFIER_KEYS)
+    return modifiers, keys
+
+class KeybindDispatcher:
+    """Injects keystrokes on a dedicated thread
+
+    The detection loop only enqueues work and returns immediately; all the
+    key-press delays happen on the dispatcher thread. The cooldown is
+    checked when a trigger is enqueued, a keybind that is already waiting
+    is not queued a second time, and when the bounded queue is full new
+    triggers are dropped rather than blocking the caller.
+
+    inject is called on the dispatcher thread with the payload of each
+    queued keybind.
+    """
+
+    def __init__(self, inject, cooldown_seconds=2, max_pending=16, gap_seconds=0.1):
+        self.inject = inject
+        self.cooldown_seconds = cooldown_seconds
+        self.gap_seconds = gap_seconds
+        self.last_trigger_time = 0
+        self.trigger_count = 0
+        self.dropped_count = 0
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        """Start the dispatcher thread"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="keybinds", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=2):
+        """Stop the dispatcher thread after the keybind being sent finishes"""
+        if self._thread is None:
+            return
+        with self._lock:
+            # Discard anything still waiting; the sentinel must fit
+            while True:
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            self._pending.clear()
+            self._queue.put_nowait(None)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def in_cooldown(self, now=None):
+        """Check whether triggers are currently suppressed"""
+        if now is None:
+            now = time.time()
+        return now - self.last_trigger_time < self.cooldown_seconds
+
+    def trigger(self, keybinds, now=None, cooldown=True):
+        """Queue (key, payload) pairs unless the cooldown is active
+
+        key identifies the keybind for coalescing. Returns True if the
+        trigger was accepted. With cooldown=False the trigger neither
+        waits for the cooldown nor starts it (arrival and departure
+        events, which fire once each anyway).
+        """
+        if now is None:
+            now = time.time()
+        with self._lock:
+            if cooldown:
+                if self.in_cooldown(now):
+                    return False
+                self.last_trigger_time = now
+            self.trigger_count += 1
+
+            for key, payload in keybinds:
+                if key in self._pending:
+                    continue
+                try:
+                    self._queue.put_nowait((key, payload))
+                except queue.Full:
+                    self.dropped_count += 1
+                    print(f"Warning: Keybind queue full, dropped {key}")
+                    continue
+                self._pending.add(key)
+        return True
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+
+            key, payload = item
+            with self._lock:
+                self._pending.discard(key)
+            try:
+                self.inject(payload)
+            except Exception as e:
+                print(f"Error triggering keybind: {e}")
+
+            # Small delay between keybinds
+            if not self._queue.empty():
+                time.sleep(self.gap_seconds)
+
+# Trigger policies for several cameras: name -> label
+TRIGGER_POLICIES = {
+    'any': "Any camera",
+    'quorum': "N of M cameras",
+    'per_camera': "Per-camera keybinds",
+}
+
+class TriggerPolicy:
+    """Decides which cameras' detections fire keybinds
+
+    'any' fires as soon as one camera sees someone. 'quorum' fires once at
+    least quorum cameras have seen someone within window_seconds of each
+    other. 'per_camera' fires the keybinds assigned to the camera that saw
+    someone, plus the ones assigned to all cameras. The cooldown is not
+    handled here; all policies share the KeybindDispatcher's.
+    """
+
+    def __init__(self, mode='any', quorum=2, window_seconds=1.0):
+        self.mode = mode if mode in TRIGGER_POLICIES else 'any'
+        self.quorum = quorum
+        self.window_seconds = window_seconds
+        self._last_seen = {}  # camera -> time it last saw someone
+        self._lock = threading.Lock()
+
+    def update(self, camera, detected, now=None):
+        """Record one camera's result; returns the cameras to fire for"""
+        if now is None:
+            now = time.monotonic()
+        with self._lock:
+            if not detected:
+                return []
+            self._last_seen[camera] = now
+            if self.mode != 'quorum':
+                return [camera]
+            recent = [other for other, seen in self._last_seen.items()
+                      if now - seen <= self.window_seconds]
+            return recent if len(recent) >= self.quorum else []
+
+    def forget(self, camera):
+        """Drop a camera that is no longer monitored"""
+        with self._lock:
+            self._last_seen.pop(camera, None)
+
+    def select(self, bindings, cameras):
+        """Payloads of the (camera, payload) bindings that fire for cameras
+
+        A binding for camera None belongs to every camera.
+        """
+        if self.mode != 'per_camera':
+            return [payload for camera, payload in bindings]
+        return [payload for camera, payload in bindings if camera is None or camera in cameras]
+
+# What a keybind fires on: event -> label
+PRESENCE_EVENTS = {
+    'detection': "Every detection",
+    'enter': "Arrival",
+    'leave': "Departure",
+}
+
+class PresenceMonitor:
+    """Presence state of one camera, which also decides when the detector runs
+
+    absent -> present when someone is seen (an 'enter' event), present ->
+    absent once nobody has been seen for leave_seconds (a 'leave' event).
+    While absent the detector runs on every frame. While someone is
+    present a detection can only matter if it may fire a keybind, which
+    armed() tells (no keybind fires on every detection, or the cooldown
+    is active); otherwise the detector only runs every check_seconds to
+    see whether they are still there. When the cooldown ends armed()
+    turns true again and the camera is re-armed at full rate. A check
+    that finds nobody also returns to full rate until the person is seen
+    again or has left. check_seconds 0 runs the detector on every frame.
+    """
+
+    def __init__(self, check_seconds=1.0, leave_seconds=3.0, armed=None):
+        self.check_seconds = check_seconds
+        self.leave_seconds = leave_seconds
+        self.armed = armed or (lambda: True)
+        self.reset()
+
+    def reset(self):
+        """Forget who was there, without an event"""
+        self.state = 'absent'
+        self.checking = False
+        self._last_seen = 0.0
+        self._last_run = 0.0
+
+    def should_detect(self, now=None):
+        """Check whether the detector must run on this frame (records the run)"""
+        if now is None:
+            now = time.monotonic()
+        if (self.state == 'absent' or self.checking or not self.check_seconds
+                or now - self._last_run >= self.check_seconds or self.armed()):
+            self._last_run = now
+            return True
+        return False
+
+    def update(self, detected, now=None):
+        """Account for one detector run; returns 'enter', 'leave' or None"""
+        if now is None:
+            now = time.monotonic()
+        if detected:
+            self._last_seen = now
+            self.checking = False
+            if self.state == 'absent':
+                self.state = 'present'
+                return 'enter'
+        elif self.state == 'present':
+            self.checking = True
+            if now - self._last_seen >= self.leave_seconds:
+                self.reset()
+                return 'leave'
+        return None
+
+class XTestKeyInjector:
+    """Sends key combinations through one persistent XTest connection
+
+    Unlike running `xdotool key` for every keybind, the X connection is
+    opened once and keysym lookups are cached, so a keybind costs a few
+    requests on an existing socket. Key names use xdotool's spelling
+    ('ctrl', 'super', 'Return', 'F4', 'a', ...). Requires python-xlib and
+    an X server with the XTEST extension (also works under XWayland).
+    """
+
+    # xdotool-style modifier aliases that are not real keysym names
+    KEYSYM_ALIASES = {
+        'ctrl': 'Control_L',
+        'alt': 'Alt_L',
+        'shift': 'Shift_L',
+        'super': 'Super_L',
+    }
+
+    def __init__(self, display_name=None):
+        from Xlib import X, XK, display
+        from Xlib.ext import xtest
+
+        self._X = X
+        self._XK = XK
+        self._xtest = xtest
+        self._display = display.Display(display_name)
+        if not self._display.has_extension('XTEST'):
+            self._display.close()
+            raise RuntimeError("X server does not support the XTEST extension")
+        self._keycodes = {}
+
+    def keycode(self, name):
+        """Resolve a key name to a keycode (cached); None if unknown"""
+        if name in self._keycodes:
+            return self._keycodes[name]
+
+        keysym = self._XK.string_to_keysym(self.KEYSYM_ALIASES.get(name, name))
+        if not keysym and len(name) == 1:
+            keysym = ord(name)
+        keycode = self._display.keysym_to_keycode(keysym) if keysym else 0
+        self._keycodes[name] = keycode or None
+        return self._keycodes[name]
+
+    def send(self, names):
+        """Press the keys in order and release them in reverse
+
+        Returns False, without sending anything, if a key cannot be mapped.
+        """
+        keycodes = [self.keycode(name) for name in names]
+        if not keycodes or None in keycodes:
+            return False
+
+        for keycode in keycodes:
+            self._xtest.fake_input(self._display, self._X.KeyPress, keycode)
+        for keycode in reversed(keycodes):
+            self._xtest.fake_input(self._display, self._X.KeyRelease, keycode)
+        self._display.sync()
+        return True
+
+    def close(self):
+        self._display.close()
+
+class KeyInjector:
+    """Sends compiled keybinds with the best method available
+
+    On Linux the persistent XTest connection is tried first, then xdotool,
+    then pynput; elsewhere pynput is used. Only call it from one thread
+    (the keybind dispatcher).
+    """
+
+    def __init__(self):
+        self.keyboard = None
+        self.pynput_cache = {}  # keys string -> (modifiers, keys)
+        self.xtest_injector = None
+        self.xtest_unavailable = False
+
+    def trigger(self, action):
+        """Send a compiled keybind"""
+        # For Linux, try the persistent XTest connection, then xdotool
+        # (more reliable than pynput), then fall back to pynput
+        if platform.system() == "Linux":
+            if self.trigger_xtest(action):
+                return
+            if self.trigger_xdotool(action):
+                return
+
+        # Fall back to pynput (Windows and Linux fallback)
+        self.trigger_pynput(action)
+
+    def trigger_xtest(self, action):
+        """Trigger keybind over a persistent XTest connection (Linux/X11 only)"""
+        if self.xtest_unavailable:
+            return False
+
+        try:
+            if self.xtest_injector is None:
+                self.xtest_injector = XTestKeyInjector()
+                print("✓ Using XTest for keybinds")
+            return self.xtest_injector.send(action.keysyms)
+        except ImportError:
+            # python-xlib not installed; don't try again
+            self.xtest_unavailable = True
+        except Exception as e:
+            print(f"XTest error: {e}")
+            self.xtest_unavailable = True
+            self.xtest_injector = None
+        return False
+
+    def trigger_xdotool(self, action):
+        """Trigger keybind using xdotool (Linux only, more reliable)"""
+        try:
+            if action.keysyms:
+                # Build xdotool command
+                cmd = ['xdotool', 'key', '+'.join(action.keysyms)]
+                subprocess.run(cmd, check=True, capture_output=True, timeout=1)
+                return True
+
+        except (subprocess.CalledProcessError, FileNotFoundError, subprocess.TimeoutExpired):
+            # xdotool not available or failed, will fall back to pynput
+            return False
+        except Exception as e:
+            print(f"xdotool error: {e}")
+            return False
+
+        return False
+
+    def trigger_pynput(self, action):
+        """Trigger keybind using pynput (cross-platform fallback)"""
+        try:
+            # pynput is only imported the first time it is actually needed
+            if self.keyboard is None:
+                from pynput.keyboard import Controller
+                self.keyboard = Controller()
+            if action.keys not in self.pynput_cache:
+                self.pynput_cache[action.keys] = pynput_keys(action.key_names)
+            modifiers, regular_keys = self.pynput_cache[action.keys]
+
+            # Press all modifier keys first
+            for mod in modifiers:
+                self.keyboard.press(mod)
+
+            # Small delay to ensure modifiers are registered
+            time.sleep(0.05)
+
+            # Press and release regular keys while holding modifiers
+            for key in regular_keys:
+                self.keyboard.press(key)
+                time.sleep(0.02)
+                self.keyboard.release(key)
+                time.sleep(0.02)
+
+            # Small delay before releasing modifiers
+            time.sleep(0.05)
+
+            # Release all modifier keys
+            for mod in reversed(modifiers):
+                self.keyboard.release(mod)
+
+        except Exception as e:
+            print(f"Error triggering keybind: {e}")
+
+def _pool_worker(cascade_paths, task_queue, result_queue):
+    """Worker process loop: detect humans in frames placed in shared memory"""
+    detectors = {}  # engine -> Detector, built when first asked for
+    zones = DetectionZones()
+    attached = {}  # slot name -> mapping, kept while the ring generation lasts
+    generation = None
+
+    try:
+        while True:
+            task = task_queue.get()
+            if task is None:
+                break
+
+            (seq, slot, ring_generation, shm_name, shape, dtype, detection_size, zone_list,
+             engine, engine_params, min_score) = task
+            if zone_list != zones.zones:
+                zones.set_zones(zone_list)
+            start = time.perf_counter()
+            try:
+                detector = detectors.get(engine)
+                if detector is None:
+                    detector = detectors[engine] = create_detector(engine, cascade_paths)
+                detector.params = engine_params
+                if ring_generation != generation:
+                    # The ring was reallocated; drop the stale mappings
+                    for old in attached.values():
+                        old.close()
+                    attached.clear()
+                    generation = ring_generation
+                shm = attached.get(shm_name)
+                if shm is None:
+                    shm = attached[shm_name] = shared_memory.SharedMemory(name=shm_name)
+
+                frame = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+                timings = []
+                humans = detect_humans(detector, frame, detection_size, timings=timings, zones=zones,
+                                       min_score=min_score)
+                del frame
+            except Exception as e:
+                print(f"Detection worker error: {e}")
+                humans = []
+                timings = []
+
+            result_queue.put((seq, slot, humans, time.perf_counter() - start, timings))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for shm in attached.values():
+            shm.close()
+
+class ProcessPoolDetector:
+    """Runs a detection engine in a pool of worker processes
+
+    Frames are copied into a ring of shared-memory slots rather than
+    pickled, and only a small task tuple crosses the process boundary.
+    The engine and its settings travel with every task, so they can be
+    changed without restarting the workers. Every submitted frame gets a
+    sequence number and results are handed back strictly in submission
+    order, even when workers finish out of order.
+    """
+
+    def __init__(self, cascade_paths, num_workers=0, num_slots=0, detection_size=0, zones=None,
+                 engine='haar', engine_params=None, min_score=0.5):
+        if num_workers <= 0:
+            num_workers = max(1, (os.cpu_count() or 2) - 1)
+        self.cascade_paths = list(cascade_paths)
+        self.num_workers = num_workers
+        self.detection_size = detection_size
+        self.zones = zones if zones is not None else DetectionZones()
+        self.engine = engine
+        self.engine_params = dict(engine_params or {})
+        self.min_score = min_score
+        # Two slots per worker keeps every worker busy while results drain
+        self.num_slots = num_slots if num_slots > 0 else num_workers * 2
+
+        # spawn keeps the workers free of the parent's threads and GUI state
+        self._context = multiprocessing.get_context('spawn')
+        self._task_queue = None
+        self._result_queue = None
+        self._processes = []
+
+        self._slots = []
+        self._slot_size = 0
+        self._free_slots = []
+        self._generation = 0  # bumped on every reallocation of the ring
+        self._next_seq = 0
+        self._next_result_seq = 0
+        self._finished = {}
+
+    def start(self):
+        """Start the worker processes"""
+        self._task_queue = self._context.Queue()
+        self._result_queue = self._context.Queue()
+        for i in range(self.num_workers):
+            process = self._context.Process(
+                target=_pool_worker,
+                args=(self.cascade_paths, self._task_queue, self._result_queue),
+                name=f"detection-{i}",
+                daemon=True
+            )
+            process.start()
+            self._processes.append(process)
+        print(f"✓ Started {self.num_workers} detection process(es)")
+
+    def stop(self):
+        """Stop the worker processes and free the shared memory"""
+        for _ in self._processes:
+            self._task_queue.put(None)
+        for process in self._processes:
+            process.join(timeout=2)
+            if process.is_alive():
+                process.terminate()
+        self._processes = []
+
+        for queue_ in (self._task_queue, self._result_queue):
+            if queue_ is not None:
+                queue_.close()
+                queue_.join_thread()
+        self._task_queue = None
+        self._result_queue = None
+        self._release_slots()
+
+    def in_flight(self):
+        """Number of frames submitted but not yet returned"""
+        return self._next_seq - self._next_result_seq
+
+    def has_free_slot(self):
+        """Check whether another frame can be submitted"""
+        return not self._slots or bool(self._free_slots)
+
+    def submit(self, frame):
+        """Copy a frame into a free slot and queue it for detection
+
+        Returns the frame's sequence number, or None if every slot is busy.
+        """
+        if frame.nbytes > self._slot_size:
+            # Frames grew (e.g. camera changed): wait until the ring is idle
+            if self.in_flight():
+                return None
+            self._allocate_slots(frame.nbytes)
+        if not self._free_slots:
+            return None
+
+        slot = self._free_slots.pop()
+        shm = self._slots[slot]
+        view = np.ndarray(frame.shape, dtype=frame.dtype, buffer=shm.buf)
+        np.copyto(view, frame)
+        del view
+
+        seq = self._next_seq
+        self._next_seq += 1
+        self._task_queue.put((seq, slot, self._generation, shm.name, frame.shape, frame.dtype.str,
+                              self.detection_size, self.zones.zones,
+                              self.engine, self.engine_params, self.min_score))
+        return seq
+
+    def collect(self, timeout=0):
+        """Return finished results in sequence order
+
+        Each result is (seq, humans, elapsed, cascade_times).
+
+        Blocks up to timeout seconds for the first result to arrive.
+        """
+        block = timeout > 0
+        while self.in_flight() > len(self._finished):
+            try:
+                seq, slot, humans, elapsed, timings = self._result_queue.get(block, timeout if block else None)
+            except queue.Empty:
+                break
+            self._free_slots.append(slot)
+            self._finished[seq] = (humans, elapsed, timings)
+            block = False
+
+        results = []
+        while self._next_result_seq in self._finished:
+            seq = self._next_result_seq
+            humans, elapsed, timings = self._finished.pop(seq)
+            results.append((seq, humans, elapsed, timings))
+            self._next_result_seq += 1
+        return results
+
+    def _allocate_slots(self, size):
+        """(Re)create the shared-memory ring with slots of the given size"""
+        self._release_slots()
+        self._generation += 1
+        self._slots = [shared_memory.SharedMemory(create=True, size=size)
+                       for _ in range(self.num_slots)]
+        self._slot_size = size
+        self._free_slots = list(range(self.num_slots))
+
+    def _release_slots(self):
+        for shm in self._slots:
+            try:
+                shm.close()
+                shm.unlink()
+            except FileNotFoundError:
+                pass
+        self._slots = []
+        self._slot_size = 0
+        self._free_slots = []
+
+# Result of one pass of the detection worker over a captured frame.
+# cascade_times holds the seconds spent in each cascade (empty if skipped);
+# track_ids lines up with humans when tracking is on, and is empty otherwise.
+DetectionResult = namedtuple('DetectionResult', ['seq', 'frame', 'humans', 'detection_time',
+                                                 'cascade_times', 'track_ids'])
+
+# Where detection runs: in the detection thread, or in a pool of processes
+DETECTION_BACKENDS = {
+    'thread': "In-process",
+    'process': "Process pool",
+}
+
+class LatestFrameBuffer:
+    """One-slot frame buffer that always holds the newest frame
+
+    Writers overwrite the slot instead of queueing, so a slow reader only
+    ever sees the most recent frame and never falls behind the camera.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._frame = None
+        self._seq = 0
+        self._read_seq = 0
+        self._closed = False
+
+    def put(self, frame, wait=False):
+        """Store a frame, replacing whatever was in the slot
+        
+        With wait=True the previous frame is never overwritten before a
+        reader has taken it, so no frames are dropped (used for offline
+        sources that can produce frames faster than they are detected).
+        """
+        with self._condition:
+            if wait:
+                self._condition.wait_for(lambda: self._read_seq >= self._seq or self._closed)
+            self._frame = frame
+            self._seq += 1
+            self._condition.notify_all()
+
+    @property
+    def seq(self):
+        """Sequence number of the newest frame stored so far"""
+        return self._seq
+
+    def get(self, last_seq=0, timeout=None):
+        """Wait for a frame newer than last_seq
+        
+        Returns (seq, frame), or (last_seq, None) on timeout or close.
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self._seq > last_seq or self._closed, timeout)
+            if self._seq > last_seq:
+                self._read_seq = self._seq
+                self._condition.notify_all()
+                return self._seq, self._frame
+            return last_seq, None
+
+    def close(self):
+        """Wake up all waiting readers"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+class FrameSource:
+    """Base class for the things the capture thread can read frames from
+
+    Sources follow the small part of the cv2.VideoCapture interface the
+    pipeline uses (isOpened, read, release), so a VideoCapture can be
+    used directly as well. Offline sources pace themselves to their frame
+    rate when realtime is True and otherwise deliver frames as fast as
+    they are read; ended is set once a finite source has no more frames.
+    """
+
+    description = "Frame source"
+
+    def __init__(self, fps=30.0, realtime=True):
+        self.fps = fps
+        self.realtime = realtime
+        self.ended = False
+        self._next_frame_time = None
+
+    def isOpened(self):
+        return True
+
+    def read(self):
+        raise NotImplementedError
+
+    def release(self):
+        pass
+
+    def _pace(self):
+        """Sleep until the next frame is due (realtime mode only)"""
+        if not self.realtime or self.fps <= 0:
+            return
+        now = time.perf_counter()
+        if self._next_frame_time is None or now - self._next_frame_time > 1.0:
+            # First frame, or we fell far behind: restart the clock
+            self._next_frame_time = now
+        elif self._next_frame_time > now:
+            time.sleep(self._next_frame_time - now)
+        self._next_frame_time += 1.0 / self.fps
+
+# How a camera is asked to deliver frames. 0 and '' keep the driver's
+# default; gray delivers single-channel luma frames instead of BGR.
+CaptureProfile = namedtuple('CaptureProfile',
+                            ['width', 'height', 'fps', 'fourcc', 'buffer_size', 'backend', 'gray'])
+
+DEFAULT_CAPTURE_PROFILE = CaptureProfile(0, 0, 0, '', 1, 'auto', False)
+
+# VideoCapture backends a profile can ask for: name -> API preference
+CAPTURE_BACKENDS = {
+    'auto': cv2.CAP_ANY,
+    'v4l2': cv2.CAP_V4L2,
+    'dshow': cv2.CAP_DSHOW,
+    'msmf': cv2.CAP_MSMF,
+}
+
+CAPTURE_FOURCCS = ['', 'MJPG', 'YUYV']
+
+def capture_profile_from_settings(item):
+    """Build a CaptureProfile from its detection_settings.json form"""
+    fourcc = str(item.get('fourcc', '')).upper()
+    backend = str(item.get('backend', 'auto')).lower()
+    return CaptureProfile(
+        width=int(item.get('width', 0)),
+        height=int(item.get('height', 0)),
+        fps=float(item.get('fps', 0)),
+        fourcc=fourcc if len(fourcc) == 4 else '',
+        buffer_size=int(item.get('buffer_size', DEFAULT_CAPTURE_PROFILE.buffer_size)),
+        backend=backend if backend in CAPTURE_BACKENDS else 'auto',
+        gray=bool(item.get('gray', False))
+    )
+
+def decode_fourcc(value):
+    """Turn CAP_PROP_FOURCC's number back into e.g. 'MJPG'"""
+    code = int(value).to_bytes(4, 'little').decode('ascii', 'replace')
+    return code if int(value) and code.isprintable() else ''
+
+class CameraSource(FrameSource):
+    """Live camera opened by index or device path
+
+    The capture profile is applied when the camera opens, format first
+    since V4L2 drivers pick the sizes and rates per format, and mode then
+    describes what the driver actually agreed to. With gray set, frames
+    are read without the driver's colour conversion and reduced to luma:
+    YUYV by taking the Y plane, MJPG by decoding only the luma.
+    """
+
+    def __init__(self, index=0, profile=None):
+        super().__init__()
+        self.index = index
+        self.profile = profile or DEFAULT_CAPTURE_PROFILE
+        self.description = f"Camera {index}"
+        self.mode = ""
+        self.raw = False
+        self.frame_size = (0, 0)  # size of the last frame read
+        self.capture = cv2.VideoCapture(index, CAPTURE_BACKENDS.get(self.profile.backend, cv2.CAP_ANY))
+        if self.capture.isOpened():
+            self._negotiate()
+
+    def _negotiate(self):
+        profile = self.profile
+        if profile.fourcc:
+            self.capture.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*profile.fourcc))
+        if profile.width and profile.height:
+            self.capture.set(cv2.CAP_PROP_FRAME_WIDTH, profile.width)
+            self.capture.set(cv2.CAP_PROP_FRAME_HEIGHT, profile.height)
+        if profile.fps:
+            self.capture.set(cv2.CAP_PROP_FPS, profile.fps)
+        if profile.buffer_size:
+            # Fewer queued frames means fresher frames
+            self.capture.set(cv2.CAP_PROP_BUFFERSIZE, profile.buffer_size)
+        if profile.gray:
+            self.raw = bool(self.capture.set(cv2.CAP_PROP_CONVERT_RGB, 0))
+
+        width = int(self.capture.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(self.capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        fps = self.capture.get(cv2.CAP_PROP_FPS)
+        if fps and fps > 0:
+            self.fps = fps
+        fourcc = decode_fourcc(self.capture.get(cv2.CAP_PROP_FOURCC))
+        try:
+            backend = self.capture.getBackendName()
+        except cv2.error:
+            backend = ""
+        parts = [fourcc, f"{width}x{height}" if width and height else "", f"@ {fps:g} fps" if fps and fps > 0 else ""]
+        if profile.gray:
+            parts.append("gray")
+        self.mode = " ".join(part for part in parts if part)
+        if backend:
+            self.mode += f" ({backend})"
+
+    def isOpened(self):
+        return self.capture.isOpened()
+
+    def read(self):
+        ret, frame = self.capture.read()
+        if ret and self.profile.gray:
+            frame = self._luma(frame)
+        if ret:
+            self.frame_size = (frame.shape[1], frame.shape[0])
+        return ret, frame
+
+    def _luma(self, frame):
+        if frame.ndim == 3 and frame.shape[2] == 2:
+            # Raw YUYV: Y, U/V interleaved per pixel
+            return cv2.extractChannel(frame, 0)
+        if self.raw and (frame.ndim == 1 or frame.shape[0] == 1):
+            # Raw MJPG: a compressed buffer; decoding only the luma skips
+            # the chroma upsampling and colour conversion
+            gray = cv2.imdecode(frame.reshape(-1), cv2.IMREAD_GRAYSCALE)
+            if gray is not None:
+                return gray
+        if frame.ndim == 3:
+            return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        return frame
+
+    def get(self, prop):
+        return self.capture.get(prop)
+
+    def set(self, prop, value):
+        return self.capture.set(prop, value)
+
+    def negotiated_profile(self):
+        """The profile with the size and rate the driver is delivering now"""
+        width = int(self.capture.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(self.capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        if not (width and height):
+            # Some backends do not report the size; the frames do
+            width, height = self.frame_size
+        fps = self.capture.get(cv2.CAP_PROP_FPS)
+        return self.profile._replace(width=width, height=height,
+                                     fps=fps if fps and fps > 0 else self.profile.fps or self.fps)
+
+    def set_profile(self, profile):
+        """Renegotiate a running camera (call from the thread that reads it)"""
+        self.profile = profile
+        self._negotiate()
+
+    def release(self):
+        self.capture.release()
+
+class VideoFileSource(FrameSource):
+    """Recorded video file, paced to its own frame rate unless realtime=False"""
+
+    def __init__(self, path, realtime=True, loop=False):
+        self.capture = cv2.VideoCapture(path)
+        fps = self.capture.get(cv2.CAP_PROP_FPS) if self.capture.isOpened() else 0
+        super().__init__(fps if fps and fps > 0 else 30.0, realtime)
+        self.path = path
+        self.loop = loop
+        self.description = f"Video {os.path.basename(path)}"
+
+    def isOpened(self):
+        return self.capture.isOpened()
+
+    def read(self):
+        if self.ended:
+            return False, None
+        ret, frame = self.capture.read()
+        if not ret and self.loop:
+            self.capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.capture.read()
+        if not ret:
+            self.ended = True
+            return False, None
+        self._pace()
+        return True, frame
+
+    def release(self):
+        self.capture.release()
+
+class ImageDirectorySource(FrameSource):
+    """Image sequence from a directory, read in file name order"""
+
+    EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.tif', '.tiff', '.webp', '.pgm', '.ppm')
+
+    def __init__(self, path, fps=10.0, realtime=True, loop=False):
+        super().__init__(fps, realtime)
+        self.path = path
+        self.loop = loop
+        self.description = f"Images {os.path.basename(os.path.normpath(path))}"
+        try:
+            names = sorted(os.listdir(path))
+        except OSError:
+            names = []
+        self.files = [os.path.join(path, name) for name in names
+                      if name.lower().endswith(self.EXTENSIONS)]
+        self.position = 0
+
+    def isOpened(self):
+        return bool(self.files)
+
+    def read(self):
+        while not self.ended:
+            if self.position >= len(self.files):
+                if not self.loop or not self.files:
+                    self.ended = True
+                    break
+                self.position = 0
+            path = self.files[self.position]
+            self.position += 1
+            frame = cv2.imread(path, cv2.IMREAD_COLOR)
+            if frame is None:
+                print(f"⚠ Could not read image: {path}")
+                continue
+            self._pace()
+            return True, frame
+        return False, None
+
+class SyntheticSource(FrameSource):
+    """Deterministic test scene with person-like figures walking across it
+
+    Frame n is a pure function of n and the constructor arguments, so runs
+    are reproducible. frames limits the length of the sequence (0 =
+    endless).
+    """
+
+    def __init__(self, width=640, height=480, fps=30.0, people=2, frames=0, seed=0, realtime=True):
+        super().__init__(fps, realtime)
+        self.width = width
+        self.height = height
+        self.frames = frames
+        self.description = f"Synthetic {width}x{height}@{fps:g}"
+        self.frame_index = 0
+
+        rng = np.random.RandomState(seed)
+        self.background = rng.randint(30, 70, size=(height, width, 3)).astype(np.uint8)
+        # Per figure: height fraction, start x fraction, speed (px per frame), colour
+        self.people = [(rng.uniform(0.45, 0.8), rng.uniform(0, 1), rng.uniform(1.5, 4.0) * rng.choice([-1, 1]),
+                        tuple(int(c) for c in rng.randint(120, 230, size=3)))
+                       for _ in range(people)]
+
+    def render(self, n):
+        """Draw frame n of the sequence"""
+        frame = self.background.copy()
+        for fraction, start, speed, colour in self.people:
+            body_height = int(self.height * fraction)
+            body_width = max(4, body_height // 3)
+            travel = self.width + body_width
+            x = int((start * travel + speed * n) % travel) - body_width // 2
+            top = self.height - body_height - self.height // 20
+            head = body_height // 8
+            cx = x + body_width // 2
+            cv2.circle(frame, (cx, top + head), head, colour, -1)
+            cv2.rectangle(frame, (x, top + 2 * head), (x + body_width, top + body_height * 3 // 5), colour, -1)
+            # Legs swing with the walking phase
+            stride = int(body_width * 0.4 * np.sin(n * abs(speed) * 0.15))
+            hip = top + body_height * 3 // 5
+            for offset in (stride, -stride):
+                cv2.line(frame, (cx, hip), (cx + offset, top + body_height), colour, max(2, body_width // 4))
+        return frame
+
+    def read(self):
+        if self.frames and self.frame_index >= self.frames:
+            self.ended = True
+            return False, None
+        frame = self.render(self.frame_index)
+        self.frame_index += 1
+        self._pace()
+        return True, frame
+
+def parse_synthetic_spec(spec):
+    """Parse 'synthetic[:WIDTHxHEIGHT][@FPS]' into SyntheticSource arguments"""
+    options = {}
+    rest = spec[len('synthetic'):].lstrip(':')
+    if '@' in rest:
+        rest, fps = rest.split('@', 1)
+        options['fps'] = float(fps)
+    if rest:
+        width, height = rest.lower().split('x')
+        options['width'], options['height'] = int(width), int(height)
+    return options
+
+def is_camera_spec(spec):
+    """Check whether a source spec names a live camera"""
+    if isinstance(spec, int):
+        return True
+    return spec.isdigit() or spec.startswith('/dev/video')
+
+def open_frame_source(spec, realtime=True, loop=False, profile=None):
+    """Open a frame source from a camera index, path or 'synthetic' spec
+
+    Integers, digit strings and /dev/video* paths open cameras, a
+    directory is read as an image sequence, 'synthetic[:WxH][@FPS]' is
+    the generated test scene, and anything else is opened as a video
+    file. realtime=False lets offline sources run as fast as possible.
+    profile is the CaptureProfile for cameras.
+    """
+    if is_camera_spec(spec):
+        return CameraSource(int(spec) if str(spec).isdigit() else spec, profile)
+    if spec.startswith('synthetic'):
+        return SyntheticSource(realtime=realtime, **parse_synthetic_spec(spec))
+    if os.path.isdir(spec):
+        return ImageDirectorySource(spec, realtime=realtime, loop=loop)
+    return VideoFileSource(spec, realtime=realtime, loop=loop)
+
+# A camera found by discover_cameras. path is the /dev/video* node (None
+# where there are none), modes a list of "FOURCC WIDTHxHEIGHT" strings.
+CameraInfo = namedtuple('CameraInfo', ['index', 'name', 'path', 'modes'])
+
+# V4L2 ioctls and flags (linux/videodev2.h)
+VIDIOC_QUERYCAP = 0x80685600
+VIDIOC_ENUM_FMT = 0xC0405602
+VIDIOC_ENUM_FRAMESIZES = 0xC02C564A
+V4L2_CAP_VIDEO_CAPTURE = 0x00000001
+V4L2_CAP_VIDEO_CAPTURE_MPLANE = 0x00001000
+V4L2_CAP_DEVICE_CAPS = 0x80000000
+V4L2_BUF_TYPE_VIDEO_CAPTURE = 1
+V4L2_FRMSIZE_TYPE_DISCRETE = 1
+
+def _v4l2_ioctl(fd, request, fmt, *values):
+    """Run an ioctl on a packed struct; returns the unpacked result or None"""
+    import fcntl
+    try:
+        return struct.unpack(fmt, fcntl.ioctl(fd, request, struct.pack(fmt, *values)))
+    except OSError:
+        return None
+
+def query_v4l2_device(path, max_modes=32):
+    """Read a V4L2 node's name, capture capability and frame sizes
+
+    Returns (name, is_capture, modes), or None if the node cannot be
+    opened. Only non-blocking ioctls are used, so this never waits for
+    the camera to start streaming.
+    """
+    try:
+        fd = os.open(path, os.O_RDWR | os.O_NONBLOCK)
+    except OSError:
+        return None
+    try:
+        cap = _v4l2_ioctl(fd, VIDIOC_QUERYCAP, '16s32s32sIII12x', b'', b'', b'', 0, 0, 0)
+        if cap is None:
+            return None
+        name = cap[1].split(b'\0', 1)[0].decode(errors='replace')
+        caps = cap[5] if cap[4] & V4L2_CAP_DEVICE_CAPS else cap[4]
+        is_capture = bool(caps & (V4L2_CAP_VIDEO_CAPTURE | V4L2_CAP_VIDEO_CAPTURE_MPLANE))
+
+        modes = []
+        for fmt_index in range(16) if is_capture else ():
+            fmt = _v4l2_ioctl(fd, VIDIOC_ENUM_FMT, 'III32sII12x',
+                              fmt_index, V4L2_BUF_TYPE_VIDEO_CAPTURE, 0, b'', 0, 0)
+            if fmt is None:
+                break
+            pixel_format = fmt[4]
+            fourcc = struct.pack('<I', pixel_format).decode(errors='replace').strip()
+            for size_index in range(64):
+                size = _v4l2_ioctl(fd, VIDIOC_ENUM_FRAMESIZES, 'IIIIIIIII8x',
+                                   size_index, pixel_format, 0, 0, 0, 0, 0, 0, 0)
+                if size is None:
+                    break
+                if size[2] == V4L2_FRMSIZE_TYPE_DISCRETE:
+                    modes.append(f"{fourcc} {size[3]}x{size[4]}")
+                else:
+                    # Stepwise/continuous: report the largest size
+                    modes.append(f"{fourcc} up to {size[4]}x{size[7]}")
+                    break
+                if len(modes) >= max_modes:
+                    return name, is_capture, modes
+        return name, is_capture, modes
+    finally:
+        os.close(fd)
+
+def list_video_devices():
+    """Capture-capable /dev/video* nodes as CameraInfo, without opening them in OpenCV
+
+    Metadata nodes (a second node many UVC cameras expose) are skipped.
+    Returns None where there is no /dev/video* (Windows, macOS).
+    """
+    paths = glob.glob('/dev/video*')
+    if not paths:
+        return None
+
+    cameras = []
+    for path in sorted(paths, key=lambda p: int(re.sub(r'\D', '', p) or 0)):
+        number = re.sub(r'\D', '', os.path.basename(path))
+        if not number:
+            continue
+        info = query_v4l2_device(path)
+        if info is not None:
+            name, is_capture, modes = info
+            if not is_capture:
+                continue
+        else:
+            # No access to the node; fall back to the sysfs name and let
+            # the probe decide
+            name, modes = '', []
+            try:
+                with open(f"/sys/class/video4linux/video{number}/name") as f:
+                    name = f.read().strip()
+            except OSError:
+                pass
+        cameras.append(CameraInfo(int(number), name, path, modes))
+    return cameras
+
+def probe_camera(index):
+    """Open a camera and read one frame; returns the frame size or None"""
+    capture = cv2.VideoCapture(index)
+    try:
+        if not capture.isOpened():
+            return None
+        ret, frame = capture.read()
+        return frame.shape[1::-1] if ret else None
+    finally:
+        capture.release()
+
+def discover_cameras(max_index=10, timeout=3.0, in_use=()):
+    """Find working cameras, probing candidates concurrently
+
+    On Linux the candidates come from /dev/video* and V4L2 capability
+    queries; elsewhere indices 0..max_index-1 are tried. Every candidate
+    is opened in its own thread and must deliver a frame within timeout
+    seconds. Indices in in_use are assumed to work (an open camera cannot
+    always be opened twice). Returns a list of CameraInfo.
+    """
+    candidates = list_video_devices()
+    if candidates is None:
+        candidates = [CameraInfo(i, '', None, []) for i in range(max_index)]
+
+    to_probe = [camera for camera in candidates if camera.index not in in_use]
+    if not to_probe:
+        return candidates
+
+    # Daemon threads rather than an executor: a probe stuck in the driver
+    # must not keep the process alive at exit
+    sizes = {}
+
+    def probe(index):
+        try:
+            sizes[index] = probe_camera(index)
+        except Exception:
+            pass
+
+    threads = [threading.Thread(target=probe, args=(camera.index,), name="camera-probe", daemon=True)
+               for camera in to_probe]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + timeout
+    for thread in threads:
+        thread.join(max(0.0, deadline - time.monotonic()))
+
+    cameras = []
+    probed = {camera.index for camera in to_probe}
+    for camera in candidates:
+        if camera.index not in probed:
+            cameras.append(camera)
+            continue
+        size = sizes.get(camera.index)
+        if size is None:
+            continue
+        if not camera.modes:
+            camera = camera._replace(modes=[f"{size[0]}x{size[1]}"])
+        cameras.append(camera)
+    return cameras
+
+def camera_cache_path():
+    """Where the last known camera list is kept"""
+    return cache_path('cameras.json')
+
+def load_camera_cache(path=None):
+    """Cameras from the last successful discovery (empty if none)"""
+    try:
+        with open(path or camera_cache_path(), 'r') as f:
+            return [CameraInfo(int(item['index']), item.get('name', ''), item.get('path'), list(item.get('modes', [])))
+                    for item in json.load(f)]
+    except (OSError, ValueError, KeyError, TypeError):
+        return []
+
+def save_camera_cache(cameras, path=None):
+    path = path or camera_cache_path()
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        write_file_atomic(path, json.dumps([camera._asdict() for camera in cameras], indent=2))
+    except OSError as e:
+        print(f"⚠ Failed to save camera cache: {e}")
+
+class CaptureThread(threading.Thread):
+    """Reads frames from a frame source as fast as it delivers them
+
+    Frames from live sources overwrite each other in the buffer; frames
+    from sources running without wall-clock pacing are handed over one by
+    one so none are skipped. The thread ends when a finite source runs out
+    of frames, with ended set and on_end called. With an IdleMonitor,
+    live sources switch between the active and idle modes here, since
+    only the thread that reads a camera may renegotiate it; on_idle is
+    called with True or False after every switch.
+    """
+
+    def __init__(self, camera, frame_buffer, on_end=None, idle=None, on_idle=None):
+        super().__init__(name="capture", daemon=True)
+        self.camera = camera
+        self.frame_buffer = frame_buffer
+        self.on_end = on_end
+        self.idle = idle
+        self.on_idle = on_idle
+        self.ended = False
+        self._active_profile = None
+        self._stop_event = threading.Event()
+
+    def _switch_mode(self, idle):
+        if hasattr(self.camera, 'set_profile'):
+            if idle:
+                self._active_profile = self.camera.negotiated_profile()
+                self.camera.set_profile(self._active_profile._replace(
+                    width=self.idle.width, height=self.idle.height, fps=self.idle.fps))
+            elif self._active_profile is not None:
+                self.camera.set_profile(self._active_profile)
+        if self.on_idle is not None:
+            self.on_idle(idle)
+
+    def run(self):
+        lossless = not getattr(self.camera, 'realtime', True)
+        idle = None if lossless else self.idle
+        last_put = 0.0
+        while not self._stop_event.is_set():
+            ret, frame = self.camera.read()
+            if not ret:
+                if getattr(self.camera, 'ended', False):
+                    self.ended = True
+                    if self.on_end is not None:
+                        self.on_end()
+                    break
+                # Avoid spinning when the device stops delivering frames
+                time.sleep(0.01)
+                continue
+            if idle is not None:
+                now = time.monotonic()
+                if idle.check(frame, now):
+                    self._switch_mode(idle.idle)
+                if idle.idle:
+                    # Drivers may not offer the idle rate; thin the frames out here
+                    if now - last_put < 1.0 / idle.fps:
+                        continue
+                    last_put = now
+            self.frame_buffer.put(frame, wait=lossless)
+        if self.idle is not None and self.idle.idle:
+            self._switch_mode(False)
+
+    def stop(self):
+        self._stop_event.set()
+
+class DetectionWorker(threading.Thread):
+    """Runs detection on the newest captured frame and reports results
+
+    detect is called with a BGR frame and a list to append per-stage
+    timings to, and returns a list of (x, y, w, h) boxes. is_enabled is
+    polled before each frame so detection can be toggled without
+    restarting the worker. on_result receives a
+    DetectionResult for every processed frame. When a MotionGate is given,
+    frames it rejects reuse the previous boxes instead of being scanned.
+    When a BoxTracker is given and enabled, the detector only runs on the
+    tracker's keyframes and the reported boxes come from the tracks. A
+    PresenceMonitor can hold the detector back while someone is known to
+    be there; those frames also reuse the previous boxes.
+    Results and the time spent waiting for frames are recorded in
+    PipelineMetrics when given, under source when several cameras share
+    the metrics.
+    """
+
+    def __init__(self, frame_buffer, detect, is_enabled, on_result, motion_gate=None, tracker=None,
+                 metrics=None, source=None, presence=None):
+        super().__init__(name="detection", daemon=True)
+        self.frame_buffer = frame_buffer
+        self.detect = detect
+        self.is_enabled = is_enabled
+        self.on_result = on_result
+        self.motion_gate = motion_gate
+        self.tracker = tracker
+        self.presence = presence
+        self.metrics = metrics
+        self.source = source
+        self._stop_event = threading.Event()
+
+    def run(self):
+        last_seq = 0
+        last_humans = []
+        last_ids = []
+        wait_start = time.perf_counter()
+        while not self._stop_event.is_set():
+            seq, frame = self.frame_buffer.get(last_seq, timeout=0.1)
+            if frame is None:
+                continue
+            last_seq = seq
+            wait_time = time.perf_counter() - wait_start
+            
+            tracking = self.tracker is not None and self.tracker.enabled
+            if not tracking and self.tracker is not None and self.tracker.tracks:
+                self.tracker.reset()
+            
+            humans = []
+            track_ids = []
+            detection_time = 0.0
+            timings = []
+            if not self.is_enabled():
+                last_humans = []
+                last_ids = []
+                if self.tracker is not None:
+                    self.tracker.reset()
+                if self.presence is not None:
+                    self.presence.reset()
+            elif self.motion_gate is not None and not self.motion_gate.check(frame):
+                # Static scene: nothing can have changed since the last scan
+                humans = last_humans
+                track_ids = last_ids
+            elif tracking and not self.tracker.needs_keyframe():
+                humans, track_ids = self.tracker.update(frame)
+                last_humans, last_ids = humans, track_ids
+            elif self.presence is not None and not self.presence.should_detect():
+                # Someone is known to be there and a detection could not fire anything
+                humans = last_humans
+                track_ids = last_ids
+            else:
+                start = time.perf_counter()
+                try:
+                    humans = self.detect(frame, timings)
+                except Exception as e:
+                    print(f"Detection error: {e}")
+                detection_time = time.perf_counter() - start
+                if tracking:
+                    humans, track_ids = self.tracker.update(frame, humans)
+                last_humans, last_ids = humans, track_ids
+            
+            result = DetectionResult(seq, frame, humans, detection_time, timings, track_ids)
+            if self.metrics is not None:
+                self.metrics.record_result(result, wait_time, self.source)
+            self.on_result(result)
+            wait_start = time.perf_counter()
+
+    def stop(self):
+        self._stop_event.set()
+
+class PooledDetectionWorker(threading.Thread):
+    """Feeds captured frames to a ProcessPoolDetector and reports results
+
+    Several frames are kept in flight so every worker process stays busy;
+    results arrive in capture order. With tracking, only keyframes are sent
+    to the pool, one at a time, and frames in between are propagated
+    locally. Takes the same arguments as DetectionWorker.
+    """
+
+    def __init__(self, frame_buffer, pool, is_enabled, on_result, motion_gate=None, tracker=None,
+                 metrics=None, source=None, presence=None):
+        super().__init__(name="detection-pool", daemon=True)
+        self.frame_buffer = frame_buffer
+        self.pool = pool
+        self.is_enabled = is_enabled
+        self.on_result = on_result
+        self.motion_gate = motion_gate
+        self.tracker = tracker
+        self.presence = presence
+        self.metrics = metrics
+        self.source = source
+        self._stop_event = threading.Event()
+
+    def _report(self, result, wait_time=0.0):
+        if self.metrics is not None:
+            self.metrics.record_result(result, wait_time, self.source)
+        self.on_result(result)
+
+    def run(self):
+        last_seq = 0
+        last_humans = []
+        last_ids = []
+        pending = {}  # pool sequence number -> (capture seq, frame)
+        while not self._stop_event.is_set():
+            enabled = self.is_enabled()
+            tracking = self.tracker is not None and self.tracker.enabled
+            if self.tracker is not None and self.tracker.tracks and not (enabled and tracking):
+                self.tracker.reset()
+            if not enabled:
+                last_humans = []
+                last_ids = []
+                if self.presence is not None:
+                    self.presence.reset()
+            
+            # The tracker follows the next frame from the keyframe's boxes, so
+            # while a keyframe is out the newest frame waits in the buffer
+            keyframe_pending = tracking and bool(pending)
+            if not enabled or (self.pool.has_free_slot() and not keyframe_pending):
+                # Only wait briefly for a new frame while results are outstanding
+                timeout = 0.005 if pending else 0.1
+                wait_start = time.perf_counter()
+                seq, frame = self.frame_buffer.get(last_seq, timeout=timeout)
+                if frame is not None:
+                    last_seq = seq
+                    wait_time = time.perf_counter() - wait_start
+                    pool_seq = None
+                    if enabled and (self.motion_gate is None or self.motion_gate.check(frame)):
+                        if tracking and not self.tracker.needs_keyframe():
+                            last_humans, last_ids = self.tracker.update(frame)
+                        elif self.presence is None or self.presence.should_detect():
+                            pool_seq = self.pool.submit(frame)
+                    if pool_seq is not None:
+                        pending[pool_seq] = (seq, frame)
+                    elif not pending:
+                        # Nothing to wait for: pass the frame straight through
+                        self._report(DetectionResult(seq, frame, last_humans, 0.0, [], last_ids), wait_time)
+            
+            if pending:
+                timeout = 0 if self.pool.has_free_slot() and not keyframe_pending else 0.1
+                for pool_seq, humans, elapsed, timings in self.pool.collect(timeout):
+                    seq, frame = pending.pop(pool_seq)
+                    track_ids = []
+                    if tracking:
+                        humans, track_ids = self.tracker.update(frame, humans)
+                    last_humans, last_ids = humans, track_ids
+                    self._report(DetectionResult(seq, frame, humans, elapsed, timings, track_ids))
+
+    def stop(self):
+        self._stop_event.set()
+
+class CameraPipeline:
+    """Capture and detection for one frame source
+
+    Every camera gets its own capture thread, detection worker, motion
+    gate, tracker and zone cache, so a slow camera never holds back the
+    others. A CascadeClassifier keeps scratch state per call and cannot
+    run detectMultiScale on two threads at once, so each pipeline loads
+    its own classifiers from the shared cascade paths unless it is handed
+    loaded ones nobody else is using. The engine can be switched while
+    the pipeline runs; the detection thread builds the new Detector on
+    its next frame. With a LatencyBudget target, the detection size and
+    engine parameters in force may be faster than the configured ones;
+    every change of level is reported to on_budget with a message. Its
+    PresenceMonitor reports arrivals and departures to on_presence as
+    'enter' and 'leave'. Its IdleMonitor drops a quiet camera to the idle
+    mode; on_idle gets True or False after every switch. on_result,
+    on_end, on_budget, on_presence and on_idle are called with the
+    pipeline as the first argument.
+    """
+
+    def __init__(self, spec, cascade_paths, on_result, on_end=None, metrics=None, cascades=None,
+                 backend='thread', processes=0, detection_size=0, realtime=True, loop=False,
+                 profile=None, engine='haar', engine_params=None, min_score=0.5, on_budget=None,
+                 on_presence=None, on_idle=None):
+        self.spec = spec
+        self.description = str(spec)
+        self.profile = profile
+        self.cascade_paths = list(cascade_paths)
+        self.cascades = list(cascades or [])
+        self.on_result = on_result
+        self.on_end = on_end
+        self.metrics = metrics
+        self.backend = backend
+        self.processes = processes
+        self.detection_size = detection_size
+        self.realtime = realtime
+        self.loop = loop
+        self.engine = engine
+        self.engine_params = dict(engine_params or {})  # engine -> detectMultiScale overrides
+        self.min_score = min_score
+        self.detectors = {}  # engine -> Detector, used by the detection thread only
+        self.on_budget = on_budget
+        self.budget = LatencyBudget()
+        self.active_detection_size = detection_size
+        self.active_params = {}
+        self._long_edge = 0
+
+        self.on_presence = on_presence
+        self.on_idle = on_idle
+        self.motion_gate = MotionGate()
+        self.tracker = BoxTracker()
+        self.presence = PresenceMonitor()
+        self.idle = IdleMonitor()
+        self.zones = DetectionZones()
+        self.camera = None
+        self.cascade_executor = None
+        self.frame_buffer = None
+        self.capture_thread = None
+        self.detection_worker = None
+        self.detection_pool = None
+        self.last_result_seq = 0
+
+    def configure(self, detection_size=None, zones=None, motion_gate=None, tracker=None,
+                  engine=None, engine_params=None, min_score=None, budget=None, presence=None, idle=None):
+        """Copy the shared settings into this camera's own gate, tracker, zones, budget, presence and idle mode"""
+        # Budget levels measured with another engine or other parameters no longer apply
+        if ((engine is not None and engine != self.engine)
+                or (engine_params is not None and dict(engine_params) != self.engine_params)):
+            self.budget.reset()
+        if detection_size is not None:
+            self.detection_size = detection_size
+        if engine is not None:
+            self.engine = engine
+        if engine_params is not None:
+            self.engine_params = dict(engine_params)
+        if min_score is not None:
+            self.min_score = min_score
+        if budget is not None:
+            if (budget.target, budget.bounds) != (self.budget.target, self.budget.bounds):
+                self.budget.target = budget.target
+                self.budget.bounds = budget.bounds
+                self.budget.reset()
+        if zones is not None:
+            self.zones.set_zones(zones)
+        if motion_gate is not None:
+            self.motion_gate.enabled = motion_gate.enabled
+            self.motion_gate.threshold = motion_gate.threshold
+            self.motion_gate.hold_seconds = motion_gate.hold_seconds
+            self.motion_gate.refresh_seconds = motion_gate.refresh_seconds
+        if tracker is not None:
+            self.tracker.keyframe_interval = tracker.keyframe_interval
+            self.tracker.interval = min(self.tracker.interval, tracker.keyframe_interval)
+            self.tracker.adaptive = tracker.adaptive
+            self.tracker.enabled = tracker.enabled
+        if presence is not None:
+            self.presence.check_seconds = presence.check_seconds
+            self.presence.leave_seconds = presence.leave_seconds
+            self.presence.armed = presence.armed
+        if idle is not None:
+            self.idle.quiet_seconds = idle.quiet_seconds
+            self.idle.width = idle.width
+            self.idle.height = idle.height
+            self.idle.fps = idle.fps
+            self.idle.motion.threshold = idle.motion.threshold
+        self._apply_settings()
+
+    def _apply_settings(self):
+        """Work out the detector settings in force, with the budget's level applied"""
+        self.active_detection_size, self.active_params = self.budget.settings(
+            self.engine, self.engine_params.get(self.engine, {}), self.detection_size, self._long_edge)
+        if self.detection_pool is not None:
+            self.detection_pool.detection_size = self.active_detection_size
+            self.detection_pool.engine = self.engine
+            self.detection_pool.engine_params = self.active_params
+            self.detection_pool.min_score = self.min_score
+
+    def budget_status(self):
+        """Active detector settings, e.g. 'scale 1.16, min 40 px, 512 px'"""
+        return describe_detection_settings(self.engine, self.active_params, self.active_detection_size)
+
+    def open(self):
+        """Open the frame source unless it is open; raises ValueError for a bad spec"""
+        if self.camera is None or not self.camera.isOpened():
+            self.camera = open_frame_source(self.spec, realtime=self.realtime, loop=self.loop,
+                                            profile=self.profile)
+            self.description = self.camera.description
+        return self.camera.isOpened()
+
+    def detector(self):
+        """This camera's Detector for the current engine"""
+        engine = self.engine
+        detector = self.detectors.get(engine)
+        if detector is None:
+            if engine == 'haar' and not self.cascades:
+                self.cascades = [cv2.CascadeClassifier(path) for path in self.cascade_paths]
+            detector = self.detectors[engine] = create_detector(engine, self.cascade_paths, self.cascades)
+        detector.params = self.active_params if engine == self.engine else self.engine_params.get(engine, {})
+        return detector
+
+    def detect(self, frame, timings=None):
+        """Detect humans in the frame with this camera's engine"""
+        return detect_humans(
+            self.detector(),
+            frame,
+            self.active_detection_size,
+            executor=self.cascade_executor,
+            timings=timings,
+            zones=self.zones,
+            min_score=self.min_score
+        )
+
+    def _report(self, result):
+        self.last_result_seq = result.seq
+        if result.detection_time and self.budget.enabled:
+            self._long_edge = max(result.frame.shape[:2])
+            level = self.budget.update(result.detection_time)
+            if level is not None:
+                self._apply_settings()
+                if self.on_budget is not None:
+                    self.on_budget(self, f"{self.description}: detection {self.budget.average * 1000:.0f} ms, "
+                                         f"budget {self.budget.target * 1000:.0f} ms -> level {level}/"
+                                         f"{LatencyBudget.LEVELS - 1} ({self.budget_status()})")
+        if result.humans:
+            self.idle.note_activity()
+        if result.detection_time:
+            # Reused or tracked boxes say nothing new about who is there
+            event = self.presence.update(bool(result.humans))
+            if event is not None and self.on_presence is not None:
+                self.on_presence(self, event)
+        self.on_result(self, result)
+
+    def _ended(self):
+        if self.on_end is not None:
+            self.on_end(self)
+
+    def _idle_changed(self, idle):
+        if self.metrics is not None:
+            self.metrics.set_mode(self.spec, 'idle' if idle else 'active')
+        if self.on_idle is not None:
+            self.on_idle(self, idle)
+
+    def start(self, is_enabled):
+        """Start the capture and detection threads for the open source"""
+        self.frame_buffer = LatestFrameBuffer()
+        self.idle.reset()
+        self.capture_thread = CaptureThread(self.camera, self.frame_buffer, on_end=self._ended,
+                                            idle=self.idle, on_idle=self._idle_changed)
+        self.capture_thread.name = f"capture-{self.spec}"
+        self.last_result_seq = 0
+        self.motion_gate.reset()
+        self.tracker.reset()
+        self.presence.reset()
+        self.budget.reset()
+        self._apply_settings()
+
+        if self.backend == 'process':
+            self.detection_pool = ProcessPoolDetector(
+                self.cascade_paths,
+                self.processes,
+                detection_size=self.active_detection_size,
+                zones=self.zones,
+                engine=self.engine,
+                engine_params=self.active_params,
+                min_score=self.min_score
+            )
+            self.detection_pool.start()
+            self.detection_worker = PooledDetectionWorker(
+                self.frame_buffer,
+                self.detection_pool,
+                is_enabled=is_enabled,
+                on_result=self._report,
+                motion_gate=self.motion_gate,
+                tracker=self.tracker,
+                metrics=self.metrics,
+                source=self.spec,
+                presence=self.presence
+            )
+        else:
+            self.detector()
+            # The cascades run side by side; detectMultiScale releases the GIL
+            if len(self.cascade_paths) > 1 and self.cascade_executor is None:
+                self.cascade_executor = ThreadPoolExecutor(
+                    max_workers=len(self.cascade_paths),
+                    thread_name_prefix=f"cascade-{self.spec}"
+                )
+            self.detection_worker = DetectionWorker(
+                self.frame_buffer,
+                detect=self.detect,
+                is_enabled=is_enabled,
+                on_result=self._report,
+                motion_gate=self.motion_gate,
+                tracker=self.tracker,
+                metrics=self.metrics,
+                source=self.spec,
+                presence=self.presence
+            )
+        self.detection_worker.name = f"detection-{self.spec}"
+        if self.metrics is not None:
+            self.metrics.set_mode(self.spec, 'active')
+        self.capture_thread.start()
+        self.detection_worker.start()
+
+    def stop(self):
+        """Stop the capture and detection threads, keeping the source open"""
+        for thread in (self.capture_thread, self.detection_worker):
+            if thread is not None:
+                thread.stop()
+        if self.frame_buffer is not None:
+            self.frame_buffer.close()
+        for thread in (self.capture_thread, self.detection_worker):
+            if thread is not None:
+                thread.join(timeout=2)
+        if self.detection_pool is not None:
+            self.detection_pool.stop()
+            self.detection_pool = None
+        if self.metrics is not None and self.capture_thread is not None:
+            self.metrics.set_mode(self.spec, None)
+        self.capture_thread = None
+        self.detection_worker = None
+        self.frame_buffer = None
+
+    def close(self):
+        """Stop the threads and release the source"""
+        self.stop()
+        if self.camera is not None:
+            self.camera.release()
+            self.camera = None
+        if self.cascade_executor is not None:
+            self.cascade_executor.shutdown(wait=False)
+            self.cascade_executor = None
+
+    @property
+    def mode(self):
+        """Capture mode the camera negotiated, '' for other sources"""
+        return getattr(self.camera, 'mode', "")
+
+    def is_running(self):
+        """Check whether frames are still being captured"""
+        return self.capture_thread is not None and self.capture_thread.is_alive()
+
+    def finished(self):
+        """Check whether a finite source has ended and every frame was processed"""
+        return (self.capture_thread is not None and self.capture_thread.ended
+                and self.last_result_seq >= self.frame_buffer.seq)
+
+    def failed(self):
+        """Check whether a pipeline thread died"""
+        if self.capture_thread is None:
+            return False
+        return (not (self.capture_thread.is_alive() or self.capture_thread.ended)
+                or not self.detection_worker.is_alive())
+
+# Upper bounds (seconds) of the latency histogram buckets
+METRIC_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+# Histograms kept by PipelineMetrics: name -> help text
+METRIC_HISTOGRAMS = {
+    'capture_wait': "Time the detection worker waited for a new frame",
+    'detection': "Time spent in detectMultiScale per frame, by cascade or engine stage",
+    'draw': "Time spent drawing the preview overlay",
+    'convert': "Time spent converting the preview to a QImage",
+    'injection': "Time spent injecting one keybind",
+}
+
+# Counters kept by PipelineMetrics: name -> help text
+METRIC_COUNTERS = {
+    'frames_processed': "Frames that went through the detection worker",
+    'frames_dropped': "Captured frames overwritten before the detector saw them",
+    'detector_runs': "Frames the detector was run on",
+    'triggers': "Detections that triggered the keybinds",
+    'keybinds_injected': "Keybinds sent to the system",
+}
+
+class StartupTimer:
+    """Time from launch to each startup stage, up to the first frame
+
+    start defaults to when this module was imported; the entry point sets
+    it to its own launch time so imports are included.
+    """
+
+    def __init__(self, start=None):
+        self.start = time.perf_counter() if start is None else start
+        self.stages = {}  # stage -> seconds since start
+        self.finished = False
+
+    def mark(self, stage, at=None):
+        """Record that a stage was reached at perf_counter() time at (default now)"""
+        if not self.finished and stage not in self.stages:
+            self.stages[stage] = (time.perf_counter() if at is None else at) - self.start
+
+    def finish(self, stage='first_frame'):
+        """Record the last stage; returns the report the first time, else None"""
+        if self.finished:
+            return None
+        self.mark(stage)
+        self.finished = True
+        lines = ["Startup timing (since launch):"]
+        previous = 0.0
+        for name, seconds in self.stages.items():
+            lines.append(f"  {name:<14}{seconds * 1000:>8.0f} ms  (+{(seconds - previous) * 1000:.0f} ms)")
+            previous = seconds
+        return "\n".join(lines)
+
+# Startup stages of this process
+STARTUP = StartupTimer()
+
+class Histogram:
+    """Latency histogram with cumulative buckets and a rolling window
+
+    The buckets and sum grow for the life of the process (Prometheus
+    semantics); the window of recent values gives live percentiles.
+    """
+
+    def __init__(self, buckets=METRIC_BUCKETS, window=256):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.recent = deque(maxlen=window)
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+        self.recent.append(seconds)
+
+    def percentiles(self, fractions=(0.5, 0.95, 0.99)):
+        """Percentiles of the rolling window, in seconds (0 when empty)"""
+        values = sorted(self.recent)
+        if not values:
+            return [0.0] * len(fractions)
+        return [values[min(len(values) - 1, int(fraction * len(values)))] for fraction in fractions]
+
+# Power modes of a camera, see IdleMonitor
+POWER_MODES = ('active', 'idle')
+
+class PipelineMetrics:
+    """Always-on runtime metrics for the capture/detect/trigger pipeline
+
+    Recording is a dictionary lookup and a few additions under a lock, a
+    few microseconds per frame. snapshot(), prometheus_text() and
+    status_text() render the current state for the exporters and the UI.
+
+    The time each camera spends in each power mode is added up as
+    camera-seconds. Process CPU time is only attributed to a mode while
+    every camera is in it, which gives a CPU cost per camera-second for
+    each mode; the CPU saved is the idle time at the difference of the
+    two.
+    """
+
+    def __init__(self, cascade_names=(), window=256):
+        self.cascade_names = list(cascade_names)
+        self.window = window
+        self.histograms = {}  # (name, cascade or None) -> Histogram
+        self.counters = dict.fromkeys(METRIC_COUNTERS, 0)
+        self.startup = {}  # stage -> seconds since launch, see StartupTimer
+        self._frame_times = deque(maxlen=window)
+        self._last_seq = {}  # source -> last sequence number seen
+        self.mode_seconds = dict.fromkeys(POWER_MODES, 0.0)  # camera-seconds per mode
+        self._mode_cpu = {mode: [0.0, 0.0] for mode in POWER_MODES}  # [CPU seconds, camera-seconds]
+        self._modes = {}  # source -> current mode
+        self._mode_clock = None  # (perf_counter, process_time) of the last accounting
+        self._lock = threading.Lock()
+
+    def _histogram(self, name, label=None):
+        histogram = self.histograms.get((name, label))
+        if histogram is None:
+            histogram = self.histograms[(name, label)] = Histogram(window=self.window)
+        return histogram
+
+    def observe(self, name, seconds, label=None):
+        """Add a latency sample to one of the METRIC_HISTOGRAMS"""
+        with self._lock:
+            self._histogram(name, label).observe(seconds)
+
+    def increment(self, name, amount=1):
+        """Bump one of the METRIC_COUNTERS"""
+        with self._lock:
+            self.counters[name] += amount
+
+    def record_result(self, result, wait_time, source=None):
+        """Account for one DetectionResult (called from the detection worker)
+
+        source tells the cameras apart; each has its own sequence numbers.
+        """
+        now = time.perf_counter()
+        with self._lock:
+            self.counters['frames_processed'] += 1
+            # Sequence numbers start over when the pipeline is restarted
+            last_seq = self._last_seq.get(source, 0)
+            if result.seq > last_seq + 1 and last_seq:
+                self.counters['frames_dropped'] += result.seq - last_seq - 1
+            self._last_seq[source] = result.seq
+            self._frame_times.append(now)
+            self._histogram('capture_wait').observe(wait_time)
+            if result.cascade_times:
+                self.counters['detector_runs'] += 1
+                for name, seconds in zip(self.cascade_names, result.cascade_times):
+                    self._histogram('detection', name).observe(seconds)
+
+    def set_mode(self, source, mode):
+        """Record that a camera is now 'active' or 'idle' (None once it stops)"""
+        with self._lock:
+            self._account_modes()
+            if mode is None:
+                self._modes.pop(source, None)
+            else:
+                self._modes[source] = mode
+
+    def _account_modes(self):
+        now, cpu = time.perf_counter(), time.process_time()
+        if self._mode_clock is not None and self._modes:
+            wall = now - self._mode_clock[0]
+            modes = list(self._modes.values())
+            for mode in POWER_MODES:
+                self.mode_seconds[mode] += wall * modes.count(mode)
+            if len(set(modes)) == 1:
+                totals = self._mode_cpu[modes[0]]
+                totals[0] += cpu - self._mode_clock[1]
+                totals[1] += wall * len(modes)
+        self._mode_clock = (now, cpu)
+
+    def _cpu_saved(self):
+        """Estimated CPU seconds saved by idle mode; None until both modes were measured"""
+        (active_cpu, active_time), (idle_cpu, idle_time) = (self._mode_cpu[mode] for mode in POWER_MODES)
+        if not active_time or not idle_time:
+            return None
+        return max(0.0, self.mode_seconds['idle'] * (active_cpu / active_time - idle_cpu / idle_time))
+
+    def fps(self):
+        """Frames per second over the rolling window"""
+        with self._lock:
+            if len(self._frame_times) < 2:
+                return 0.0
+            span = self._frame_times[-1] - self._frame_times[0]
+            # Report zero once frames stop arriving
+            if time.perf_counter() - self._frame_times[-1] > 2.0 or span <= 0:
+                return 0.0
+            return (len(self._frame_times) - 1) / span
+
+    def snapshot(self):
+        """Current metrics as a JSON-serializable dict (milliseconds)"""
+        fps = self.fps()
+        with self._lock:
+            self._account_modes()
+            histograms = {}
+            for (name, label), histogram in sorted(self.histograms.items(), key=lambda item: (item[0][0], item[0][1] or '')):
+                p50, p95, p99 = histogram.percentiles()
+                key = f"{name}:{label}" if label else name
+                histograms[key] = {
+                    'count': histogram.count,
+                    'mean_ms': histogram.sum / histogram.count * 1000 if histogram.count else 0.0,
+                    'p50_ms': p50 * 1000,
+                    'p95_ms': p95 * 1000,
+                    'p99_ms': p99 * 1000,
+                }
+            return {
+                'timestamp': time.time(),
+                'fps': fps,
+                'counters': dict(self.counters),
+                'histograms': histograms,
+                'startup_ms': {stage: seconds * 1000 for stage, seconds in self.startup.items()},
+                'mode_seconds': dict(self.mode_seconds),
+                'cpu_saved_seconds': self._cpu_saved(),
+            }
+
+    def prometheus_text(self, prefix='human_detection'):
+        """Current metrics in the Prometheus text exposition format"""
+        fps = self.fps()
+        lines = [f"# HELP {prefix}_fps Frames per second through the detection worker",
+                 f"# TYPE {prefix}_fps gauge",
+                 f"{prefix}_fps {fps:.3f}"]
+        if self.startup:
+            lines += [f"# HELP {prefix}_startup_seconds Time from launch to each startup stage",
+                      f"# TYPE {prefix}_startup_seconds gauge"]
+            lines += [f'{prefix}_startup_seconds{{stage="{stage}"}} {seconds:.3f}'
+                      for stage, seconds in self.startup.items()]
+        with self._lock:
+            self._account_modes()
+            for name, help_text in METRIC_COUNTERS.items():
+                lines += [f"# HELP {prefix}_{name}_total {help_text}",
+                          f"# TYPE {prefix}_{name}_total counter",
+                          f"{prefix}_{name}_total {self.counters[name]}"]
+            lines += [f"# HELP {prefix}_mode_seconds_total Camera-seconds spent in each power mode",
+                      f"# TYPE {prefix}_mode_seconds_total counter"]
+            lines += [f'{prefix}_mode_seconds_total{{mode="{mode}"}} {seconds:.3f}'
+                      for mode, seconds in self.mode_seconds.items()]
+            saved = self._cpu_saved()
+            if saved is not None:
+                lines += [f"# HELP {prefix}_cpu_saved_seconds Estimated CPU time saved by the idle mode",
+                          f"# TYPE {prefix}_cpu_saved_seconds gauge",
+                          f"{prefix}_cpu_saved_seconds {saved:.3f}"]
+            for name, help_text in METRIC_HISTOGRAMS.items():
+                series = sorted((label or '', histogram) for (metric, label), histogram
+                                in self.histograms.items() if metric == name)
+                if not series:
+                    continue
+                metric = f"{prefix}_{name}_seconds"
+                lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} histogram"]
+                for label, histogram in series:
+                    labels = f'cascade="{label}",' if label else ''
+                    cumulative = 0
+                    for bound, count in zip(list(histogram.buckets) + ['+Inf'], histogram.counts):
+                        cumulative += count
+                        lines.append(f'{metric}_bucket{{{labels}le="{bound}"}} {cumulative}')
+                    suffix = f"{{{labels.rstrip(',')}}}" if labels else ''
+                    lines.append(f"{metric}_sum{suffix} {histogram.sum:.6f}")
+                    lines.append(f"{metric}_count{suffix} {histogram.count}")
+        return '\n'.join(lines) + '\n'
+
+    def status_text(self):
+        """One-line summary for a status bar or log"""
+        snapshot = self.snapshot()
+        histograms = snapshot['histograms']
+        counters = snapshot['counters']
+        # Only the current engine's stages; histograms of a previous engine stay in the exports
+        detection = sum(histograms[f"detection:{name}"]['p50_ms'] for name in self.cascade_names
+                        if f"detection:{name}" in histograms)
+        parts = [f"{snapshot['fps']:.1f} fps", f"detect p50 {detection:.1f} ms"]
+        for key, label in (('capture_wait', "wait"), ('draw', "draw"), ('convert', "convert"),
+                           ('injection', "inject")):
+            if key in histograms:
+                parts.append(f"{label} p95 {histograms[key]['p95_ms']:.1f} ms")
+        parts.append(f"dropped {counters['frames_dropped']}")
+        parts.append(f"triggers {counters['triggers']}")
+        modes = snapshot['mode_seconds']
+        if modes['idle']:
+            idle = f"idle {modes['idle'] / (modes['idle'] + modes['active']) * 100:.0f}%"
+            if snapshot['cpu_saved_seconds'] is not None:
+                idle += f", ~{snapshot['cpu_saved_seconds']:.0f} s CPU saved"
+            parts.append(idle)
+        return " | ".join(parts)
+
+def write_file_atomic(path, text):
+    """Write text to path via a temporary file so readers never see a partial file"""
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w') as f:
+        f.write(text)
+        # On disk before the rename, so a crash cannot leave an empty file in its place
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+class MetricsExporter(threading.Thread):
+    """Periodically writes PipelineMetrics to a Prometheus textfile and/or JSON file
+
+    The textfile is meant for the node exporter's textfile collector, which
+    only reads files ending in .prom.
+    """
+
+    def __init__(self, metrics, textfile=None, json_path=None, interval=10.0):
+        super().__init__(name="metrics", daemon=True)
+        self.metrics = metrics
+        self.textfile = textfile
+        self.json_path = json_path
+        self.interval = interval
+        self._stop_event = threading.Event()
+
+    def write(self):
+        try:
+            if self.textfile:
+                write_file_atomic(self.textfile, self.metrics.prometheus_text())
+            if self.json_path:
+                write_file_atomic(self.json_path, json.dumps(self.metrics.snapshot(), indent=2))
+        except OSError as e:
+            print(f"⚠ Failed to write metrics: {e}")
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            self.write()
+        # Leave the final numbers behind on shutdown
+        self.write()
+
+    def stop(self):
+        self._stop_event.set()
+
+def save_settings_file(settings, path=None):
+    """Write the settings atomically to path (the config directory by default)"""
+    path = path or config_path(SETTINGS_FILE)
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    write_file_atomic(path, json.dumps(settings, indent=2))
+    return path
+
+# inotify(7) constants; IN_NONBLOCK and IN_CLOEXEC share the open(2) flag values
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_TO = 0x080
+INOTIFY_EVENT = struct.Struct('iIII')
+
+def inotify_watch(directory, mask=IN_CLOSE_WRITE | IN_MOVED_TO):
+    """Non-blocking inotify descriptor watching directory, or None where inotify is unavailable"""
+    if platform.system() != 'Linux':
+        return None
+    try:
+        import ctypes
+        import ctypes.util
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+    except (OSError, AttributeError):
+        return None
+    if fd < 0:
+        return None
+    if libc.inotify_add_watch(fd, os.fsencode(directory), mask) < 0:
+        os.close(fd)
+        return None
+    return fd
+
+def inotify_names(data):
+    """File names in a buffer of inotify events"""
+    names = []
+    offset = 0
+    while offset + INOTIFY_EVENT.size <= len(data):
+        wd, mask, cookie, length = INOTIFY_EVENT.unpack_from(data, offset)
+        offset += INOTIFY_EVENT.size
+        names.append(os.fsdecode(data[offset:offset + length].rstrip(b'\0')))
+        offset += length
+    return names
+
+class SettingsWatcher(threading.Thread):
+    """Calls on_change with the new settings whenever the settings file changes
+
+    On Linux the file's directory is watched with inotify, which also sees
+    editors and deployment tools that rename a new file over the old one;
+    elsewhere the file is polled every interval seconds. Writes within
+    settle_seconds are taken as one change. A file that does not parse is
+    reported and skipped, and so is content equal to the settings last
+    seen; expect() marks the program's own saves as seen so they are not
+    applied a second time.
+    """
+
+    def __init__(self, path, on_change, interval=1.0, settle_seconds=0.2):
+        super().__init__(name="settings-watcher", daemon=True)
+        self.path = os.path.abspath(path)
+        self.on_change = on_change
+        self.interval = interval
+        self.settle_seconds = settle_seconds
+        self.known = None
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+
+    def expect(self, settings):
+        """Take settings as already applied; returns them as they read back from the file"""
+        settings = json.loads(json.dumps(settings))
+        with self._lock:
+            self.known = settings
+        return settings
+
+    def check(self):
+        """Read the file and report it if it differs from the settings last seen"""
+        try:
+            with open(self.path, 'r') as f:
+                settings = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            print(f"⚠ Ignoring settings file change: {e}")
+            return
+        with self._lock:
+            if settings == self.known:
+                return
+            self.known = settings
+        self.on_change(settings)
+
+    def _stamp(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def run(self):
+        directory = os.path.dirname(self.path)
+        os.makedirs(directory, exist_ok=True)
+        fd = inotify_watch(directory)
+        if fd is None:
+            self._poll()
+            return
+        try:
+            self._watch(fd)
+        finally:
+            os.close(fd)
+
+    def _watch(self, fd):
+        import select
+        name = os.path.basename(self.path)
+        changed = False
+        while not self._stop_event.is_set():
+            # Wait briefly while a change settles, otherwise until stop() is likely
+            ready, _, _ = select.select([fd], [], [], self.settle_seconds if changed else 0.5)
+            if ready:
+                try:
+                    data = os.read(fd, 4096)
+                except BlockingIOError:
+                    continue
+                changed = changed or name in inotify_names(data)
+            elif changed:
+                changed = False
+                self.check()
+
+    def _poll(self):
+        stamp = self._stamp()
+        while not self._stop_event.wait(self.interval):
+            current = self._stamp()
+            if current != stamp:
+                stamp = current
+                self.check()
+
+    def stop(self):
+        self._stop_event.set()
@@ -0,0 +1,1869 @@
+#!/usr/bin/env python3
+"""
+Qt user interface for the Human Detection Camera Application
+Camera preview, keybind editor and detection controls
+"""
+
+import os
+import math
+import platform
+import threading
+import time
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, 
+                             QHBoxLayout, QPushButton, QLabel, QComboBox, 
+                             QGroupBox, QSpinBox, QCheckBox,
+                             QScrollArea, QMessageBox, QLineEdit, QFileDialog, QMenu)
+from PyQt5.QtCore import QObject, QEvent, Qt, QTimer, pyqtSignal
+from PyQt5.QtGui import QImage, QPainter, QFont
+
+from human_detection_core import (load_cascades, CameraPipeline,
+                                  MotionGate, BoxTracker, DetectionZones, Zone,
+                                  KeybindDispatcher, KeyInjector, TriggerPolicy, TRIGGER_POLICIES,
+                                  PresenceMonitor, PRESENCE_EVENTS, IdleMonitor,
+                                  compile_keybind, KeybindError, DETECTION_BACKENDS,
+                                  DETECTION_ENGINES, detector_stage_names,
+                                  PipelineMetrics, MetricsExporter,
+                                  discover_cameras, load_camera_cache, save_camera_cache, STARTUP,
+                                  DEFAULT_CAPTURE_PROFILE, CAPTURE_FOURCCS, capture_profile_from_settings,
+                                  is_camera_spec, DETECTION_SIZES, LatencyBudget, budget_from_settings,
+                                  config_path, settings_path, save_settings_file, SettingsWatcher,
+                                  SETTINGS_FILE)
+
+# Capture sizes always offered, next to the ones the camera reports
+CAPTURE_SIZES = ['640x480', '1280x720', '1920x1080']
+
+# Preview refresh rates offered in the UI; 0 turns the preview off
+PREVIEW_RATES = [0, 5, 10, 15, 30]
+
+# Qt 5.14 and later can read OpenCV's BGR frames without a conversion
+PREVIEW_FORMAT = getattr(QImage, 'Format_BGR888', None)
+
+def frame_to_qimage(frame):
+    """Wrap a BGR frame in a QImage, converting it only on Qt older than 5.14
+    
+    The QImage points into the returned array, which must stay alive as
+    long as the image is used.
+    """
+    if PREVIEW_FORMAT is None:
+        frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        image_format = QImage.Format_RGB888
+    else:
+        frame = np.ascontiguousarray(frame)
+        image_format = PREVIEW_FORMAT
+    height, width = frame.shape[:2]
+    return QImage(frame.data, width, height, frame.strides[0], image_format), frame
+
+class PreviewWidget(QWidget):
+    """Camera view that paints a frame straight from its BGR buffer
+    
+    The image is stretched over the widget while painting, so there is no
+    QPixmap copy and no separate scaling pass per frame.
+    """
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.image = None
+        self.message = ""
+        self._buffer = None  # keeps the frame the image points into alive
+        self.setAttribute(Qt.WA_OpaquePaintEvent)
+    
+    def set_frame(self, frame):
+        """Show a BGR frame"""
+        self.image, self._buffer = frame_to_qimage(frame)
+        self.message = ""
+        self.update()
+    
+    def show_message(self, text):
+        """Replace the picture with a line of text"""
+        self.image = None
+        self._buffer = None
+        self.message = text
+        self.update()
+    
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), Qt.black)
+        if self.image is not None:
+            painter.drawImage(self.rect(), self.image)
+        elif self.message:
+            painter.setPen(Qt.gray)
+            painter.drawText(self.rect(), Qt.AlignCenter, self.message)
+
+class PipelineSignals(QObject):
+    """Carries results from the worker threads to the GUI thread"""
+    result_ready = pyqtSignal()
+    cameras_found = pyqtSignal(object)
+    source_ended = pyqtSignal(object)
+    presence_changed = pyqtSignal(object, str)
+    idle_changed = pyqtSignal(object, bool)
+    settings_changed = pyqtSignal(object)
+    settings_saved = pyqtSignal(object)
+
+class KeybindWidget(QWidget):
+    """Widget for configuring a single keybind"""
+    removed = pyqtSignal(object)
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.recording = False
+        self.recorded_keys = []
+        # Compiled keybind, refreshed whenever the text changes
+        self.action = None
+        self.error = None
+        self.setup_ui()
+        
+    def setup_ui(self):
+        layout = QHBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        
+        self.name_input = QLineEdit()
+        self.name_input.setPlaceholderText("Name (e.g., Close All Windows)")
+        self.name_input.setMinimumWidth(200)
+        
+        self.keys_input = QLineEdit()
+        self.keys_input.setPlaceholderText("Keys (e.g., alt+f4 or super+d)")
+        self.keys_input.setMinimumWidth(250)
+        
+        self.record_btn = QPushButton("Record")
+        self.record_btn.clicked.connect(self.toggle_recording)
+        self.record_btn.setMaximumWidth(80)
+        self.record_btn.setStyleSheet("QPushButton { background-color: #2196F3; color: white; }")
+        
+        self.remove_btn = QPushButton("Remove")
+        self.remove_btn.clicked.connect(lambda: self.removed.emit(self))
+        self.remove_btn.setMaximumWidth(80)
+        
+        self.camera_combo = QComboBox()
+        self.camera_combo.addItem("All cameras", None)
+        self.camera_combo.setToolTip("Camera that fires this keybind (per-camera trigger policy)")
+        self.camera_combo.setEnabled(False)
+        
+        self.event_combo = QComboBox()
+        for event, label in PRESENCE_EVENTS.items():
+            self.event_combo.addItem(label, event)
+        self.event_combo.setToolTip("Fire on every detection (limited by the cooldown), "
+                                    "or once when someone arrives or leaves")
+        
+        self.name_input.textChanged.connect(self.compile_keybind)
+        self.keys_input.textChanged.connect(self.compile_keybind)
+        
+        layout.addWidget(QLabel("Name:"))
+        layout.addWidget(self.name_input)
+        layout.addWidget(QLabel("Keys:"))
+        layout.addWidget(self.keys_input)
+        layout.addWidget(self.camera_combo)
+        layout.addWidget(self.event_combo)
+        layout.addWidget(self.record_btn)
+        layout.addWidget(self.remove_btn)
+        
+        self.setLayout(layout)
+    
+    def compile_keybind(self):
+        """Recompile the keybind and flag parse errors in the keys field"""
+        self.action = None
+        self.error = None
+        if self.recording:
+            return
+        
+        keys = self.keys_input.text().strip()
+        if keys:
+            try:
+                self.action = compile_keybind(self.name_input.text().strip(), keys)
+            except KeybindError as e:
+                self.error = str(e)
+        
+        if self.error:
+            self.keys_input.setStyleSheet("border: 2px solid #f44336;")
+            self.keys_input.setToolTip(self.error)
+        else:
+            self.keys_input.setStyleSheet("")
+            self.keys_input.setToolTip("")
+    
+    def toggle_recording(self):
+        """Toggle key recording mode"""
+        if not self.recording:
+            self.start_recording()
+        else:
+            self.stop_recording()
+    
+    def start_recording(self):
+        """Start recording keys"""
+        from pynput import keyboard
+        
+        self.recording = True
+        self.recorded_keys = []
+        self.keys_input.setText("Press keys now...")
+        self.keys_input.setStyleSheet("background-color: #ffeb3b; color: #000;")
+        self.record_btn.setText("Stop")
+        self.record_btn.setStyleSheet("QPushButton { background-color: #f44336; color: white; }")
+        
+        # Start keyboard listener
+        self.listener = keyboard.Listener(
+            on_press=self.on_key_press,
+            on_release=self.on_key_release
+        )
+        self.listener.start()
+    
+    def stop_recording(self):
+        """Stop recording keys"""
+        if hasattr(self, 'listener'):
+            self.listener.stop()
+        
+        self.recording = False
+        self.record_btn.setText("Record")
+        self.record_btn.setStyleSheet("QPushButton { background-color: #2196F3; color: white; }")
+        self.keys_input.setStyleSheet("")
+        
+        # Convert recorded keys to string
+        if self.recorded_keys:
+            key_string = '+'.join(self.recorded_keys)
+            self.keys_input.setText(key_string)
+        self.compile_keybind()
+    
+    def on_key_press(self, key):
+        """Handle key press during recording"""
+        if not self.recording:
+            return False
+        
+        # Convert key to string
+        key_str = self.key_to_string(key)
+        
+        # Add to recorded keys if not already there
+        if key_str and key_str not in self.recorded_keys:
+            self.recorded_keys.append(key_str)
+            
+            # Update display in real-time
+            preview = '+'.join(self.recorded_keys)
+            self.keys_input.setText(preview)
+    
+    def on_key_release(self, key):
+        """Handle key release during recording"""
+        from pynput import keyboard
+        
+        # Stop recording on escape
+        if key == keyboard.Key.esc:
+            self.stop_recording()
+            return False
+    
+    def key_to_string(self, key):
+        """Convert pynput key to string representation"""
+        from pynput import keyboard
+        
+        # Map special keys
+        special_map = {
+            keyboard.Key.ctrl: 'ctrl',
+            keyboard.Key.ctrl_l: 'ctrl',
+            keyboard.Key.ctrl_r: 'ctrl',
+            keyboard.Key.alt: 'alt',
+            keyboard.Key.alt_l: 'alt',
+            keyboard.Key.alt_r: 'alt',
+            keyboard.Key.shift: 'shift',
+            keyboard.Key.shift_l: 'shift',
+            keyboard.Key.shift_r: 'shift',
+            keyboard.Key.cmd: 'super',
+            keyboard.Key.cmd_l: 'super',
+            keyboard.Key.cmd_r: 'super',
+            keyboard.Key.tab: 'tab',
+            keyboard.Key.space: 'space',
+            keyboard.Key.enter: 'enter',
+            keyboard.Key.backspace: 'backspace',
+            keyboard.Key.delete: 'delete',
+            keyboard.Key.esc: 'esc',
+            keyboard.Key.up: 'up',
+            keyboard.Key.down: 'down',
+            keyboard.Key.left: 'left',
+            keyboard.Key.right: 'right',
+            keyboard.Key.home: 'home',
+            keyboard.Key.end: 'end',
+            keyboard.Key.page_up: 'pageup',
+            keyboard.Key.page_down: 'pagedown',
+            keyboard.Key.insert: 'insert',
+            keyboard.Key.f1: 'f1',
+            keyboard.Key.f2: 'f2',
+            keyboard.Key.f3: 'f3',
+            keyboard.Key.f4: 'f4',
+            keyboard.Key.f5: 'f5',
+            keyboard.Key.f6: 'f6',
+            keyboard.Key.f7: 'f7',
+            keyboard.Key.f8: 'f8',
+            keyboard.Key.f9: 'f9',
+            keyboard.Key.f10: 'f10',
+            keyboard.Key.f11: 'f11',
+            keyboard.Key.f12: 'f12',
+        }
+        
+        if key in special_map:
+            return special_map[key]
+        
+        # Handle character keys
+        try:
+            if hasattr(key, 'char') and key.char:
+                return key.char.lower()
+        except:
+            pass
+        
+        return None
+    
+    def get_keybind(self):
+        """Get the keybind configuration"""
+        return {
+            'name': self.name_input.text().strip(),
+            'keys': self.keys_input.text().strip().lower(),
+            'camera': self.selected_camera(),
+            'event': self.selected_event()
+        }
+    
+    def set_keybind(self, name, keys, camera=None, event='detection'):
+        """Set the keybind configuration"""
+        self.name_input.setText(name)
+        self.keys_input.setText(keys)
+        self.set_camera(camera)
+        self.event_combo.setCurrentIndex(max(0, self.event_combo.findData(event)))
+    
+    def selected_event(self):
+        """Event this keybind fires on: 'detection', 'enter' or 'leave'"""
+        return self.event_combo.currentData()
+    
+    def selected_camera(self):
+        """Camera spec this keybind belongs to, or None for all cameras"""
+        return self.camera_combo.currentData()
+    
+    def set_camera(self, spec):
+        """Select a camera, adding it to the list if it is not known"""
+        index = 0 if spec is None else self.camera_combo.findData(spec)
+        if index < 0:
+            self.camera_combo.addItem(str(spec), spec)
+            index = self.camera_combo.count() - 1
+        self.camera_combo.setCurrentIndex(index)
+    
+    def set_camera_choices(self, choices):
+        """Offer the given (spec, label) cameras, keeping the current choice"""
+        current = self.selected_camera()
+        self.camera_combo.clear()
+        self.camera_combo.addItem("All cameras", None)
+        for spec, label in choices:
+            self.camera_combo.addItem(label, spec)
+        self.set_camera(current)
+
+class HumanDetectionApp(QMainWindow):
+    def __init__(self):
+        super().__init__()
+        self.setWindowTitle("Human Detection Camera System")
+        self.setGeometry(100, 100, 1200, 800)
+        
+        # Initialize variables
+        self.camera_index = 0  # primary camera index, or a frame source spec (see open_frame_source)
+        self.extra_cameras = []  # sources monitored alongside the primary camera
+        self.preferred_camera = None  # camera to select from the saved settings
+        self.preferred_extra_cameras = []  # extra cameras from the saved settings, added once found
+        self.camera_search = None
+        self.available_cameras = []
+        self.camera_modes = {}  # camera index -> "FOURCC WxH" modes it reported
+        self.capture_profiles = {}  # str(spec) -> CaptureProfile
+        
+        # One capture/detection pipeline per camera (runs off the GUI thread)
+        self.pipelines = {}  # spec -> CameraPipeline
+        self.pipeline_signals = PipelineSignals()
+        self.pipeline_signals.result_ready.connect(self.update_frame)
+        self.pipeline_signals.source_ended.connect(self.source_ended)
+        self.pipeline_signals.presence_changed.connect(self.presence_changed)
+        self.pipeline_signals.idle_changed.connect(self.idle_changed)
+        self.pipeline_signals.cameras_found.connect(self.cameras_found)
+        self.pipeline_signals.settings_changed.connect(self.reload_settings)
+        self.pipeline_signals.settings_saved.connect(self.settings_saved)
+        self._result_lock = threading.Lock()
+        self._latest_results = {}  # spec -> newest result not shown yet
+        # The preview is redrawn at its own rate from the newest results
+        self.preview_results = {}  # spec -> newest result of each camera
+        self.preview_grid = (1, 1)  # columns, rows of the tiled preview
+        self.preview_fps = 10  # 0 = preview off
+        self.preview_dirty = False
+        self.last_preview = 0
+        self.preview_timer = QTimer(self)
+        self.preview_timer.setSingleShot(True)
+        self.preview_timer.timeout.connect(self.render_preview)
+        
+        # Detection settings
+        self.detection_enabled = False
+        self.cooldown_seconds = 2
+        self.confidence_threshold = 0.5
+        self.detection_backend = 'thread'
+        self.detection_engine = 'haar'
+        self.engine_params = {}  # engine -> detectMultiScale overrides from the settings file
+        self.detection_processes = 0  # 0 = one per CPU core, minus one, shared by the cameras
+        self.detection_size = 640  # long edge of the detection image, 0 = full
+        self.latency_budget = LatencyBudget()
+        self.motion_gate = MotionGate()
+        self.tracker = BoxTracker()
+        self.detection_zones = DetectionZones()
+        self.zone_drawing = False
+        self.zone_points = []
+        self.zone_press_pos = None
+        self.trigger_policy = TriggerPolicy()
+        self.presence = PresenceMonitor(armed=self.detections_can_fire)
+        self.fire_on_detection = False  # whether any keybind fires on every detection
+        self.idle = IdleMonitor()
+        
+        # Keybinds (keystrokes are sent from the dispatcher's own thread)
+        self.keybind_widgets = []
+        self.keybind_dispatcher = KeybindDispatcher(self.dispatch_keybind, self.cooldown_seconds)
+        self.keybind_dispatcher.start()
+        self.key_injector = KeyInjector()
+        
+        # Load cascade classifier for human detection
+        self.load_detector()
+        STARTUP.mark('cascades')
+        self.cascade_time_averages = {}
+        self.last_timing_update = 0
+        
+        # Runtime metrics, shown in the status bar and optionally exported
+        self.metrics = PipelineMetrics(detector_stage_names(self.detection_engine, self.cascade_paths))
+        self.metrics_exporter = None
+        self.metrics_textfile = ''
+        self.metrics_json = ''
+        self.metrics_interval = 10
+        self.last_metrics_update = 0
+        
+        # Setup UI
+        self.setup_ui()
+        STARTUP.mark('window')
+        
+        # Load saved settings, and pick up edits to the file while running;
+        # saves are written on their own thread
+        self.settings_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="settings")
+        self.settings_watcher = SettingsWatcher(config_path(SETTINGS_FILE),
+                                                self.pipeline_signals.settings_changed.emit)
+        self.load_settings()
+        self.settings_watcher.start()
+        self.start_metrics_exporter()
+        
+        # Start with the cameras found last time, then look again in the background
+        self.populate_cameras(load_camera_cache())
+        self.detect_cameras()
+    
+    def start_metrics_exporter(self):
+        """Write the metrics periodically if an export path is configured"""
+        if self.metrics_textfile or self.metrics_json:
+            self.metrics_exporter = MetricsExporter(self.metrics, self.metrics_textfile,
+                                                    self.metrics_json, self.metrics_interval)
+            self.metrics_exporter.start()
+    
+    def load_detector(self):
+        """Load the human detection model"""
+        self.cascades, self.cascade_paths = load_cascades()
+    
+    def setup_ui(self):
+        """Setup the user interface"""
+        central_widget = QWidget()
+        self.setCentralWidget(central_widget)
+        main_layout = QVBoxLayout(central_widget)
+        
+        # Title
+        title = QLabel("Human Detection Camera System")
+        title.setFont(QFont("Arial", 16, QFont.Bold))
+        title.setAlignment(Qt.AlignCenter)
+        main_layout.addWidget(title)
+        
+        # Camera selection
+        camera_group = QGroupBox("Camera Selection")
+        camera_group_layout = QVBoxLayout()
+        camera_layout = QHBoxLayout()
+        
+        self.camera_combo = QComboBox()
+        self.camera_combo.currentIndexChanged.connect(self.change_camera)
+        camera_layout.addWidget(QLabel("Select Camera:"))
+        camera_layout.addWidget(self.camera_combo)
+        
+        self.refresh_btn = QPushButton("Refresh Cameras")
+        self.refresh_btn.clicked.connect(self.detect_cameras)
+        camera_layout.addWidget(self.refresh_btn)
+        
+        self.open_file_btn = QPushButton("Open Video...")
+        self.open_file_btn.setToolTip("Replay a recorded video through the detector")
+        self.open_file_btn.clicked.connect(self.open_video_file)
+        camera_layout.addWidget(self.open_file_btn)
+        
+        self.add_camera_btn = QPushButton("Add Camera")
+        self.add_camera_btn.setToolTip("Monitor another camera at the same time")
+        self.add_camera_menu = QMenu(self)
+        self.add_camera_menu.aboutToShow.connect(self.fill_add_camera_menu)
+        self.add_camera_btn.setMenu(self.add_camera_menu)
+        camera_layout.addWidget(self.add_camera_btn)
+        camera_group_layout.addLayout(camera_layout)
+        
+        # Capture profile of the selected camera
+        capture_layout = QHBoxLayout()
+        capture_layout.addWidget(QLabel("Capture:"))
+        self.capture_format_combo = QComboBox()
+        for fourcc in CAPTURE_FOURCCS:
+            self.capture_format_combo.addItem(fourcc or "Default format", fourcc)
+        self.capture_format_combo.setToolTip("MJPG needs far less USB bandwidth than uncompressed YUYV")
+        self.capture_format_combo.currentIndexChanged.connect(self.apply_capture_profile)
+        capture_layout.addWidget(self.capture_format_combo)
+        self.capture_size_combo = QComboBox()
+        self.capture_size_combo.currentIndexChanged.connect(self.apply_capture_profile)
+        capture_layout.addWidget(self.capture_size_combo)
+        self.capture_fps_spin = QSpinBox()
+        self.capture_fps_spin.setRange(0, 120)
+        self.capture_fps_spin.setSuffix(" fps")
+        self.capture_fps_spin.setSpecialValueText("Default fps")
+        self.capture_fps_spin.valueChanged.connect(self.apply_capture_profile)
+        capture_layout.addWidget(self.capture_fps_spin)
+        self.capture_gray_check = QCheckBox("Luma only")
+        self.capture_gray_check.setToolTip("Read grayscale frames from the camera and skip the colour conversions")
+        self.capture_gray_check.toggled.connect(self.apply_capture_profile)
+        capture_layout.addWidget(self.capture_gray_check)
+        self.capture_mode_label = QLabel()
+        self.capture_mode_label.setStyleSheet("color: #666;")
+        capture_layout.addWidget(self.capture_mode_label)
+        capture_layout.addStretch()
+        camera_group_layout.addLayout(capture_layout)
+        
+        # Cameras monitored next to the selected one
+        self.extra_cameras_layout = QHBoxLayout()
+        self.extra_cameras_layout.setAlignment(Qt.AlignLeft)
+        camera_group_layout.addLayout(self.extra_cameras_layout)
+        
+        camera_group.setLayout(camera_group_layout)
+        main_layout.addWidget(camera_group)
+        
+        # Main content area
+        content_layout = QHBoxLayout()
+        
+        # Left side - Camera view
+        left_widget = QWidget()
+        left_layout = QVBoxLayout(left_widget)
+        
+        self.camera_label = PreviewWidget()
+        self.camera_label.setMinimumSize(640, 480)
+        self.camera_label.installEventFilter(self)
+        left_layout.addWidget(self.camera_label)
+        
+        self.status_label = QLabel("Status: No camera selected")
+        self.status_label.setFont(QFont("Arial", 10))
+        left_layout.addWidget(self.status_label)
+        
+        content_layout.addWidget(left_widget, 2)
+        
+        # Right side - Controls
+        right_widget = QWidget()
+        right_layout = QVBoxLayout(right_widget)
+        
+        # Detection controls
+        detection_group = QGroupBox("Detection Controls")
+        detection_layout = QVBoxLayout()
+        
+        self.start_btn = QPushButton("Start Detection")
+        self.start_btn.clicked.connect(self.toggle_detection)
+        self.start_btn.setStyleSheet("QPushButton { background-color: #4CAF50; color: white; font-weight: bold; padding: 10px; }")
+        detection_layout.addWidget(self.start_btn)
+        
+        # Confidence threshold
+        conf_layout = QHBoxLayout()
+        conf_layout.addWidget(QLabel("Confidence:"))
+        self.confidence_spin = QSpinBox()
+        self.confidence_spin.setRange(10, 100)
+        self.confidence_spin.setValue(50)
+        self.confidence_spin.setSuffix("%")
+        self.confidence_spin.setToolTip("Minimum detection score; 50% accepts what the detector accepts by default")
+        self.confidence_spin.valueChanged.connect(self.update_confidence)
+        conf_layout.addWidget(self.confidence_spin)
+        detection_layout.addLayout(conf_layout)
+        
+        # Cooldown
+        cooldown_layout = QHBoxLayout()
+        cooldown_layout.addWidget(QLabel("Cooldown:"))
+        self.cooldown_spin = QSpinBox()
+        self.cooldown_spin.setRange(0, 60)
+        self.cooldown_spin.setValue(2)
+        self.cooldown_spin.setSuffix(" seconds")
+        self.cooldown_spin.valueChanged.connect(self.update_cooldown)
+        cooldown_layout.addWidget(self.cooldown_spin)
+        detection_layout.addLayout(cooldown_layout)
+        
+        # Trigger policy when several cameras are monitored
+        policy_layout = QHBoxLayout()
+        policy_layout.addWidget(QLabel("Trigger on:"))
+        self.policy_combo = QComboBox()
+        for policy, label in TRIGGER_POLICIES.items():
+            self.policy_combo.addItem(label, policy)
+        self.policy_combo.currentIndexChanged.connect(self.update_trigger_policy)
+        policy_layout.addWidget(self.policy_combo)
+        self.quorum_spin = QSpinBox()
+        self.quorum_spin.setRange(1, 16)
+        self.quorum_spin.setValue(self.trigger_policy.quorum)
+        self.quorum_spin.setPrefix("N = ")
+        self.quorum_spin.setToolTip("Cameras that must see someone within a second of each other")
+        self.quorum_spin.setEnabled(False)
+        self.quorum_spin.valueChanged.connect(self.update_trigger_policy)
+        policy_layout.addWidget(self.quorum_spin)
+        detection_layout.addLayout(policy_layout)
+        
+        # Detection backend
+        backend_layout = QHBoxLayout()
+        backend_layout.addWidget(QLabel("Backend:"))
+        self.backend_combo = QComboBox()
+        for backend, label in DETECTION_BACKENDS.items():
+            self.backend_combo.addItem(label, backend)
+        self.backend_combo.currentIndexChanged.connect(self.update_backend)
+        backend_layout.addWidget(self.backend_combo)
+        detection_layout.addLayout(backend_layout)
+
+        # Detection engine, switchable while the cameras run
+        engine_layout = QHBoxLayout()
+        engine_layout.addWidget(QLabel("Engine:"))
+        self.engine_combo = QComboBox()
+        for engine, label in DETECTION_ENGINES.items():
+            self.engine_combo.addItem(label, engine)
+        self.engine_combo.setToolTip("The HOG detector finds whole, upright people and ignores most other shapes")
+        self.engine_combo.currentIndexChanged.connect(self.update_engine)
+        engine_layout.addWidget(self.engine_combo)
+        self.model_btn = QPushButton("Model...")
+        self.model_btn.setToolTip("Choose a local SSD person detector (ONNX, Caffe or TensorFlow)")
+        self.model_btn.setEnabled(False)
+        self.model_btn.clicked.connect(self.choose_dnn_model)
+        engine_layout.addWidget(self.model_btn)
+        detection_layout.addLayout(engine_layout)
+        
+        # Preview refresh rate, independent of the detection rate
+        preview_layout = QHBoxLayout()
+        preview_layout.addWidget(QLabel("Preview:"))
+        self.preview_combo = QComboBox()
+        for fps in PREVIEW_RATES:
+            self.preview_combo.addItem(f"{fps} fps" if fps else "Off", fps)
+        self.preview_combo.setCurrentIndex(self.preview_combo.findData(self.preview_fps))
+        self.preview_combo.setToolTip("How often the camera view is redrawn; detection is not affected")
+        self.preview_combo.currentIndexChanged.connect(self.update_preview_rate)
+        preview_layout.addWidget(self.preview_combo)
+        detection_layout.addLayout(preview_layout)
+        
+        # Detection resolution
+        size_layout = QHBoxLayout()
+        size_layout.addWidget(QLabel("Detection size:"))
+        self.detection_size_combo = QComboBox()
+        for size in DETECTION_SIZES:
+            self.detection_size_combo.addItem(f"{size} px" if size else "Full resolution", size)
+        self.detection_size_combo.setCurrentIndex(self.detection_size_combo.findData(self.detection_size))
+        self.detection_size_combo.currentIndexChanged.connect(self.update_detection_size)
+        size_layout.addWidget(self.detection_size_combo)
+        detection_layout.addLayout(size_layout)
+        
+        # Latency budget: trade accuracy for speed when detection is too slow
+        budget_layout = QHBoxLayout()
+        budget_layout.addWidget(QLabel("Frame budget:"))
+        self.budget_spin = QSpinBox()
+        self.budget_spin.setRange(0, 1000)
+        self.budget_spin.setSingleStep(10)
+        self.budget_spin.setSuffix(" ms")
+        self.budget_spin.setSpecialValueText("Off")
+        self.budget_spin.setToolTip("Target detection time per frame; coarser scale steps, larger minimum "
+                                    "sizes and a smaller detection image are used while it is exceeded")
+        self.budget_spin.valueChanged.connect(self.update_budget)
+        budget_layout.addWidget(self.budget_spin)
+        detection_layout.addLayout(budget_layout)
+        
+        # Motion gate
+        motion_layout = QHBoxLayout()
+        self.motion_check = QCheckBox("Motion gate")
+        self.motion_check.setChecked(self.motion_gate.enabled)
+        self.motion_check.setToolTip("Only run the detector when something in the picture moves")
+        self.motion_check.toggled.connect(self.update_motion_gate)
+        motion_layout.addWidget(self.motion_check)
+        self.motion_threshold_spin = QSpinBox()
+        self.motion_threshold_spin.setRange(1, 50)
+        self.motion_threshold_spin.setValue(round(self.motion_gate.threshold * 100))
+        self.motion_threshold_spin.setSuffix("% changed")
+        self.motion_threshold_spin.valueChanged.connect(self.update_motion_gate)
+        motion_layout.addWidget(self.motion_threshold_spin)
+        self.motion_hold_spin = QSpinBox()
+        self.motion_hold_spin.setRange(0, 60)
+        self.motion_hold_spin.setValue(round(self.motion_gate.hold_seconds))
+        self.motion_hold_spin.setPrefix("hold ")
+        self.motion_hold_spin.setSuffix(" s")
+        self.motion_hold_spin.valueChanged.connect(self.update_motion_gate)
+        motion_layout.addWidget(self.motion_hold_spin)
+        detection_layout.addLayout(motion_layout)
+        
+        # Tracking between detector keyframes
+        tracking_layout = QHBoxLayout()
+        self.tracking_check = QCheckBox("Track between detections")
+        self.tracking_check.setChecked(self.tracker.enabled)
+        self.tracking_check.setToolTip("Run the detector only on keyframes and follow people with optical flow in between")
+        self.tracking_check.toggled.connect(self.update_tracking)
+        tracking_layout.addWidget(self.tracking_check)
+        self.keyframe_spin = QSpinBox()
+        self.keyframe_spin.setRange(1, 60)
+        self.keyframe_spin.setValue(self.tracker.keyframe_interval)
+        self.keyframe_spin.setPrefix("every ")
+        self.keyframe_spin.setSuffix(" frames")
+        self.keyframe_spin.setToolTip("Detector keyframe interval (upper bound when adaptive)")
+        self.keyframe_spin.valueChanged.connect(self.update_tracking)
+        tracking_layout.addWidget(self.keyframe_spin)
+        detection_layout.addLayout(tracking_layout)
+        
+        # Presence: how often to look again while someone is known to be there
+        presence_layout = QHBoxLayout()
+        presence_layout.addWidget(QLabel("Presence:"))
+        self.presence_check_spin = QSpinBox()
+        self.presence_check_spin.setRange(0, 60)
+        self.presence_check_spin.setValue(round(self.presence.check_seconds))
+        self.presence_check_spin.setPrefix("check every ")
+        self.presence_check_spin.setSuffix(" s")
+        self.presence_check_spin.setSpecialValueText("check every frame")
+        self.presence_check_spin.setToolTip("While someone is there and no keybind can fire (cooldown, or only "
+                                            "arrival/departure keybinds), run the detector only this often")
+        self.presence_check_spin.valueChanged.connect(self.update_presence)
+        presence_layout.addWidget(self.presence_check_spin)
+        self.presence_leave_spin = QSpinBox()
+        self.presence_leave_spin.setRange(1, 300)
+        self.presence_leave_spin.setValue(round(self.presence.leave_seconds))
+        self.presence_leave_spin.setPrefix("left after ")
+        self.presence_leave_spin.setSuffix(" s")
+        self.presence_leave_spin.setToolTip("Time nobody must be seen before a person counts as gone")
+        self.presence_leave_spin.valueChanged.connect(self.update_presence)
+        presence_layout.addWidget(self.presence_leave_spin)
+        detection_layout.addLayout(presence_layout)
+        
+        # Idle mode: cheap capture and no preview while nothing happens
+        idle_layout = QHBoxLayout()
+        idle_layout.addWidget(QLabel("Idle mode:"))
+        self.idle_spin = QSpinBox()
+        self.idle_spin.setRange(0, 3600)
+        self.idle_spin.setSingleStep(10)
+        self.idle_spin.setPrefix("after ")
+        self.idle_spin.setSuffix(" s quiet")
+        self.idle_spin.setSpecialValueText("Off")
+        self.idle_spin.setToolTip("After this long without motion or detections, capture at a low resolution "
+                                  "and frame rate and stop refreshing the preview until something moves")
+        self.idle_spin.valueChanged.connect(self.update_idle)
+        idle_layout.addWidget(self.idle_spin)
+        idle_layout.addStretch()
+        detection_layout.addLayout(idle_layout)
+        
+        detection_group.setLayout(detection_layout)
+        right_layout.addWidget(detection_group)
+        
+        # Detection zones
+        zone_group = QGroupBox("Detection Zones")
+        zone_layout = QVBoxLayout()
+        
+        zone_buttons = QHBoxLayout()
+        self.draw_zone_btn = QPushButton("Draw Zone")
+        self.draw_zone_btn.setCheckable(True)
+        self.draw_zone_btn.toggled.connect(self.toggle_zone_drawing)
+        zone_buttons.addWidget(self.draw_zone_btn)
+        clear_zones_btn = QPushButton("Clear Zones")
+        clear_zones_btn.clicked.connect(self.clear_zones)
+        zone_buttons.addWidget(clear_zones_btn)
+        zone_layout.addLayout(zone_buttons)
+        
+        self.zone_list_layout = QVBoxLayout()
+        zone_layout.addLayout(self.zone_list_layout)
+        
+        zone_help = QLabel(
+            "Drag on the camera view to draw a rectangle, or click corner\n"
+            "points and right-click to close a polygon.\n"
+            "With no active zones the whole picture is scanned."
+        )
+        zone_help.setStyleSheet("color: #666; font-size: 9px;")
+        zone_help.setWordWrap(True)
+        zone_layout.addWidget(zone_help)
+        
+        zone_group.setLayout(zone_layout)
+        right_layout.addWidget(zone_group)
+        
+        # Keybinds
+        keybind_group = QGroupBox("Keybinds (triggered on human detection)")
+        keybind_layout = QVBoxLayout()
+        
+        # Scroll area for keybinds
+        scroll = QScrollArea()
+        scroll.setWidgetResizable(True)
+        scroll.setMinimumHeight(200)
+        
+        self.keybind_container = QWidget()
+        self.keybind_container_layout = QVBoxLayout(self.keybind_container)
+        self.keybind_container_layout.setAlignment(Qt.AlignTop)
+        scroll.setWidget(self.keybind_container)
+        
+        keybind_layout.addWidget(scroll)
+        
+        add_keybind_btn = QPushButton("+ Add Keybind")
+        add_keybind_btn.clicked.connect(self.add_keybind)
+        keybind_layout.addWidget(add_keybind_btn)
+        
+        # Help text
+        help_text = QLabel(
+            "Click 'Record' to capture keys from your keyboard!\n"
+            "Or manually type key combinations:\n"
+            "• Single key: a, space, esc\n"
+            "• Combo: ctrl+c, alt+f4, super+d\n"
+            "• Multiple: ctrl+shift+esc\n\n"
+            "Special keys: ctrl, alt, shift, super, win, cmd,\n"
+            "esc, enter, tab, space, f1-f12"
+        )
+        help_text.setStyleSheet("color: #666; font-size: 9px;")
+        help_text.setWordWrap(True)
+        keybind_layout.addWidget(help_text)
+        
+        keybind_group.setLayout(keybind_layout)
+        right_layout.addWidget(keybind_group)
+        
+        # Save settings button
+        self.save_btn = QPushButton("Save Settings")
+        self.save_btn.clicked.connect(self.save_settings)
+        right_layout.addWidget(self.save_btn)
+        
+        right_layout.addStretch()
+        
+        content_layout.addWidget(right_widget, 1)
+        main_layout.addLayout(content_layout)
+        
+        # Add default keybind
+        self.add_keybind()
+    
+    def add_keybind(self):
+        """Add a new keybind widget"""
+        widget = KeybindWidget()
+        widget.removed.connect(self.remove_keybind)
+        widget.event_combo.currentIndexChanged.connect(self.update_keybind_events)
+        widget.set_camera_choices(self.camera_choices())
+        widget.camera_combo.setEnabled(self.trigger_policy.mode == 'per_camera')
+        self.keybind_widgets.append(widget)
+        self.keybind_container_layout.addWidget(widget)
+        
+        # Set default for first keybind
+        if len(self.keybind_widgets) == 1:
+            if platform.system() == "Windows":
+                widget.set_keybind("Minimize All Windows", "win+d")
+            else:
+                widget.set_keybind("Show Desktop", "ctrl+alt+d")
+        self.update_keybind_events()
+    
+    def remove_keybind(self, widget):
+        """Remove a keybind widget"""
+        if len(self.keybind_widgets) > 0:
+            self.keybind_widgets.remove(widget)
+            widget.deleteLater()
+            self.update_keybind_events()
+    
+    def update_keybind_events(self, *args):
+        """Note whether any keybind fires on every detection (read by the workers)"""
+        self.fire_on_detection = any(widget.selected_event() == 'detection'
+                                     for widget in self.keybind_widgets)
+    
+    def detect_cameras(self):
+        """Search for cameras in the background"""
+        if self.camera_search is not None and self.camera_search.is_alive():
+            return
+        self.refresh_btn.setEnabled(False)
+        self.status_label.setText("Status: Searching for cameras...")
+        
+        # Open cameras cannot always be opened a second time to probe them
+        in_use = tuple(spec for spec, pipeline in self.pipelines.items()
+                       if isinstance(spec, int) and pipeline.is_running())
+        
+        def search():
+            self.pipeline_signals.cameras_found.emit(discover_cameras(in_use=in_use))
+        
+        self.camera_search = threading.Thread(target=search, name="camera-discovery", daemon=True)
+        self.camera_search.start()
+    
+    def cameras_found(self, cameras):
+        """Apply the result of a background camera search (runs on the GUI thread)"""
+        self.refresh_btn.setEnabled(True)
+        save_camera_cache(cameras)
+        self.populate_cameras(cameras)
+        
+        if not cameras:
+            self.status_label.setText("Status: No cameras detected")
+            QMessageBox.warning(self, "No Cameras", "No cameras were detected on your system.")
+        else:
+            self.status_label.setText(f"Status: Found {len(cameras)} camera(s)")
+    
+    def populate_cameras(self, cameras):
+        """Fill the camera list, keeping the current source if it is still there"""
+        current = self.camera_index if self.camera_index in self.pipelines else self.preferred_camera
+        other_sources = [(spec, self.camera_combo.itemText(i))
+                         for i, spec in enumerate(self.available_cameras) if not isinstance(spec, int)]
+        
+        self.camera_combo.blockSignals(True)
+        self.camera_combo.clear()
+        self.available_cameras = []
+        for camera in cameras:
+            label = f"Camera {camera.index}: {camera.name}" if camera.name else f"Camera {camera.index}"
+            row = self.add_source(camera.index, label)
+            self.camera_modes[camera.index] = camera.modes
+            if camera.modes:
+                self.camera_combo.setItemData(row, "\n".join(camera.modes), Qt.ToolTipRole)
+        for spec, label in other_sources:
+            self.add_source(spec, label)
+        # The synthetic scene is always available for testing without a
+        # camera, but is never started just because it is the only entry
+        self.add_source('synthetic', "Synthetic test scene")
+        
+        if current in self.available_cameras:
+            row = self.available_cameras.index(current)
+        else:
+            row = 0 if cameras else -1
+        self.camera_combo.setCurrentIndex(row)
+        self.camera_combo.blockSignals(False)
+        
+        if row >= 0:
+            spec = self.available_cameras[row]
+            if spec != self.camera_index or spec not in self.pipelines:
+                self.change_camera(row)
+        
+        # Extra cameras from the saved settings start once they are found
+        for spec in self.preferred_extra_cameras[:]:
+            if spec in self.available_cameras:
+                self.preferred_extra_cameras.remove(spec)
+                self.add_camera(spec)
+    
+    def add_source(self, spec, label):
+        """Add a frame source to the camera list without selecting it; returns its index"""
+        if spec not in self.available_cameras:
+            self.available_cameras.append(spec)
+            blocked = self.camera_combo.blockSignals(True)
+            self.camera_combo.addItem(label)
+            self.camera_combo.blockSignals(blocked)
+            for widget in self.keybind_widgets:
+                widget.set_camera_choices(self.camera_choices())
+        return self.available_cameras.index(spec)
+    
+    def add_saved_source(self, spec):
+        """Make a video file from the saved settings selectable"""
+        if isinstance(spec, str) and os.path.isfile(spec):
+            self.add_source(spec, f"Video: {os.path.basename(spec)}")
+    
+    def camera_choices(self):
+        """(spec, label) pairs of every known source"""
+        return [(spec, self.camera_combo.itemText(i)) for i, spec in enumerate(self.available_cameras)]
+    
+    def camera_label_for(self, spec):
+        """Display name of a source"""
+        if spec in self.available_cameras:
+            return self.camera_combo.itemText(self.available_cameras.index(spec))
+        return str(spec)
+    
+    def open_video_file(self):
+        """Pick a video file and play it through the detector"""
+        path, _ = QFileDialog.getOpenFileName(
+            self, "Open Video", "",
+            "Videos (*.mp4 *.avi *.mkv *.mov *.webm);;All Files (*)"
+        )
+        if path:
+            self.camera_combo.setCurrentIndex(self.add_source(path, f"Video: {os.path.basename(path)}"))
+    
+    def camera_specs(self):
+        """All monitored sources, primary camera first"""
+        return [self.camera_index] + self.extra_cameras
+    
+    def change_camera(self, index):
+        """Change the primary camera"""
+        if index >= 0 and index < len(self.available_cameras):
+            spec = self.available_cameras[index]
+            self.stop_camera()
+            if spec in self.extra_cameras:
+                # Already running next to the old primary camera
+                self.extra_cameras.remove(spec)
+                self.refresh_extra_cameras()
+            self.camera_index = spec
+            self.refresh_capture_controls()
+            self.start_camera()
+    
+    def fill_add_camera_menu(self):
+        """List the sources that are not monitored yet"""
+        self.add_camera_menu.clear()
+        for spec, label in self.camera_choices():
+            if spec not in self.camera_specs():
+                action = self.add_camera_menu.addAction(label)
+                action.triggered.connect(lambda checked=False, spec=spec: self.add_camera(spec))
+        if self.add_camera_menu.isEmpty():
+            self.add_camera_menu.addAction("No other cameras").setEnabled(False)
+    
+    def add_camera(self, spec):
+        """Monitor another camera alongside the current ones"""
+        if spec in self.camera_specs():
+            return
+        self.extra_cameras.append(spec)
+        self.refresh_extra_cameras()
+        self.start_camera(spec)
+    
+    def remove_camera(self, spec):
+        """Stop monitoring an extra camera"""
+        if spec in self.extra_cameras:
+            self.extra_cameras.remove(spec)
+            self.stop_camera(spec)
+            self.refresh_extra_cameras()
+    
+    def refresh_extra_cameras(self):
+        """Rebuild the buttons of the extra cameras"""
+        while self.extra_cameras_layout.count():
+            item = self.extra_cameras_layout.takeAt(0)
+            if item.widget() is not None:
+                item.widget().deleteLater()
+        
+        if self.extra_cameras:
+            self.extra_cameras_layout.addWidget(QLabel("Also monitoring:"))
+        for spec in self.extra_cameras:
+            button = QPushButton(f"✕ {self.camera_label_for(spec)}")
+            mode = self.pipelines[spec].mode if spec in self.pipelines else ""
+            button.setToolTip(f"{mode}\nStop monitoring this camera" if mode else "Stop monitoring this camera")
+            button.clicked.connect(lambda checked=False, spec=spec: self.remove_camera(spec))
+            self.extra_cameras_layout.addWidget(button)
+    
+    def is_camera_running(self):
+        """Check whether any capture pipeline is running"""
+        return any(pipeline.is_running() for pipeline in self.pipelines.values())
+    
+    def active_description(self):
+        """Short description of the monitored sources for the status line"""
+        pipelines = [self.pipelines[spec] for spec in self.camera_specs() if spec in self.pipelines]
+        if len(pipelines) == 1:
+            return pipelines[0].description
+        return f"{len(pipelines)} cameras"
+    
+    def start_camera(self, spec=None):
+        """Start a camera (the primary camera by default)"""
+        if spec is None:
+            spec = self.camera_index
+        pipeline = self.pipelines.get(spec)
+        if pipeline is not None and pipeline.is_running():
+            return
+        if pipeline is None:
+            # The first camera gets the loaded cascades, the others load their own
+            shared = any(self.cascades and p.cascades and p.cascades[0] is self.cascades[0]
+                         for p in self.pipelines.values())
+            pipeline = CameraPipeline(
+                spec,
+                self.cascade_paths,
+                on_result=self.post_result,
+                on_end=self.pipeline_signals.source_ended.emit,
+                on_budget=self.report_budget,
+                on_presence=self.pipeline_signals.presence_changed.emit,
+                on_idle=self.pipeline_signals.idle_changed.emit,
+                metrics=self.metrics,
+                cascades=None if shared else self.cascades,
+                profile=self.capture_profile_for(spec)
+            )
+        
+        try:
+            opened = pipeline.open()
+        except ValueError as e:
+            self.status_label.setText(f"Status: Invalid source {spec}: {e}")
+            return
+        if not opened:
+            pipeline.close()
+            self.status_label.setText(f"Status: Failed to open {pipeline.description}")
+            return
+        
+        self.pipelines[spec] = pipeline
+        STARTUP.mark('camera_open')
+        self.start_pipeline(pipeline)
+        self.status_label.setText(f"Status: {self.active_description()} active")
+        if spec == self.camera_index:
+            self.refresh_capture_controls()
+        else:
+            self.refresh_extra_cameras()
+    
+    def stop_camera(self, spec=None):
+        """Stop a camera (the primary camera by default)"""
+        if spec is None:
+            spec = self.camera_index
+        pipeline = self.pipelines.pop(spec, None)
+        if pipeline is not None:
+            pipeline.close()
+        self.trigger_policy.forget(spec)
+        self.preview_results.pop(spec, None)
+        with self._result_lock:
+            self._latest_results.pop(spec, None)
+    
+    def capture_profile_for(self, spec):
+        """Capture profile of a camera from the settings"""
+        return self.capture_profiles.get(str(spec), DEFAULT_CAPTURE_PROFILE)
+    
+    def refresh_capture_controls(self):
+        """Show the selected camera's capture profile and negotiated mode"""
+        spec = self.camera_index
+        profile = self.capture_profile_for(spec)
+        is_camera = is_camera_spec(spec)
+        
+        sizes = list(CAPTURE_SIZES)
+        for mode in self.camera_modes.get(spec, []):
+            size = mode.split()[-1]
+            if size not in sizes:
+                sizes.append(size)
+        if profile.width and profile.height and f"{profile.width}x{profile.height}" not in sizes:
+            sizes.append(f"{profile.width}x{profile.height}")
+        sizes.sort(key=lambda size: tuple(int(v) for v in size.split('x')))
+        
+        widgets = (self.capture_format_combo, self.capture_size_combo,
+                   self.capture_fps_spin, self.capture_gray_check)
+        for widget in widgets:
+            widget.blockSignals(True)
+            widget.setEnabled(is_camera)
+        self.capture_size_combo.clear()
+        self.capture_size_combo.addItem("Default size", "")
+        for size in sizes:
+            self.capture_size_combo.addItem(size, size)
+        if profile.width and profile.height:
+            self.capture_size_combo.setCurrentIndex(
+                self.capture_size_combo.findData(f"{profile.width}x{profile.height}"))
+        self.capture_format_combo.setCurrentIndex(max(0, self.capture_format_combo.findData(profile.fourcc)))
+        self.capture_fps_spin.setValue(round(profile.fps))
+        self.capture_gray_check.setChecked(profile.gray)
+        for widget in widgets:
+            widget.blockSignals(False)
+        
+        pipeline = self.pipelines.get(spec)
+        self.capture_mode_label.setText(pipeline.mode if pipeline is not None else "")
+    
+    def apply_capture_profile(self, *args):
+        """Store the capture controls as the selected camera's profile and reopen it"""
+        spec = self.camera_index
+        if not is_camera_spec(spec):
+            return
+        size = self.capture_size_combo.currentData() or ""
+        width, height = (int(v) for v in size.split('x')) if size else (0, 0)
+        old = self.capture_profile_for(spec)
+        profile = old._replace(
+            width=width,
+            height=height,
+            fps=float(self.capture_fps_spin.value()),
+            fourcc=self.capture_format_combo.currentData() or "",
+            gray=self.capture_gray_check.isChecked()
+        )
+        if profile == old:
+            return
+        self.capture_profiles[str(spec)] = profile
+        if spec in self.pipelines:
+            self.stop_camera(spec)
+            self.start_camera(spec)
+    
+    def stop_all_cameras(self):
+        """Stop every camera"""
+        for spec in list(self.pipelines):
+            self.stop_camera(spec)
+    
+    def start_pipeline(self, pipeline):
+        """Start the capture and detection threads of an open camera"""
+        # The process backend splits the worker processes between the cameras
+        processes = self.detection_processes or max(1, (os.cpu_count() or 2) - 1)
+        pipeline.backend = self.detection_backend
+        pipeline.processes = max(1, processes // len(self.camera_specs()))
+        self.configure_pipeline(pipeline)
+        pipeline.start(is_enabled=lambda: self.detection_enabled and self.detector_available())
+    
+    def configure_pipeline(self, pipeline):
+        """Apply the detection controls to one camera"""
+        pipeline.configure(self.detection_size, self.detection_zones.zones, self.motion_gate, self.tracker,
+                           engine=self.detection_engine, engine_params=self.engine_params,
+                           min_score=self.confidence_threshold, budget=self.latency_budget,
+                           presence=self.presence, idle=self.idle)
+    
+    def configure_pipelines(self):
+        """Apply the detection controls to every camera"""
+        for pipeline in self.pipelines.values():
+            self.configure_pipeline(pipeline)
+    
+    def detector_available(self):
+        """Check whether the selected engine can run (Haar needs its cascades, DNN a model)"""
+        if self.detection_engine == 'haar':
+            return bool(self.cascades)
+        if self.detection_engine == 'dnn':
+            return os.path.isfile(self.engine_params.get('dnn', {}).get('model', ''))
+        return True
+    
+    def report_budget(self, pipeline, message):
+        """Log a latency budget decision (called from the workers)"""
+        print(f"Latency budget: {message}")
+    
+    def detections_can_fire(self):
+        """Check whether a detection could fire a keybind right now (called from the workers)"""
+        return self.fire_on_detection and not self.keybind_dispatcher.in_cooldown()
+    
+    def presence_changed(self, pipeline, event):
+        """Fire the arrival or departure keybinds of a camera"""
+        if pipeline.spec not in self.pipelines:
+            return
+        print(f"Person {'arrived' if event == 'enter' else 'left'}: {pipeline.description}")
+        if not (self.detection_enabled and self.detector_available()):
+            return
+        bindings = [(widget.selected_camera(), widget.action) for widget in self.keybind_widgets
+                    if widget.action is not None and widget.selected_event() == event]
+        keybinds = [(action.keys, action) for action in self.trigger_policy.select(bindings, [pipeline.spec])]
+        if keybinds and self.keybind_dispatcher.trigger(keybinds, cooldown=False):
+            self.metrics.increment('triggers')
+    
+    def idle_changed(self, pipeline, idle):
+        """Report a camera switching between the active and idle modes"""
+        if pipeline.spec not in self.pipelines:
+            return
+        if idle:
+            print(f"{pipeline.description} idle: {pipeline.mode or f'{self.idle.fps:g} fps'}")
+            self.status_label.setText(f"Status: {pipeline.description} idle, waiting for motion")
+        else:
+            print(f"{pipeline.description} active: {pipeline.mode or 'motion seen'}")
+            self.status_label.setText(f"Status: {self.active_description()} active")
+        if pipeline.spec == self.camera_index:
+            self.capture_mode_label.setText(pipeline.mode)
+    
+    def all_idle(self):
+        """Check whether every running camera is in the idle mode"""
+        return bool(self.pipelines) and all(pipeline.idle.idle for pipeline in self.pipelines.values())
+    
+    def source_ended(self, pipeline):
+        """Report that a video file has played to the end"""
+        self.status_label.setText(f"Status: {pipeline.description} finished")
+    
+    def post_result(self, pipeline, result):
+        """Hand a detection result to the GUI thread (called from the workers)
+        
+        Only the newest result of each camera is kept, and the signal is
+        emitted only when the GUI has consumed the previous ones, so a busy
+        event loop never accumulates a backlog of stale frames.
+        """
+        with self._result_lock:
+            pending = bool(self._latest_results)
+            self._latest_results[pipeline.spec] = result
+        if not pending:
+            self.pipeline_signals.result_ready.emit()
+    
+    def toggle_detection(self):
+        """Toggle human detection on/off"""
+        self.detection_enabled = not self.detection_enabled
+        
+        if self.detection_enabled:
+            self.start_btn.setText("Stop Detection")
+            self.start_btn.setStyleSheet("QPushButton { background-color: #f44336; color: white; font-weight: bold; padding: 10px; }")
+            for spec in self.camera_specs():
+                pipeline = self.pipelines.get(spec)
+                if pipeline is None or not pipeline.is_running():
+                    # Also restarts a video file that has played to the end
+                    self.stop_camera(spec)
+                    self.start_camera(spec)
+        else:
+            self.start_btn.setText("Start Detection")
+            self.start_btn.setStyleSheet("QPushButton { background-color: #4CAF50; color: white; font-weight: bold; padding: 10px; }")
+    
+    def update_confidence(self, value):
+        """Update confidence threshold"""
+        self.confidence_threshold = value / 100.0
+        self.configure_pipelines()
+    
+    def update_cooldown(self, value):
+        """Update cooldown period"""
+        self.cooldown_seconds = value
+        self.keybind_dispatcher.cooldown_seconds = value
+    
+    def update_trigger_policy(self, *args):
+        """Apply the trigger policy controls"""
+        self.trigger_policy.mode = self.policy_combo.currentData()
+        self.trigger_policy.quorum = self.quorum_spin.value()
+        self.quorum_spin.setEnabled(self.trigger_policy.mode == 'quorum')
+        for widget in self.keybind_widgets:
+            widget.camera_combo.setEnabled(self.trigger_policy.mode == 'per_camera')
+    
+    def update_backend(self, index):
+        """Switch the detection backend, restarting the running pipelines"""
+        backend = self.backend_combo.itemData(index)
+        if backend is None or backend == self.detection_backend:
+            return
+        self.detection_backend = backend
+        
+        for pipeline in self.pipelines.values():
+            if pipeline.is_running():
+                pipeline.stop()
+                self.start_pipeline(pipeline)
+    
+    def update_engine(self, index):
+        """Switch the detection engine; the running cameras pick it up on their next frame"""
+        engine = self.engine_combo.itemData(index)
+        if engine is None or engine == self.detection_engine:
+            return
+        self.detection_engine = engine
+        self.metrics.cascade_names = detector_stage_names(engine, self.cascade_paths)
+        self.cascade_time_averages = {}
+        self.model_btn.setEnabled(engine == 'dnn')
+        self.configure_pipelines()
+        if engine == 'dnn' and not self.detector_available():
+            self.status_label.setText("Status: Choose a DNN model file (Model...)")
+    
+    def choose_dnn_model(self):
+        """Pick the local model file (and its config) for the DNN engine"""
+        path, _ = QFileDialog.getOpenFileName(
+            self, "Open DNN Model", "",
+            "Models (*.onnx *.caffemodel *.pb *.tflite);;All Files (*)"
+        )
+        if not path:
+            return
+        config = ''
+        if not path.endswith(('.onnx', '.tflite')):
+            # Caffe and TensorFlow graphs keep the network layout in a separate file
+            config, _ = QFileDialog.getOpenFileName(
+                self, "Open Model Config", os.path.dirname(path),
+                "Model configs (*.prototxt *.pbtxt);;All Files (*)"
+            )
+        params = dict(self.engine_params.get('dnn', {}))
+        params['model'] = path
+        params['config'] = config
+        self.engine_params['dnn'] = params
+        self.model_btn.setToolTip(path)
+        self.configure_pipelines()
+    
+    def update_detection_size(self, index):
+        """Update the long edge of the image the detector runs on"""
+        size = self.detection_size_combo.itemData(index)
+        if size is None:
+            return
+        self.detection_size = size
+        self.configure_pipelines()
+    
+    def update_budget(self, value):
+        """Update the detection time target per frame (0 = off)"""
+        self.latency_budget.target = value / 1000.0
+        self.configure_pipelines()
+    
+    def update_motion_gate(self, *args):
+        """Apply the motion gate controls"""
+        self.motion_gate.enabled = self.motion_check.isChecked()
+        self.motion_gate.threshold = self.motion_threshold_spin.value() / 100.0
+        self.motion_gate.hold_seconds = self.motion_hold_spin.value()
+        self.motion_threshold_spin.setEnabled(self.motion_gate.enabled)
+        self.motion_hold_spin.setEnabled(self.motion_gate.enabled)
+        self.idle.motion.threshold = self.motion_gate.threshold
+        self.configure_pipelines()
+    
+    def update_tracking(self, *args):
+        """Apply the tracking controls"""
+        self.tracker.keyframe_interval = self.keyframe_spin.value()
+        self.tracker.interval = min(self.tracker.interval, self.tracker.keyframe_interval)
+        self.tracker.enabled = self.tracking_check.isChecked()
+        self.keyframe_spin.setEnabled(self.tracker.enabled)
+        self.configure_pipelines()
+    
+    def update_idle(self, value):
+        """Update the quiet time before the cameras go idle (0 = never)"""
+        self.idle.quiet_seconds = value
+        self.configure_pipelines()
+    
+    def update_presence(self, *args):
+        """Apply the presence controls"""
+        self.presence.check_seconds = self.presence_check_spin.value()
+        self.presence.leave_seconds = self.presence_leave_spin.value()
+        self.configure_pipelines()
+    
+    def toggle_zone_drawing(self, checked):
+        """Enter or leave zone drawing mode on the camera view"""
+        self.zone_drawing = checked
+        self.zone_points = []
+        self.zone_press_pos = None
+        self.draw_zone_btn.setText("Cancel Drawing" if checked else "Draw Zone")
+        self.camera_label.setCursor(Qt.CrossCursor if checked else Qt.ArrowCursor)
+    
+    def eventFilter(self, obj, event):
+        """Turn clicks on the camera view into zone vertices"""
+        if obj is self.camera_label and self.zone_drawing:
+            if event.type() == QEvent.MouseButtonPress:
+                if event.button() == Qt.RightButton:
+                    self.finish_zone(self.zone_points)
+                elif event.button() == Qt.LeftButton:
+                    self.zone_press_pos = self.label_to_frame(event.pos())
+                return True
+            
+            if event.type() == QEvent.MouseButtonRelease and event.button() == Qt.LeftButton:
+                start = self.zone_press_pos
+                end = self.label_to_frame(event.pos())
+                self.zone_press_pos = None
+                if start is None:
+                    return True
+                
+                dragged = abs(end[0] - start[0]) > 0.02 or abs(end[1] - start[1]) > 0.02
+                if dragged and not self.zone_points:
+                    x0, x1 = sorted((start[0], end[0]))
+                    y0, y1 = sorted((start[1], end[1]))
+                    self.finish_zone([(x0, y0), (x1, y0), (x1, y1), (x0, y1)])
+                else:
+                    self.zone_points.append(start)
+                return True
+        
+        return super().eventFilter(obj, event)
+    
+    def label_to_frame(self, pos):
+        """Convert a position on the camera view to normalized frame coordinates
+        
+        With several cameras the position is taken within the tile under
+        it; the zones apply to every camera.
+        """
+        # The image is stretched over the whole preview
+        width = max(1, self.camera_label.width())
+        height = max(1, self.camera_label.height())
+        x = min(max(pos.x() / width, 0.0), 1.0)
+        y = min(max(pos.y() / height, 0.0), 1.0)
+        cols, rows = self.preview_grid
+        col = min(int(x * cols), cols - 1)
+        row = min(int(y * rows), rows - 1)
+        return (x * cols - col, y * rows - row)
+    
+    def finish_zone(self, points):
+        """Store a finished zone and leave drawing mode"""
+        if len(points) < 3:
+            self.status_label.setText("Status: A zone needs at least 3 points")
+            return
+        
+        zones = list(self.detection_zones.zones)
+        zones.append(Zone(f"Zone {len(zones) + 1}", tuple(points), True))
+        self.detection_zones.set_zones(zones)
+        self.configure_pipelines()
+        self.draw_zone_btn.setChecked(False)
+        self.refresh_zone_list()
+    
+    def clear_zones(self):
+        """Remove all detection zones"""
+        self.detection_zones.set_zones([])
+        self.configure_pipelines()
+        self.draw_zone_btn.setChecked(False)
+        self.refresh_zone_list()
+    
+    def set_zone_enabled(self, index, enabled):
+        """Enable or disable a single zone"""
+        zones = list(self.detection_zones.zones)
+        if index < len(zones):
+            zones[index] = zones[index]._replace(enabled=enabled)
+            self.detection_zones.set_zones(zones)
+            self.configure_pipelines()
+    
+    def refresh_zone_list(self):
+        """Rebuild the zone checkboxes"""
+        while self.zone_list_layout.count():
+            item = self.zone_list_layout.takeAt(0)
+            if item.widget() is not None:
+                item.widget().deleteLater()
+        
+        for i, zone in enumerate(self.detection_zones.zones):
+            check = QCheckBox(zone.name)
+            check.setChecked(zone.enabled)
+            check.toggled.connect(lambda checked, index=i: self.set_zone_enabled(index, checked))
+            self.zone_list_layout.addWidget(check)
+    
+    def draw_zones(self, frame):
+        """Outline the zones (and the one being drawn) on a frame"""
+        height, width = frame.shape[:2]
+        for zone in self.detection_zones.zones:
+            points = np.array([(round(x * (width - 1)), round(y * (height - 1))) for x, y in zone.points],
+                              dtype=np.int32)
+            color = (0, 200, 255) if zone.enabled else (100, 100, 100)
+            cv2.polylines(frame, [points], True, color, 2)
+        
+        if self.zone_points:
+            points = np.array([(round(x * (width - 1)), round(y * (height - 1))) for x, y in self.zone_points],
+                              dtype=np.int32)
+            cv2.polylines(frame, [points], False, (255, 0, 255), 2)
+            for point in points:
+                cv2.circle(frame, tuple(int(v) for v in point), 4, (255, 0, 255), -1)
+    
+    def update_timing_status(self, result):
+        """Show a smoothed per-stage timing breakdown in the status bar"""
+        if not result.cascade_times:
+            return
+        
+        names = self.metrics.cascade_names
+        for name, elapsed in zip(names, result.cascade_times):
+            average = self.cascade_time_averages.get(name, elapsed)
+            self.cascade_time_averages[name] = 0.9 * average + 0.1 * elapsed
+        average = self.cascade_time_averages.get('total', result.detection_time)
+        self.cascade_time_averages['total'] = 0.9 * average + 0.1 * result.detection_time
+        
+        # Refresh the label at most twice a second
+        now = time.monotonic()
+        if now - self.last_timing_update < 0.5 or self.all_idle():
+            return
+        self.last_timing_update = now
+        
+        breakdown = ", ".join(f"{name} {self.cascade_time_averages[name] * 1000:.1f} ms"
+                              for name in names if name in self.cascade_time_averages)
+        text = (f"Status: {self.active_description()} active | "
+                f"Detection {self.cascade_time_averages['total'] * 1000:.1f} ms ({breakdown})")
+        pipeline = self.pipelines.get(self.camera_index)
+        if pipeline is not None and self.latency_budget.enabled:
+            text += f" | Budget {self.latency_budget.target * 1000:.0f} ms: {pipeline.budget_status()}"
+        self.status_label.setText(text)
+    
+    def trigger_all_keybinds(self, cameras=()):
+        """Queue the keybinds for the cameras that fired
+        
+        All cameras and trigger policies share this one cooldown.
+        """
+        current_time = time.time()
+        
+        # Check cooldown before doing any work
+        if self.keybind_dispatcher.in_cooldown(current_time):
+            return
+        
+        # Keybinds are compiled when edited, so this is just a lookup
+        bindings = [(widget.selected_camera(), widget.action) for widget in self.keybind_widgets
+                    if widget.action is not None and widget.selected_event() == 'detection']
+        keybinds = [(action.keys, action) for action in self.trigger_policy.select(bindings, cameras)]
+        if not keybinds:
+            # Nothing assigned to these cameras; leave the cooldown to the others
+            return
+        
+        if self.keybind_dispatcher.trigger(keybinds, current_time):
+            self.metrics.increment('triggers')
+    
+    def dispatch_keybind(self, action):
+        """Send one queued keybind (runs on the dispatcher thread)"""
+        print(f"Triggering: {action.name} - {action.keys}")
+        start = time.perf_counter()
+        self.key_injector.trigger(action)
+        self.metrics.observe('injection', time.perf_counter() - start)
+        self.metrics.increment('keybinds_injected')
+    
+    def update_frame(self):
+        """Apply the latest detection results (runs on the GUI thread)
+        
+        Triggers run for every result; the preview is only scheduled and is
+        redrawn at most preview_fps times a second.
+        """
+        with self._result_lock:
+            results = self._latest_results
+            self._latest_results = {}
+        if not results:
+            return
+        
+        if not STARTUP.finished:
+            report = STARTUP.finish()
+            self.metrics.startup = dict(STARTUP.stages)
+            print(report)
+        
+        fired = []
+        for spec, result in results.items():
+            if spec not in self.pipelines:
+                # Removed while the result was on its way
+                continue
+            self.update_timing_status(result)
+            self.preview_results[spec] = result
+            if self.detection_enabled and self.detector_available():
+                # Let the trigger policy decide whether this detection fires
+                fired.extend(self.trigger_policy.update(spec, len(result.humans) > 0))
+        
+        # Trigger keybinds if humans detected
+        if fired:
+            self.trigger_all_keybinds(fired)
+        
+        if not self.all_idle():
+            # Idle cameras keep the last picture of the active mode
+            self.schedule_preview()
+        
+        now = time.perf_counter()
+        if now - self.last_metrics_update >= 0.5:
+            self.last_metrics_update = now
+            self.statusBar().showMessage(self.metrics.status_text())
+    
+    def schedule_preview(self):
+        """Redraw the preview as soon as its frame rate allows"""
+        self.preview_dirty = True
+        if self.preview_fps and not self.preview_timer.isActive():
+            delay = self.last_preview + 1.0 / self.preview_fps - time.perf_counter()
+            self.preview_timer.start(max(0, int(delay * 1000)))
+    
+    def render_preview(self):
+        """Draw the newest result of every camera into the preview"""
+        if not self.preview_fps or not self.preview_dirty:
+            return
+        self.preview_dirty = False
+        self.last_preview = time.perf_counter()
+        
+        results = [(spec, self.preview_results[spec])
+                   for spec in self.camera_specs() if spec in self.preview_results]
+        if not results:
+            return
+        
+        draw_start = time.perf_counter()
+        if len(results) == 1:
+            self.preview_grid = (1, 1)
+            image = self.render_tile(*results[0])
+        else:
+            # The grid is about as large as the first frame, so it costs
+            # the same to display however many cameras are shown
+            cols = math.ceil(math.sqrt(len(results)))
+            rows = math.ceil(len(results) / cols)
+            height, width = results[0][1].frame.shape[:2]
+            tile_width, tile_height = width // cols, height // cols
+            image = np.zeros((tile_height * rows, tile_width * cols, 3), dtype=np.uint8)
+            for i, (spec, result) in enumerate(results):
+                row, col = divmod(i, cols)
+                image[row * tile_height:(row + 1) * tile_height, col * tile_width:(col + 1) * tile_width] = \
+                    self.render_tile(spec, result, (tile_width, tile_height))
+            self.preview_grid = (cols, rows)
+        
+        convert_start = time.perf_counter()
+        self.camera_label.set_frame(image)
+        self.metrics.observe('draw', convert_start - draw_start)
+        self.metrics.observe('convert', time.perf_counter() - convert_start)
+    
+    def render_tile(self, spec, result, size=None):
+        """Preview image of one camera with the overlays drawn on a copy
+        
+        The detector's frame is never drawn on. size scales the tile to
+        (width, height).
+        """
+        frame = result.frame
+        height, width = frame.shape[:2]
+        if size is None or size == (width, height):
+            tile = frame.copy() if frame.ndim == 3 else frame
+            scale_x = scale_y = 1.0
+        else:
+            tile = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+            scale_x, scale_y = size[0] / width, size[1] / height
+        if tile.ndim == 2:
+            # Luma-only capture; the overlays are still drawn in colour
+            tile = cv2.cvtColor(tile, cv2.COLOR_GRAY2BGR)
+        
+        humans = result.humans
+        if self.detection_enabled and self.detector_available():
+            # Draw rectangles around detected humans
+            for i, (x, y, w, h) in enumerate(humans):
+                label = f"Human #{result.track_ids[i]}" if result.track_ids else 'Human'
+                x, y = round(x * scale_x), round(y * scale_y)
+                w, h = round(w * scale_x), round(h * scale_y)
+                cv2.rectangle(tile, (x, y), (x+w, y+h), (0, 255, 0), 2)
+                cv2.putText(tile, label, (x, y-10), 
+                           cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 255, 0), 2)
+        
+        if self.detection_zones.zones or self.zone_drawing:
+            self.draw_zones(tile)
+        
+        # Add status overlay
+        status_text = f"Detection: {'ON' if self.detection_enabled else 'OFF'} | Humans: {len(humans)}"
+        if len(self.pipelines) > 1:
+            status_text = f"{self.camera_label_for(spec)} | {status_text}"
+        cv2.putText(tile, status_text, (10, 30), 
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0) if self.detection_enabled else (128, 128, 128), 2)
+        return tile
+    
+    def update_preview_rate(self, index):
+        """Change the preview frame rate, or turn the preview off"""
+        fps = self.preview_combo.itemData(index)
+        if fps is None:
+            return
+        self.preview_fps = fps
+        if fps:
+            self.schedule_preview()
+        else:
+            self.preview_timer.stop()
+            self.camera_label.show_message("Preview off")
+    
+    def save_settings(self, show_message=True):
+        """Save settings to file"""
+        settings = {
+            'confidence': self.confidence_spin.value(),
+            'cooldown': self.cooldown_spin.value(),
+            'camera': self.camera_index,
+            'cameras': self.camera_specs(),
+            'trigger_policy': self.trigger_policy.mode,
+            'trigger_quorum': self.trigger_policy.quorum,
+            'detection_backend': self.detection_backend,
+            'detection_engine': self.detection_engine,
+            'engine_params': self.engine_params,
+            'detection_processes': self.detection_processes,
+            'capture_profiles': {spec: profile._asdict() for spec, profile in self.capture_profiles.items()},
+            'detection_size': self.detection_size,
+            'latency_budget': dict(self.latency_budget.bounds._asdict(),
+                                   target_ms=round(self.latency_budget.target * 1000)),
+            'preview_fps': self.preview_fps,
+            'motion_gate': self.motion_gate.enabled,
+            'motion_threshold': self.motion_threshold_spin.value(),
+            'motion_hold': self.motion_hold_spin.value(),
+            'motion_refresh': self.motion_gate.refresh_seconds,
+            'tracking': self.tracker.enabled,
+            'keyframe_interval': self.tracker.keyframe_interval,
+            'adaptive_keyframes': self.tracker.adaptive,
+            'presence_check': self.presence.check_seconds,
+            'presence_leave': self.presence.leave_seconds,
+            'idle_mode': self.idle.to_settings(),
+            'zones': self.detection_zones.to_settings(),
+            'metrics_textfile': self.metrics_textfile,
+            'metrics_json': self.metrics_json,
+            'metrics_interval': self.metrics_interval,
+            'keybinds': [widget.get_keybind() for widget in self.keybind_widgets]
+        }
+        
+        # The watcher skips the file change this save causes
+        settings = self.settings_watcher.expect(settings)
+        future = self.settings_executor.submit(save_settings_file, settings)
+        if show_message:
+            future.add_done_callback(
+                lambda future: self.pipeline_signals.settings_saved.emit(future.exception()))
+        return future
+    
+    def settings_saved(self, error):
+        """Report a save finished by the settings thread"""
+        if error is None:
+            QMessageBox.information(self, "Settings Saved", "Settings have been saved successfully!")
+        else:
+            QMessageBox.critical(self, "Error", f"Failed to save settings: {error}")
+    
+    def load_settings(self):
+        """Load settings from file"""
+        path = settings_path()
+        try:
+            if os.path.exists(path):
+                with open(path, 'r') as f:
+                    settings = json.load(f)
+                self.settings_watcher.expect(settings)
+                self.apply_settings(settings)
+                if path != config_path(SETTINGS_FILE):
+                    # Move settings left by older versions to the file the watcher follows
+                    try:
+                        save_settings_file(settings)
+                    except OSError as e:
+                        print(f"⚠ Could not move settings to {config_path(SETTINGS_FILE)}: {e}")
+        except Exception as e:
+            print(f"Failed to load settings: {e}")
+    
+    def apply_settings(self, settings):
+        """Set the widgets from a settings dict; their handlers apply the values"""
+        self.confidence_spin.setValue(settings.get('confidence', 50))
+        self.cooldown_spin.setValue(settings.get('cooldown', 2))
+        
+        # Selected once the camera list is known (see populate_cameras)
+        self.preferred_camera = settings.get('camera', self.preferred_camera)
+        self.preferred_extra_cameras = [spec for spec in settings.get('cameras', [])
+                                        if spec != self.preferred_camera]
+        for spec in [self.preferred_camera] + self.preferred_extra_cameras:
+            self.add_saved_source(spec)
+        
+        policy = settings.get('trigger_policy', 'any')
+        if policy not in TRIGGER_POLICIES:
+            print(f"Warning: Unknown trigger policy '{policy}', triggering on any camera")
+            policy = 'any'
+        self.quorum_spin.setValue(int(settings.get('trigger_quorum', self.quorum_spin.value())))
+        self.policy_combo.setCurrentIndex(self.policy_combo.findData(policy))
+        
+        self.capture_profiles = {str(spec): capture_profile_from_settings(item)
+                                 for spec, item in settings.get('capture_profiles', {}).items()}
+        self.refresh_capture_controls()
+        
+        self.detection_processes = int(settings.get('detection_processes', 0))
+        backend = settings.get('detection_backend', 'thread')
+        if backend not in DETECTION_BACKENDS:
+            print(f"Warning: Unknown detection backend '{backend}', using in-process detection")
+            backend = 'thread'
+        self.backend_combo.setCurrentIndex(self.backend_combo.findData(backend))
+        
+        self.engine_params = dict(settings.get('engine_params', {}))
+        model = self.engine_params.get('dnn', {}).get('model')
+        if model:
+            self.model_btn.setToolTip(model)
+        engine = settings.get('detection_engine', 'haar')
+        if engine not in DETECTION_ENGINES:
+            print(f"Warning: Unknown detection engine '{engine}', using Haar cascades")
+            engine = 'haar'
+        self.engine_combo.setCurrentIndex(self.engine_combo.findData(engine))
+        
+        size = int(settings.get('detection_size', self.detection_size))
+        if self.detection_size_combo.findData(size) < 0:
+            # Custom size from the settings file
+            self.detection_size_combo.addItem(f"{size} px", size)
+        self.detection_size_combo.setCurrentIndex(self.detection_size_combo.findData(size))
+        
+        target, self.latency_budget.bounds = budget_from_settings(settings.get('latency_budget', {}))
+        self.budget_spin.setValue(round(target * 1000))
+        
+        fps = int(settings.get('preview_fps', self.preview_fps))
+        if self.preview_combo.findData(fps) < 0:
+            # Custom rate from the settings file
+            self.preview_combo.addItem(f"{fps} fps", fps)
+        self.preview_combo.setCurrentIndex(self.preview_combo.findData(fps))
+        
+        self.motion_gate.refresh_seconds = float(settings.get('motion_refresh', self.motion_gate.refresh_seconds))
+        self.motion_threshold_spin.setValue(int(settings.get('motion_threshold', self.motion_threshold_spin.value())))
+        self.motion_hold_spin.setValue(int(settings.get('motion_hold', self.motion_hold_spin.value())))
+        self.motion_check.setChecked(bool(settings.get('motion_gate', self.motion_gate.enabled)))
+        
+        self.tracker.adaptive = bool(settings.get('adaptive_keyframes', self.tracker.adaptive))
+        self.keyframe_spin.setValue(int(settings.get('keyframe_interval', self.keyframe_spin.value())))
+        self.tracking_check.setChecked(bool(settings.get('tracking', self.tracker.enabled)))
+        
+        self.presence_check_spin.setValue(round(float(settings.get('presence_check', self.presence.check_seconds))))
+        self.presence_leave_spin.setValue(round(float(settings.get('presence_leave', self.presence.leave_seconds))))
+        
+        idle = IdleMonitor.from_settings(settings.get('idle_mode', {}))
+        self.idle.width, self.idle.height, self.idle.fps = idle.width, idle.height, idle.fps
+        self.idle_spin.setValue(round(idle.quiet_seconds))
+        
+        self.detection_zones.set_zones(DetectionZones.from_settings(settings.get('zones', [])))
+        self.configure_pipelines()
+        self.refresh_zone_list()
+        
+        self.metrics_textfile = settings.get('metrics_textfile', '')
+        self.metrics_json = settings.get('metrics_json', '')
+        self.metrics_interval = float(settings.get('metrics_interval', 10))
+        
+        # Clear existing keybinds
+        for widget in self.keybind_widgets[:]:
+            self.remove_keybind(widget)
+        
+        # Load saved keybinds
+        keybinds = settings.get('keybinds', [])
+        if keybinds:
+            for kb in keybinds:
+                self.add_keybind()
+                if self.keybind_widgets:
+                    self.keybind_widgets[-1].set_keybind(kb.get('name', ''), kb.get('keys', ''),
+                                                         kb.get('camera'), kb.get('event', 'detection'))
+    
+    def reload_settings(self, settings):
+        """Apply settings edited outside the app while the cameras run"""
+        old_profiles = self.capture_profiles
+        old_metrics = (self.metrics_textfile, self.metrics_json, self.metrics_interval)
+        self.apply_settings(settings)
+        
+        # Only cameras that were swapped or given a new capture profile are reopened
+        specs = settings.get('cameras') or [settings.get('camera', self.camera_index)]
+        primary = settings.get('camera', specs[0])
+        if primary != self.camera_index and primary in self.available_cameras:
+            self.camera_combo.setCurrentIndex(self.available_cameras.index(primary))
+        for spec in self.extra_cameras[:]:
+            if spec not in specs:
+                self.remove_camera(spec)
+        for spec in specs:
+            if spec in self.camera_specs():
+                if (self.capture_profile_for(spec) != old_profiles.get(str(spec), DEFAULT_CAPTURE_PROFILE)
+                        and spec in self.pipelines):
+                    self.stop_camera(spec)
+                    self.start_camera(spec)
+            elif spec in self.available_cameras:
+                self.add_camera(spec)
+        
+        if (self.metrics_textfile, self.metrics_json, self.metrics_interval) != old_metrics:
+            if self.metrics_exporter is not None:
+                self.metrics_exporter.stop()
+                self.metrics_exporter = None
+            self.start_metrics_exporter()
+        self.status_label.setText("Status: Settings reloaded")
+        print("✓ Settings reloaded")
+    
+    def closeEvent(self, event):
+        """Clean up on close"""
+        # Auto-save settings silently, and wait for the write to finish
+        try:
+            self.save_settings(show_message=False)
+        except:
+            pass
+        self.settings_watcher.stop()
+        self.settings_executor.shutdown(wait=True)
+        
+        self.stop_all_cameras()
+        self.keybind_dispatcher.stop()
+        if self.metrics_exporter is not None:
+            self.metrics_exporter.stop()
+        event.accept()
@@ -0,0 +1,434 @@
+#!/usr/bin/env python3
+"""
+Headless daemon for the Human Detection Camera Application
+Runs capture -> detect -> trigger from the saved settings, without Qt
+"""
+
+import os
+import sys
+import json
+import time
+import signal
+import logging
+import threading
+
+from human_detection_core import (load_cascades, CameraPipeline, MotionGate, BoxTracker, DetectionZones,
+                                  KeybindDispatcher, KeyInjector, TriggerPolicy, TRIGGER_POLICIES,
+                                  PresenceMonitor, PRESENCE_EVENTS, IdleMonitor,
+                                  compile_keybind, KeybindError, DETECTION_BACKENDS, DETECTION_ENGINES,
+                                  PipelineMetrics, MetricsExporter, detector_stage_names, STARTUP,
+                                  LatencyBudget, budget_from_settings,
+                                  capture_profile_from_settings, settings_path, SettingsWatcher)
+
+log = logging.getLogger("human_detection")
+
+class HeadlessDetector:
+    """Detection pipeline driven by a settings dict instead of widgets
+
+    Uses the same settings keys the GUI saves, so a configuration made in
+    the GUI can be copied to a machine without a display. Every camera in
+    the settings runs its own CameraPipeline; the trigger policy decides
+    which detections fire keybinds, under one shared cooldown.
+    """
+
+    def __init__(self, settings, source=None, stats_interval=60, realtime=True, loop=False):
+        self.source = source
+        self.realtime = realtime
+        self.loop = loop
+        self.stats_interval = stats_interval
+        self.settings = {}
+
+        self.motion_gate = MotionGate()
+        self.tracker = BoxTracker()
+        self.trigger_policy = TriggerPolicy()
+        self.key_injector = KeyInjector()
+        self.keybind_dispatcher = KeybindDispatcher(self.dispatch_keybind)
+        self.presence = PresenceMonitor(armed=self.detections_can_fire)
+        self.apply_settings(settings)
+
+        self.cascades, self.cascade_paths = load_cascades()
+        STARTUP.mark('cascades')
+
+        self.pipelines = []
+        self.metrics = PipelineMetrics(detector_stage_names(self.detection_engine, self.cascade_paths))
+        self.metrics_exporter = self.create_metrics_exporter()
+
+        self._pending_settings = None
+        self._stop_event = threading.Event()
+
+    def apply_settings(self, settings):
+        """Read the settings into the detector; returns the keys that changed
+        
+        The shared gate, tracker, policy, dispatcher and presence objects
+        are updated in place, so running pipelines pick them up on their
+        next configure().
+        """
+        changed = {key for key in set(settings) | set(self.settings)
+                   if settings.get(key) != self.settings.get(key)}
+        self.settings = dict(settings)
+
+        if self.source is not None:
+            self.sources = [self.source]
+        else:
+            self.sources = list(settings.get('cameras') or [settings.get('camera', 0)])
+        self.capture_profiles = {str(spec): capture_profile_from_settings(item)
+                                 for spec, item in settings.get('capture_profiles', {}).items()}
+        self.detection_size = int(settings.get('detection_size', 640))
+        self.detection_processes = int(settings.get('detection_processes', 0))
+        self.detection_backend = settings.get('detection_backend', 'thread')
+        if self.detection_backend not in DETECTION_BACKENDS:
+            log.warning("Unknown detection backend '%s', using in-process detection",
+                        self.detection_backend)
+            self.detection_backend = 'thread'
+        self.detection_engine = settings.get('detection_engine', 'haar')
+        if self.detection_engine not in DETECTION_ENGINES:
+            log.warning("Unknown detection engine '%s', using Haar cascades", self.detection_engine)
+            self.detection_engine = 'haar'
+        self.engine_params = dict(settings.get('engine_params', {}))
+        self.min_score = settings.get('confidence', 50) / 100.0
+
+        self.motion_gate.threshold = settings.get('motion_threshold', 1) / 100.0
+        self.motion_gate.hold_seconds = settings.get('motion_hold', 2)
+        self.motion_gate.refresh_seconds = settings.get('motion_refresh', 10.0)
+        self.motion_gate.enabled = bool(settings.get('motion_gate', True))
+        self.tracker.keyframe_interval = int(settings.get('keyframe_interval', 10))
+        self.tracker.adaptive = bool(settings.get('adaptive_keyframes', True))
+        self.tracker.enabled = bool(settings.get('tracking', True))
+        self.zones = DetectionZones.from_settings(settings.get('zones', []))
+        self.latency_budget = LatencyBudget(*budget_from_settings(settings.get('latency_budget', {})))
+        self.idle = IdleMonitor.from_settings(settings.get('idle_mode', {}))
+        self.idle.motion.threshold = self.motion_gate.threshold
+        policy = settings.get('trigger_policy', 'any')
+        self.trigger_policy.mode = policy if policy in TRIGGER_POLICIES else 'any'
+        self.trigger_policy.quorum = int(settings.get('trigger_quorum', 2))
+
+        # event -> (camera, action) pairs; camera None fires for every camera
+        bindings = {event: [] for event in PRESENCE_EVENTS}
+        for kb in settings.get('keybinds', []):
+            try:
+                action = compile_keybind(kb.get('name', ''), kb.get('keys', ''))
+            except KeybindError as e:
+                log.warning("Skipping keybind '%s': %s", kb.get('name', ''), e)
+                continue
+            event = kb.get('event', 'detection')
+            if event not in PRESENCE_EVENTS:
+                log.warning("Keybind '%s' fires on unknown event '%s', using 'detection'", action.name, event)
+                event = 'detection'
+            bindings[event].append((kb.get('camera'), action))
+        self.bindings = bindings
+
+        self.keybind_dispatcher.cooldown_seconds = settings.get('cooldown', 2)
+        self.presence.check_seconds = float(settings.get('presence_check', 1.0))
+        self.presence.leave_seconds = float(settings.get('presence_leave', 3.0))
+        return changed
+
+    def create_metrics_exporter(self):
+        """MetricsExporter for the metrics files in the settings, or None"""
+        if not (self.settings.get('metrics_textfile') or self.settings.get('metrics_json')):
+            return None
+        return MetricsExporter(
+            self.metrics,
+            self.settings.get('metrics_textfile'),
+            self.settings.get('metrics_json'),
+            float(self.settings.get('metrics_interval', 10))
+        )
+
+    def on_result(self, pipeline, result):
+        """Trigger keybinds for a detection result (called from the workers)"""
+        if not STARTUP.finished:
+            log.info("%s", STARTUP.finish())
+            self.metrics.startup = dict(STARTUP.stages)
+        cameras = self.trigger_policy.update(pipeline.spec, bool(result.humans))
+        if cameras and not self.keybind_dispatcher.in_cooldown():
+            actions = self.trigger_policy.select(self.bindings['detection'], cameras)
+            if not actions:
+                # Nothing fires on every detection here; leave the cooldown to the others
+                return
+            log.info("Detected %d human(s) on %s", len(result.humans), pipeline.description)
+            if self.keybind_dispatcher.trigger([(action.keys, action) for action in actions]):
+                self.metrics.increment('triggers')
+
+    def detections_can_fire(self):
+        """Check whether a detection could fire a keybind right now"""
+        return bool(self.bindings['detection']) and not self.keybind_dispatcher.in_cooldown()
+
+    def on_presence(self, pipeline, event):
+        """Fire the arrival or departure keybinds of a camera (called from the workers)"""
+        log.info("Person %s on %s", "arrived" if event == 'enter' else "left", pipeline.description)
+        actions = self.trigger_policy.select(self.bindings[event], [pipeline.spec])
+        if actions and self.keybind_dispatcher.trigger([(action.keys, action) for action in actions],
+                                                       cooldown=False):
+            self.metrics.increment('triggers')
+
+    def on_idle(self, pipeline, idle):
+        """Log a switch between the active and idle modes (called from the capture threads)"""
+        if idle:
+            log.info("%s idle after %.0f s without motion: %s", pipeline.description,
+                     self.idle.quiet_seconds, pipeline.mode or f"{self.idle.fps:g} fps")
+        else:
+            log.info("%s active: %s", pipeline.description, pipeline.mode or "motion seen")
+
+    def on_budget(self, pipeline, message):
+        """Log a latency budget decision (called from the workers)"""
+        log.info("Latency budget: %s", message)
+
+    def dispatch_keybind(self, action):
+        """Send one queued keybind (runs on the dispatcher thread)"""
+        log.info("Triggering: %s - %s", action.name, action.keys)
+        start = time.perf_counter()
+        self.key_injector.trigger(action)
+        self.metrics.observe('injection', time.perf_counter() - start)
+        self.metrics.increment('keybinds_injected')
+
+    def check_engine(self):
+        """Log why the configured engine cannot run; returns whether it can"""
+        if self.detection_engine == 'haar' and not self.cascades:
+            log.error("No cascade classifiers loaded")
+            return False
+        model = self.engine_params.get('dnn', {}).get('model', '')
+        if self.detection_engine == 'dnn' and not os.path.isfile(model):
+            log.error("DNN model not found: '%s' (set model under engine_params.dnn)", model)
+            return False
+        return True
+
+    def processes_per_camera(self):
+        """Worker processes of each camera; the process backend splits them between the cameras"""
+        processes = self.detection_processes or max(1, (os.cpu_count() or 2) - 1)
+        return max(1, processes // len(self.sources))
+
+    def configure_pipeline(self, pipeline):
+        """Copy the current settings into a pipeline, running or not"""
+        pipeline.configure(detection_size=self.detection_size, zones=self.zones,
+                           motion_gate=self.motion_gate, tracker=self.tracker,
+                           engine=self.detection_engine, engine_params=self.engine_params,
+                           min_score=self.min_score, budget=self.latency_budget,
+                           presence=self.presence, idle=self.idle)
+
+    def open_pipeline(self, source, cascades=None):
+        """Create and open the pipeline of one source; returns None if it cannot be opened"""
+        pipeline = CameraPipeline(
+            source,
+            self.cascade_paths,
+            on_result=self.on_result,
+            on_budget=self.on_budget,
+            on_presence=self.on_presence,
+            on_idle=self.on_idle,
+            metrics=self.metrics,
+            cascades=cascades,
+            backend=self.detection_backend,
+            processes=self.processes_per_camera(),
+            realtime=self.realtime,
+            loop=self.loop,
+            profile=self.capture_profiles.get(str(source))
+        )
+        self.configure_pipeline(pipeline)
+        try:
+            opened = pipeline.open()
+        except ValueError as e:
+            log.error("Invalid source %s: %s", source, e)
+            return None
+        if not opened:
+            log.error("Failed to open %s", pipeline.description)
+            return None
+        return pipeline
+
+    def start_pipeline(self, pipeline):
+        """Start the threads of an open pipeline and log what it runs"""
+        pipeline.start(is_enabled=lambda: True)
+        log.info("%s active, %s, %s detection%s", pipeline.description,
+                 DETECTION_ENGINES[pipeline.engine],
+                 DETECTION_BACKENDS[pipeline.backend].lower(),
+                 "" if pipeline.camera.realtime else ", unpaced")
+        if pipeline.mode:
+            log.info("%s capturing %s", pipeline.description, pipeline.mode)
+
+    def start(self):
+        """Open the cameras and start their capture and detection threads"""
+        if not self.check_engine():
+            return False
+
+        for i, source in enumerate(self.sources):
+            pipeline = self.open_pipeline(source, self.cascades if i == 0 else None)
+            if pipeline is None:
+                return False
+            self.pipelines.append(pipeline)
+        STARTUP.mark('camera_open')
+
+        self.keybind_dispatcher.start()
+        for pipeline in self.pipelines:
+            self.start_pipeline(pipeline)
+        if self.metrics_exporter is not None:
+            self.metrics_exporter.start()
+        log.info("%d keybind(s), trigger policy: %s", sum(map(len, self.bindings.values())),
+                 TRIGGER_POLICIES[self.trigger_policy.mode].lower())
+        if self.latency_budget.enabled:
+            log.info("Latency budget %.0f ms per frame, at most %s", self.latency_budget.target * 1000,
+                     self.latency_budget.bounds)
+        return True
+
+    def request_reload(self, settings):
+        """Hand new settings to run() (called from the settings watcher)"""
+        self._pending_settings = settings
+
+    def reload(self, settings):
+        """Apply changed settings to the running pipelines
+        
+        Keybinds, cooldown, trigger policy, detector and gating settings
+        take effect in place; a backend change restarts the detection
+        threads, and only cameras that were added, removed or given a new
+        capture profile are opened or closed.
+        """
+        old_engine = (self.detection_engine, self.engine_params)
+        old_engine_settings = {key: self.settings[key] for key in ('detection_engine', 'engine_params')
+                               if key in self.settings}
+        old_profiles = self.capture_profiles
+        old_exporter = (self.settings.get('metrics_textfile'), self.settings.get('metrics_json'),
+                        self.settings.get('metrics_interval'))
+        changed = self.apply_settings(settings)
+        if not changed:
+            return
+        if (self.detection_engine, self.engine_params) != old_engine and not self.check_engine():
+            log.warning("Keeping the %s engine", DETECTION_ENGINES[old_engine[0]])
+            self.detection_engine, self.engine_params = old_engine
+            # The rejected values never took effect, so they are not the current settings either
+            for key in ('detection_engine', 'engine_params'):
+                if key in old_engine_settings:
+                    self.settings[key] = old_engine_settings[key]
+                else:
+                    self.settings.pop(key, None)
+            changed -= {'detection_engine', 'engine_params'}
+
+        processes = self.processes_per_camera()
+        running = {pipeline.spec: pipeline for pipeline in self.pipelines}
+        pipelines = []
+        for source in self.sources:
+            pipeline = running.pop(source, None)
+            profile = self.capture_profiles.get(str(source))
+            if pipeline is not None and profile != old_profiles.get(str(source)):
+                log.info("Reopening %s for its new capture profile", pipeline.description)
+                pipeline.close()
+                pipeline = None
+            if pipeline is None:
+                pipeline = self.open_pipeline(source)
+                if pipeline is not None:
+                    self.start_pipeline(pipeline)
+                    pipelines.append(pipeline)
+                continue
+            self.configure_pipeline(pipeline)
+            if (pipeline.backend, pipeline.processes) != (self.detection_backend, processes):
+                pipeline.stop()
+                pipeline.backend = self.detection_backend
+                pipeline.processes = processes
+                self.start_pipeline(pipeline)
+            pipelines.append(pipeline)
+        for pipeline in running.values():
+            log.info("%s removed", pipeline.description)
+            pipeline.close()
+            self.trigger_policy.forget(pipeline.spec)
+        self.pipelines = pipelines
+        if not pipelines:
+            log.warning("No cameras running; waiting for the settings to change")
+
+        if (self.settings.get('metrics_textfile'), self.settings.get('metrics_json'),
+                self.settings.get('metrics_interval')) != old_exporter:
+            if self.metrics_exporter is not None:
+                self.metrics_exporter.stop()
+                self.metrics_exporter.join(timeout=2)
+            self.metrics_exporter = self.create_metrics_exporter()
+            if self.metrics_exporter is not None:
+                self.metrics_exporter.start()
+        self.metrics.cascade_names = detector_stage_names(self.detection_engine, self.cascade_paths)
+        if changed:
+            log.info("Settings reloaded: %s", ", ".join(sorted(changed)))
+
+    def log_stats(self):
+        """Log the current pipeline metrics"""
+        log.info("%s", self.metrics.status_text())
+
+    def run(self):
+        """Block until stop() is called or every finite source is fully processed
+        
+        Logs stats periodically; returns False if a pipeline thread died.
+        """
+        next_stats = time.monotonic() + self.stats_interval
+        while not self._stop_event.wait(0.2):
+            settings, self._pending_settings = self._pending_settings, None
+            if settings is not None:
+                self.reload(settings)
+            if self.pipelines and all(pipeline.finished() for pipeline in self.pipelines):
+                log.info("End of stream")
+                self.log_stats()
+                break
+            if any(pipeline.failed() for pipeline in self.pipelines):
+                log.error("Pipeline thread exited unexpectedly")
+                return False
+            if time.monotonic() >= next_stats:
+                next_stats += self.stats_interval
+                self.log_stats()
+        return True
+
+    def stop(self):
+        """Ask run() to return (safe to call from a signal handler)"""
+        self._stop_event.set()
+
+    def shutdown(self):
+        """Stop all threads and release the cameras"""
+        for pipeline in self.pipelines:
+            pipeline.close()
+        self.pipelines = []
+        self.keybind_dispatcher.stop()
+        if self.metrics_exporter is not None and self.metrics_exporter.is_alive():
+            self.metrics_exporter.stop()
+            self.metrics_exporter.join(timeout=2)
+
+def load_settings(path):
+    """Read the settings file written by the GUI"""
+    if not os.path.exists(path):
+        log.warning("Settings file %s not found, using defaults", path)
+        return {}
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def run_headless(path=None, source=None, stats_interval=60, realtime=True, loop=False):
+    """Run the daemon until SIGTERM or SIGINT; returns the exit status
+    
+    path defaults to the settings file in the config directory, which is
+    watched and reapplied while the daemon runs. source overrides the
+    cameras from the settings (see open_frame_source). Video files and
+    image directories stop the daemon once all have ended.
+    """
+    # stdout, where the core's own messages go too
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s", stream=sys.stdout)
+
+    path = path or settings_path()
+    try:
+        settings = load_settings(path)
+    except (OSError, ValueError) as e:
+        log.error("Failed to load settings: %s", e)
+        return 1
+
+    detector = HeadlessDetector(settings, source, stats_interval, realtime, loop)
+    if not any(detector.bindings.values()):
+        log.warning("No keybinds configured; detections will only be logged")
+
+    def handle_signal(signum, frame):
+        log.info("Received %s, shutting down", signal.Signals(signum).name)
+        detector.stop()
+
+    signal.signal(signal.SIGTERM, handle_signal)
+    signal.signal(signal.SIGINT, handle_signal)
+
+    watcher = SettingsWatcher(path, detector.request_reload)
+    watcher.expect(settings)
+    try:
+        if not detector.start():
+            return 1
+        watcher.start()
+        log.info("Watching %s for changes", os.path.abspath(path))
+        if not detector.run():
+            return 1
+    finally:
+        watcher.stop()
+        detector.shutdown()
+    log.info("Stopped")
+    return 0
@@ -0,0 +1,46 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+import pytest
+
+from human_detection_core import DetectionZones, Zone, create_detector, detect_humans
+
+# Two zones, so each stage has several crops to scan
+ZONES = [Zone("left", [(0.0, 0.1), (0.45, 0.1), (0.45, 0.9), (0.0, 0.9)], True),
+         Zone("right", [(0.55, 0.1), (1.0, 0.1), (1.0, 0.9), (0.55, 0.9)], True)]
+
+CASCADE_FILES = ['haarcascade_fullbody.xml', 'haarcascade_upperbody.xml']
+
+def haar_detector():
+    paths = [os.path.join(cv2.data.haarcascades, name) for name in CASCADE_FILES]
+    if not all(os.path.exists(path) for path in paths):
+        pytest.skip("OpenCV Haar cascades not installed")
+    return create_detector('haar', paths)
+
+def scene(seed, width=960, height=540):
+    """Blurred noise with a few person-like shapes, so the cascades have something to find"""
+    rng = np.random.default_rng(seed)
+    frame = cv2.GaussianBlur(rng.integers(0, 256, (height, width, 3), dtype=np.uint8), (0, 0), 3)
+    for _ in range(4):
+        x = int(rng.integers(40, width - 120))
+        y = int(rng.integers(40, height - 300))
+        shade = tuple(int(v) for v in rng.integers(0, 120, 3))
+        cv2.ellipse(frame, (x + 40, y + 30), (22, 28), 0, 0, 360, shade, -1)
+        cv2.rectangle(frame, (x + 10, y + 60), (x + 70, y + 170), shade, -1)
+        cv2.rectangle(frame, (x + 15, y + 170), (x + 35, y + 260), shade, -1)
+        cv2.rectangle(frame, (x + 45, y + 170), (x + 65, y + 260), shade, -1)
+    return frame
+
+def test_zoned_parallel_detection_matches_serial():
+    detector = haar_detector()
+    zones = DetectionZones(ZONES)
+    # More workers than stages, so nothing but the job layout keeps a
+    # classifier from being handed two crops at once
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        for seed in range(6):
+            frame = scene(seed)
+            serial = detect_humans(detector, frame, zones=zones)
+            parallel = detect_humans(detector, frame, executor=executor, zones=zones)
+            assert sorted(serial) == sorted(parallel)
@@ -0,0 +1,76 @@
+import cv2
+import numpy as np
+import pytest
+
+import human_detection_core as core
+from human_detection_core import create_detector
+
+PERSON = 15
+
+class FakeNet:
+    """Stands in for a cv2.dnn SSD model
+
+    Every image in the batch gets a person at a position that depends on
+    its index, plus rows the detector must ignore. With fixed_batch set,
+    larger batches fail the way a model with a fixed batch size does.
+    """
+
+    def __init__(self, fixed_batch=None):
+        self.fixed_batch = fixed_batch
+        self.batches = []
+
+    def setInput(self, blob):
+        self.blob = blob
+
+    def forward(self):
+        count = self.blob.shape[0]
+        self.batches.append(self.blob.shape)
+        if self.fixed_batch is not None and count > self.fixed_batch:
+            raise cv2.error("batch size mismatch")
+        rows = []
+        for i in range(count):
+            left = 0.1 * (i + 1)
+            rows.append([i, PERSON, 0.9, left, 0.2, left + 0.4, 0.8])
+            rows.append([i, 7, 0.95, 0.0, 0.0, 1.0, 1.0])  # another class
+            rows.append([i, PERSON, 0.3, 0.0, 0.0, 1.0, 1.0])  # below the confidence
+            rows.append([i, PERSON, 0.8, -0.5, 0.5, 1.5, 0.5])  # no height once clipped
+        return np.array(rows, dtype=np.float32).reshape(1, 1, -1, 7)
+
+@pytest.fixture
+def fake_net(monkeypatch):
+    net = FakeNet()
+    monkeypatch.setattr(core, '_dnn_runners', {})
+    monkeypatch.setattr(core, 'load_dnn_model', lambda model, config='': net)
+    return net
+
+def expected_box(index, width, height):
+    left = 0.1 * (index + 1)
+    x1, x2 = round(left * width), round((left + 0.4) * width)
+    y1, y2 = round(0.2 * height), round(0.8 * height)
+    return (x1, y1, x2 - x1, y2 - y1)
+
+def test_zone_crops_share_one_forward_pass(fake_net):
+    detector = create_detector('dnn', params={'model': 'person.onnx'})
+    images = [np.zeros((100, 200, 3), np.uint8), np.zeros((60, 80, 3), np.uint8)]
+    results = detector.detect_batch(0, images, min_score=0.5)
+
+    assert fake_net.batches == [(2, 3, 300, 300)]
+    for index, (image, (boxes, scores)) in enumerate(zip(images, results)):
+        height, width = image.shape[:2]
+        assert boxes == [expected_box(index, width, height)]
+        assert scores == [pytest.approx(0.9)]
+
+def test_confidence_drops_low_scores(fake_net):
+    detector = create_detector('dnn', params={'model': 'person.onnx'})
+    boxes, scores = detector.detect_stage(0, np.zeros((100, 200, 3), np.uint8), min_score=0.95)
+    assert boxes == [] and scores == []
+
+def test_fixed_batch_model_falls_back_to_single_images(fake_net):
+    fake_net.fixed_batch = 1
+    detector = create_detector('dnn', params={'model': 'person.onnx'})
+    images = [np.zeros((100, 200, 3), np.uint8)] * 3
+    results = detector.detect_batch(0, images)
+
+    assert [shape[0] for shape in fake_net.batches] == [3, 1, 1, 1]
+    # Each image now is image 0 of its own batch
+    assert [boxes for boxes, _ in results] == [[expected_box(0, 200, 100)]] * 3